@@ -0,0 +1,50 @@
+import logging
+import threading
+import time
+from typing import Callable
+
+from app.database import SessionLocal
+from app.metrics import background_job_duration, background_job_errors
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """Runs `func(db)` every `interval` seconds on a daemon thread."""
+
+    def __init__(self, name: str, interval: float, func: Callable):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        db = SessionLocal()
+        start = time.perf_counter()
+        try:
+            return self.func(db)
+        except Exception:
+            db.rollback()
+            background_job_errors.inc(self.name)
+            logger.exception("%s failed", self.name)
+        finally:
+            db.close()
+            background_job_duration.observe(time.perf_counter() - start, self.name)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        if self.interval <= 0 or self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
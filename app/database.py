@@ -1,16 +1,273 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+load_dotenv()
+
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./fintech.db")
+
+# Pool tuning; size these against the number of workers x threads per worker
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true") == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Upper bound on waiting for a row lock (e.g. a busy wallet); 0 waits forever
+DB_LOCK_TIMEOUT_MS = int(os.getenv("DB_LOCK_TIMEOUT_MS", "5000"))
+# Separate pool for idempotency bookkeeping (see idempotency_engine below)
+IDEMPOTENCY_DB_POOL_SIZE = int(os.getenv("IDEMPOTENCY_DB_POOL_SIZE", "5"))
+IDEMPOTENCY_DB_MAX_OVERFLOW = int(os.getenv("IDEMPOTENCY_DB_MAX_OVERFLOW", "10"))
+
+# Async drivers used when ASYNC_DATABASE_URL is not set explicitly
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.waited = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_checkout(self, seconds: float, queued: bool):
+        with self._lock:
+            self.checkouts += 1
+            if queued:
+                self.waited += 1
+                self.wait_seconds_total += seconds
+                self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_checkin(self):
+        with self._lock:
+            self.checkins += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+
+pool_stats = PoolStats()
+
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./fintech.db"
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkouts and how long exhausted-pool checkouts queued."""
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+    def _do_get(self):
+        # No idle connection and no overflow left: this checkout will queue
+        queued = self.checkedin() == 0 and self.overflow() >= self._max_overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record_timeout()
+            raise
+        pool_stats.record_checkout(time.perf_counter() - start, queued)
+        return connection
+
+    def _do_return_conn(self, record):
+        pool_stats.record_checkin()
+        super()._do_return_conn(record)
+
+
+def _in_memory(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _engine_options(
+    url: str,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+    poolclass=InstrumentedQueuePool,
+) -> dict:
+    backend = make_url(url).get_backend_name()
+    connect_args = {}
+
+    if backend == "sqlite":
+        connect_args["check_same_thread"] = False
+        if DB_LOCK_TIMEOUT_MS:
+            connect_args["timeout"] = DB_LOCK_TIMEOUT_MS / 1000
+        if _in_memory(url):
+            # In-memory SQLite cannot be shared through a QueuePool
+            return {"connect_args": connect_args}
+
+    if backend == "postgresql":
+        options = []
+        if DB_STATEMENT_TIMEOUT_MS:
+            options.append(f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}")
+        if DB_LOCK_TIMEOUT_MS:
+            options.append(f"-c lock_timeout={DB_LOCK_TIMEOUT_MS}")
+        if options:
+            connect_args["options"] = " ".join(options)
+
+    return {
+        "connect_args": connect_args,
+        "poolclass": poolclass,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Idempotency claims are written in their own short sessions while the
+# request's session still holds a connection. Drawing both from one pool
+# deadlocks once every connection belongs to a request waiting for its
+# second, so they get a pool of their own. (An in-memory SQLite database
+# exists only behind its one engine, so that case shares it.)
+if _in_memory(SQLALCHEMY_DATABASE_URL):
+    idempotency_engine = engine
+else:
+    idempotency_engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(
+        SQLALCHEMY_DATABASE_URL,
+        pool_size=IDEMPOTENCY_DB_POOL_SIZE,
+        max_overflow=IDEMPOTENCY_DB_MAX_OVERFLOW,
+        poolclass=QueuePool,
+    ))
+
+IdempotencySessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=idempotency_engine)
+
+
+# -------------------- Async engine --------------------
+class AsyncDatabaseNotConfigured(RuntimeError):
+    """The async engine can't be built for this database (see ASYNC_DATABASE_URL)."""
+
+
+def _async_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if not driver:
+        raise AsyncDatabaseNotConfigured(
+            f"No async driver configured for {parsed.drivername}; set ASYNC_DATABASE_URL"
+        )
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _async_engine_options(url: str) -> dict:
+    backend = make_url(url).get_backend_name()
+
+    if _in_memory(url):
+        return {}
+
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if backend == "postgresql":
+        server_settings = {}
+        if DB_STATEMENT_TIMEOUT_MS:
+            server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+        if DB_LOCK_TIMEOUT_MS:
+            server_settings["lock_timeout"] = str(DB_LOCK_TIMEOUT_MS)
+        if server_settings:
+            options["connect_args"] = {"server_settings": server_settings}
+    return options
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Bound on first use by get_async_engine()
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+# Built lazily, so a database or driver the async routes can't use only
+# breaks those routes, with a clear error, instead of the whole app at import
+_async_engine = None
+_async_engine_lock = threading.Lock()
+_async_engine_hooks = []
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is not None:
+        return _async_engine
+
+    with _async_engine_lock:
+        if _async_engine is None:
+            url = ASYNC_DATABASE_URL or _async_url(SQLALCHEMY_DATABASE_URL)
+            try:
+                async_engine = create_async_engine(url, **_async_engine_options(url))
+            except ImportError as e:
+                raise AsyncDatabaseNotConfigured(
+                    f"The async driver for {make_url(url).drivername} is not installed ({e})"
+                ) from e
+            for hook in _async_engine_hooks:
+                hook(async_engine.sync_engine)
+            AsyncSessionLocal.configure(bind=async_engine)
+            _async_engine = async_engine
+    return _async_engine
+
+
+def on_async_engine(hook):
+    """Call `hook(sync_engine)` for the async engine once it exists (e.g. to instrument it)."""
+    with _async_engine_lock:
+        _async_engine_hooks.append(hook)
+        if _async_engine is not None:
+            hook(_async_engine.sync_engine)
+
+
+async def dispose_async_engine():
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
+def pool_status() -> dict:
+    pool = engine.pool
+    status = {
+        "url": engine.url.render_as_string(hide_password=True),
+        "pool_class": type(pool).__name__,
+    }
+
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "timeout_seconds": DB_POOL_TIMEOUT,
+        })
+
+    with pool_stats._lock:
+        status.update({
+            "checkouts": pool_stats.checkouts,
+            "checkins": pool_stats.checkins,
+            "checkouts_waited": pool_stats.waited,
+            "checkout_timeouts": pool_stats.timeouts,
+            "wait_seconds_total": round(pool_stats.wait_seconds_total, 6),
+            "wait_seconds_max": round(pool_stats.wait_seconds_max, 6),
+            "wait_seconds_avg": (
+                round(pool_stats.wait_seconds_total / pool_stats.waited, 6)
+                if pool_stats.waited else 0.0
+            ),
+        })
+
+    return status
+
 # Dependency for FastAPI routes
 def get_db():
     db = SessionLocal()
@@ -18,3 +275,10 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency for async routes; keeps the request off the threadpool
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,133 @@
+import os
+import random
+import threading
+import time
+from typing import Callable, Iterable
+
+from dotenv import load_dotenv
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.metrics import wallet_lock_wait
+
+load_dotenv()
+
+WALLET_LOCK_RETRIES = int(os.getenv("WALLET_LOCK_RETRIES", "3"))
+WALLET_LOCK_BACKOFF_SECONDS = float(os.getenv("WALLET_LOCK_BACKOFF_SECONDS", "0.05"))
+
+# PostgreSQL SQLSTATEs worth retrying: the whole transaction is safe to re-run
+RETRYABLE_SQLSTATES = {
+    "40001": "serialization",   # serialization_failure
+    "40P01": "deadlock",        # deadlock_detected
+    "55P03": "lock_timeout",    # lock_not_available (lock_timeout hit)
+}
+RETRYABLE_MESSAGES = {
+    "deadlock": "deadlock",
+    "could not serialize": "serialization",
+    "lock timeout": "lock_timeout",
+    "database is locked": "lock_timeout",  # SQLite busy timeout
+}
+
+
+class WalletBusy(Exception):
+    """Wallet locks could not be acquired after all retries."""
+
+
+class LockStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint: str, outcome: str):
+        with self._lock:
+            counts = self.endpoints.setdefault(endpoint, {
+                "runs": 0, "retries": 0, "deadlock": 0,
+                "serialization": 0, "lock_timeout": 0, "gave_up": 0,
+            })
+            counts[outcome] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {endpoint: dict(counts) for endpoint, counts in self.endpoints.items()}
+
+
+lock_stats = LockStats()
+
+
+# -------------------- Locking --------------------
+def lock_wallets(db: Session, wallet_ids: Iterable[int], *options) -> dict:
+    """
+    Lock wallet rows FOR UPDATE in ascending id order and return them by id.
+
+    Every path that locks more than one wallet must go through here so two
+    transactions can never hold the same pair of wallets in opposite order.
+    """
+    ids = sorted(set(wallet_ids))
+    if not ids:
+        return {}
+
+    query = db.query(models.Wallet)
+    if options:
+        query = query.options(*options)
+
+    start = time.perf_counter()
+    wallets = (
+        query.filter(models.Wallet.id.in_(ids))
+        .order_by(models.Wallet.id)
+        .with_for_update()
+        # Callers usually loaded the wallet unlocked first; without this the
+        # session would hand back that copy and its stale balance
+        .populate_existing()
+        .all()
+    )
+    wallet_lock_wait.observe(time.perf_counter() - start)
+    return {wallet.id: wallet for wallet in wallets}
+
+
+def lock_wallet(db: Session, wallet_id: int, *options):
+    """Lock a single wallet row for update; None if it doesn't exist."""
+    return lock_wallets(db, [wallet_id], *options).get(wallet_id)
+
+
+# -------------------- Retry --------------------
+def retry_reason(error: DBAPIError):
+    """Why a DB error is safe to retry, or None if it isn't."""
+    sqlstate = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+    if sqlstate in RETRYABLE_SQLSTATES:
+        return RETRYABLE_SQLSTATES[sqlstate]
+
+    message = str(error.orig).lower()
+    for fragment, reason in RETRYABLE_MESSAGES.items():
+        if fragment in message:
+            return reason
+    return None
+
+
+def run_with_retry(db: Session, endpoint: str, func: Callable, retries: int = WALLET_LOCK_RETRIES):
+    """
+    Run `func()` (a full unit of work that commits) and re-run it after a
+    rollback when it hits a deadlock, serialization failure or lock
+    timeout, with jittered exponential backoff. Raises WalletBusy once
+    retries are exhausted; any other error propagates untouched.
+    """
+    lock_stats.record(endpoint, "runs")
+
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except DBAPIError as e:
+            reason = retry_reason(e)
+            if reason is None:
+                raise
+
+            db.rollback()
+            lock_stats.record(endpoint, reason)
+
+            if attempt == retries:
+                lock_stats.record(endpoint, "gave_up")
+                raise WalletBusy("Wallet is busy, please retry") from e
+
+            lock_stats.record(endpoint, "retries")
+            # Full jitter so colliding transactions don't retry in lockstep
+            time.sleep(random.uniform(0, WALLET_LOCK_BACKOFF_SECONDS * 2 ** attempt))
@@ -1,22 +1,89 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import routers
-from app.routes import auth, user, wallet, transaction, audit, webhook,bank_account , withdrawal, admin_withdrawal, admin_audit, resolve
+from app.routes import auth, user, wallet, transaction, audit, webhook,bank_account , withdrawal, admin_withdrawal, admin_audit, resolve, banks, admin_stats, admin_webhook, admin_wallet, admin_fraud
 
 # Import DB
-from app.database import Base, engine
+from app.database import Base, SessionLocal, dispose_async_engine, engine, idempotency_engine, on_async_engine
+from app.background import PeriodicJob
+from app import metrics, profiling
+from app.locking import WalletBusy
+from app.ratelimit import RateLimitMiddleware, bucket_store
+from app.services.idempotency_service import IdempotencyConflict, IdempotencyInProgress
+from app.services import audit_service, fraud_service, idempotency_service, paystack_client, payout_service, transfer_reconciler, webhook_service
+from app.passwords import hasher
 
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+# Query timings for /metrics and the SQL profiler
+for instrumented in {engine, idempotency_engine}:
+    metrics.instrument_engine(instrumented)
+    profiling.instrument_engine(instrumented)
+on_async_engine(metrics.instrument_engine)
+on_async_engine(profiling.instrument_engine)
+
+# Background jobs (an interval of 0 disables a job)
+jobs = [
+    PeriodicJob(
+        "Balance Checkpoint",
+        audit_service.CHECKPOINT_INTERVAL_SECONDS,
+        audit_service.checkpoint_wallets,
+    ),
+    PeriodicJob(
+        "Bulk Payouts",
+        payout_service.PAYOUT_INTERVAL_SECONDS,
+        payout_service.run_payouts,
+    ),
+    PeriodicJob(
+        "Transfer Reconciler",
+        transfer_reconciler.TRANSFER_RECONCILE_INTERVAL_SECONDS,
+        transfer_reconciler.reconciler.run,
+    ),
+    PeriodicJob(
+        "Idempotency Purge",
+        idempotency_service.IDEMPOTENCY_PURGE_INTERVAL_SECONDS,
+        idempotency_service.purge_expired,
+    ),
+]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fraud velocity counters live in memory; rebuild them from the last 24h
+    db = SessionLocal()
+    try:
+        fraud_service.velocity.rehydrate(db)
+    finally:
+        db.close()
+
+    for job in jobs:
+        job.start()
+    webhook_service.processor.start()
+    yield
+    webhook_service.processor.stop()
+    for job in jobs:
+        job.stop()
+    await paystack_client.close_clients()
+    await bucket_store.close()
+    hasher.shutdown()
+    await dispose_async_engine()
+
+
 app = FastAPI(
     title="FinTech App API",
     description="Secure backend API for a wallet, transactions, and user management",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Rate limits run inside CORS so 429s still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 # CORS setup
 app.add_middleware(
     CORSMiddleware,
@@ -24,8 +91,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-SQL-Profile"],
 )
 
+# Opt-in per-request SQL profile (SQL_PROFILING=header|all)
+if profiling.SQL_PROFILING != "off":
+    app.add_middleware(profiling.SQLProfilerMiddleware)
+
+# Outermost, so latency covers every other middleware (and rate-limited requests)
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(WalletBusy)
+async def wallet_busy_handler(request: Request, exc: WalletBusy):
+    # Lock retries exhausted: transient, so tell the client to come back
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(IdempotencyConflict)
+async def idempotency_conflict_handler(request: Request, exc: IdempotencyConflict):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+
+@app.exception_handler(IdempotencyInProgress)
+async def idempotency_in_progress_handler(request: Request, exc: IdempotencyInProgress):
+    return JSONResponse(status_code=409, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(user.router, prefix="/users", tags=["Users"])
@@ -38,6 +129,16 @@ app.include_router(withdrawal.router)
 app.include_router(admin_withdrawal.router)
 app.include_router(admin_audit.router, prefix="/admin", tags=["Admin"])
 app.include_router(resolve.router)
+app.include_router(banks.router)
+app.include_router(admin_stats.router)
+app.include_router(admin_webhook.router)
+app.include_router(admin_wallet.router)
+app.include_router(admin_fraud.router)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return metrics.metrics_response()
 
 
 @app.get("/")
@@ -0,0 +1,276 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.responses import Response
+
+# Seconds; tuned for API calls that mostly finish in milliseconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# -------------------- Primitives --------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _samples(self) -> list:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in sorted(values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def _samples(self) -> list:
+        with self._lock:
+            values = {k: list(v) for k, v in self._values.items()}
+
+        lines = []
+        for labels, series in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+REGISTRY = []
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# -------------------- Metrics --------------------
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"),
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served",
+)
+http_request_db_queries = Histogram(
+    "http_request_db_queries", "Database queries per HTTP request", ("method", "route"), COUNT_BUCKETS,
+)
+http_request_db_seconds = Histogram(
+    "http_request_db_seconds", "Time spent in database queries per HTTP request", ("method", "route"),
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "Database query execution time", (), QUERY_BUCKETS,
+)
+wallet_lock_wait = Histogram(
+    "wallet_lock_wait_seconds", "Time to acquire wallet row locks", (), QUERY_BUCKETS,
+)
+paystack_request_duration = Histogram(
+    "paystack_request_duration_seconds", "Paystack API call latency", ("operation",),
+)
+paystack_errors = Counter(
+    "paystack_errors_total", "Failed Paystack API calls", ("operation", "error"),
+)
+background_job_duration = Histogram(
+    "background_job_duration_seconds", "Background job run time", ("job",),
+)
+background_job_errors = Counter(
+    "background_job_errors_total", "Background job runs that raised", ("job",),
+)
+withdrawal_sends = Counter(
+    "admin_withdrawal_sends_total", "Single withdrawal sends from the admin API", ("outcome",),
+)
+
+
+# -------------------- Database --------------------
+# [query count, seconds] for the request being served, shared with the
+# threadpool thread running a sync route (it inherits a copy of the context)
+_request_db = contextvars.ContextVar("request_db", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metrics_query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("metrics_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    db_query_duration.observe(elapsed)
+    totals = _request_db.get()
+    if totals is not None:
+        totals[0] += 1
+        totals[1] += elapsed
+
+
+def instrument_engine(engine):
+    """Time every query on `engine` (the sync engine behind an async one too)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# -------------------- Paystack --------------------
+def observe_paystack(operation: str):
+    """Decorator timing a Paystack call and counting its failures by type."""
+    def record(start: float, error: Optional[BaseException]):
+        paystack_request_duration.observe(time.perf_counter() - start, operation)
+        if error is not None:
+            paystack_errors.inc(operation, type(error).__name__)
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    record(start, e)
+                    raise
+                record(start, None)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                record(start, e)
+                raise
+            record(start, None)
+            return result
+        return wrapper
+    return decorator
+
+
+# -------------------- HTTP --------------------
+def route_template(scope) -> str:
+    """
+    "/wallets/12/deposit" -> "/wallets/{wallet_id}/deposit", from the path
+    params routing matched; requests that matched no route share one label.
+    """
+    if "route" not in scope:
+        return "unmatched"
+    params = scope.get("path_params")
+    if not params:
+        return scope["path"]
+    names = {str(value): name for name, value in params.items()}
+    return "/".join(
+        "{" + names[segment] + "}" if segment in names else segment
+        for segment in scope["path"].split("/")
+    )
+
+
+class MetricsMiddleware:
+    """
+    Per-route latency, in-flight count and DB usage for every HTTP request.
+    Routes are labelled by their path template so ids don't explode the
+    series count.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        totals = [0, 0.0]
+        token = _request_db.set(totals)
+        http_requests_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_progress.dec()
+            _request_db.reset(token)
+
+            path = route_template(scope)
+            method = scope["method"]
+            http_request_duration.observe(elapsed, method, path, str(status[0]))
+            http_request_db_queries.observe(totals[0], method, path)
+            http_request_db_seconds.observe(totals[1], method, path)
+
+
+def metrics_response() -> Response:
+    return Response(render(), media_type=CONTENT_TYPE)
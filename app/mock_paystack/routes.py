@@ -21,27 +21,68 @@ def mock_payment(email: str, amount_kobo: int):
     }
 
 def mock_transfer(reference: str, succeed: bool = True):
+    """
+    Mimics POST /transfer. Like Paystack, it only queues the transfer: the
+    caller's transaction stays pending until mock_transfer_status (via the
+    transfer reconciler) settles it. It must not touch wallets itself, since
+    the caller is still holding the wallet lock in another session.
+    """
+    if not succeed:
+        return {"status": False, "message": "Transfer failed"}
+
+    return {
+        "status": True,
+        "message": "Transfer has been queued",
+        "data": {
+            "reference": reference,
+            "transfer_code": f"TRF_mock{uuid.uuid4().hex[:12]}",
+            "status": "pending"
+        }
+    }
+
+
+def mock_transfer_status(reference: str):
+    """Mimics GET /transfer/{reference}: pending transfers settle as success."""
     db: Session = next(get_db())
+    try:
+        tx = db.query(models.Transaction).filter_by(transfer_reference=reference).first()
+        if not tx:
+            raise ValueError("Transfer not found")
+
+        status = "success" if tx.status == "pending" else tx.status
+        return {"status": status, "amount_kobo": tx.amount_kobo}
+    finally:
+        db.close()
+
 
-    tx = db.query(models.Transaction).filter_by(idempotency_key=reference).first()
-    if not tx:
-        return {"status": False, "message": "Transaction not found"}
-
-    if succeed:
-        # Mark transaction as success
-        tx.status = "success"
-        db.commit()
-        return {
-            "status": True,
-            "data": {
-                "reference": reference,
-                "status": "success"
+def mock_create_recipient(bank_code: str, account_number: str):
+    return {
+        "status": True,
+        "message": "Transfer recipient created successfully",
+        "data": {
+            "recipient_code": f"RCP_mock{bank_code}{account_number}",
+            "details": {
+                "account_number": account_number,
+                "bank_code": bank_code
             }
         }
-    else:
-        # Mark transaction failed + revert wallet
-        wallet = db.query(models.Wallet).filter_by(id=tx.wallet_id).first()
-        wallet.balance_kobo += tx.amount_kobo
-        tx.status = "failed"
-        db.commit()
-        return {"status": False, "message": "Transfer failed"}
+    }
+
+
+def mock_bulk_transfer(transfers: list):
+    """Mimics POST /transfer/bulk: every transfer is queued, none settled yet."""
+    return {
+        "status": True,
+        "message": f"{len(transfers)} transfers queued.",
+        "data": [
+            {
+                "reference": t["reference"],
+                "recipient": t["recipient"],
+                "amount": t["amount"],
+                "transfer_code": f"TRF_mock{uuid.uuid4().hex[:12]}",
+                "currency": "NGN",
+                "status": "pending"
+            }
+            for t in transfers
+        ]
+    }
@@ -0,0 +1,95 @@
+"""
+Stand-alone HTTP stand-in for the Paystack endpoints this service calls.
+
+Unlike USE_MOCK_PAYSTACK, which short-circuits inside the process, point
+PAYSTACK_BASE_URL here to exercise the real httpx clients, pools and
+timeouts. Every call waits `latency_ms` (plus up to `jitter_ms`) first.
+
+    python -m app.mock_paystack.server --port 9100 --latency-ms 150
+"""
+import argparse
+import asyncio
+import random
+import uuid
+
+from fastapi import FastAPI, Request
+
+
+def create_app(latency_ms: float = 0, jitter_ms: float = 0) -> FastAPI:
+    app = FastAPI(title="Mock Paystack")
+    transfers = {}
+
+    async def delay():
+        wait = latency_ms + random.uniform(0, jitter_ms)
+        if wait > 0:
+            await asyncio.sleep(wait / 1000)
+
+    @app.post("/transferrecipient")
+    async def create_recipient(request: Request):
+        body = await request.json()
+        await delay()
+        return {
+            "status": True,
+            "message": "Transfer recipient created successfully",
+            "data": {"recipient_code": f"RCP_mock{body['bank_code']}{body['account_number']}"},
+        }
+
+    @app.post("/transfer")
+    async def transfer(request: Request):
+        body = await request.json()
+        await delay()
+        transfers[body["reference"]] = body["amount"]
+        return {
+            "status": True,
+            "message": "Transfer has been queued",
+            "data": {
+                "reference": body["reference"],
+                "transfer_code": f"TRF_mock{uuid.uuid4().hex[:12]}",
+                "status": "pending",
+            },
+        }
+
+    @app.post("/transfer/bulk")
+    async def bulk_transfer(request: Request):
+        body = await request.json()
+        await delay()
+        data = []
+        for item in body["transfers"]:
+            transfers[item["reference"]] = item["amount"]
+            data.append({**item, "transfer_code": f"TRF_mock{uuid.uuid4().hex[:12]}", "status": "pending"})
+        return {"status": True, "message": f"{len(data)} transfers queued.", "data": data}
+
+    @app.get("/transfer/{reference}")
+    async def transfer_status(reference: str):
+        await delay()
+        if reference not in transfers:
+            return {"status": False, "message": "Transfer not found"}
+        return {"status": True, "data": {"status": "success", "amount": transfers[reference]}}
+
+    @app.get("/bank/resolve")
+    async def resolve_account(account_number: str, bank_code: str):
+        await delay()
+        return {
+            "status": True,
+            "data": {"account_name": f"MOCK ACCOUNT {account_number[-4:]}", "account_number": account_number},
+        }
+
+    @app.get("/bank")
+    async def banks():
+        await delay()
+        return {"status": True, "data": [{"name": "Mock Bank", "code": "000"}]}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms), host=args.host, port=args.port, log_level="warning")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, UniqueConstraint, Index
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, UniqueConstraint, Index, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -57,6 +57,33 @@ class Transaction(Base):
         Index("idx_transfer_ref", "transfer_reference"),
     )
 
+# Opt-in sub-balances for hot wallets (see services/balance_service.py).
+# A wallet's balance is its own balance_kobo plus the sum of its shards.
+class WalletShard(Base):
+    __tablename__ = "wallet_shards"
+
+    wallet_id = Column(Integer, ForeignKey("wallets.id"), primary_key=True)
+    shard_no = Column(Integer, primary_key=True)
+    balance_kobo = Column(Integer, default=0, nullable=False)
+
+
+class BalanceCheckpoint(Base):
+    __tablename__ = "balance_checkpoints"
+
+    wallet_id = Column(Integer, ForeignKey("wallets.id"), primary_key=True)
+    last_transaction_id = Column(Integer, nullable=False)
+    verified_balance_kobo = Column(Integer, nullable=False, default=0)
+    verified_at = Column(DateTime, default=datetime.utcnow)
+
+
+class WebhookStatus(str, Enum):
+    pending = "pending"
+    processing = "processing"
+    processed = "processed"
+    ignored = "ignored"
+    dead = "dead"
+
+
 class TransactionType(str, Enum):
     deposit = "deposit"
     withdraw = "withdraw"
@@ -75,10 +102,25 @@ class WebhookEvent(Base):
     id = Column(Integer, primary_key=True)
     provider = Column(String, index=True)  #paystack
     event = Column(String, index=True)
-    reference = Column(String, index=True, unique=True)
+    reference = Column(String, index=True)
     payload = Column(String)  
     received_at = Column(DateTime, default=datetime.utcnow)
 
+    # Background processing state (see services/webhook_service.py)
+    status = Column(String, default="pending", nullable=False)
+    wallet_id = Column(Integer, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String, nullable=True)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    claimed_at = Column(DateTime, nullable=True)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_webhook_status_next_attempt", "status", "next_attempt_at"),
+        # One transfer can legitimately get several events (e.g. success, then reversed)
+        UniqueConstraint("reference", "event", name="uq_webhook_reference_event"),
+    )
+
 
 class BankAccount(Base):
     __tablename__ = "bank_accounts"
@@ -99,4 +141,79 @@ class BankAccount(Base):
             "account_number",
             name="uq_user_bank_account"
         ),
+        Index("idx_bank_account_lookup", "bank_code", "account_number"),
     )
+
+
+# Paystack recipient codes, reused across payouts to the same account
+class TransferRecipient(Base):
+    __tablename__ = "transfer_recipients"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bank_code = Column(String(10), nullable=False)
+    account_number = Column(String(20), nullable=False)
+    recipient_code = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "bank_code",
+            "account_number",
+            name="uq_transfer_recipient_account"
+        ),
+    )
+
+
+# Idempotency-Key records (see services/idempotency_service.py)
+class IdempotencyStatus(str, Enum):
+    in_progress = "in_progress"
+    completed = "completed"
+
+
+class IdempotencyRecord(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String, nullable=False)
+    endpoint = Column(String, nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String, default="in_progress", nullable=False)
+    response_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_user_key"),
+    )
+
+
+# Transfers held for review by the fraud scoring stage (see services/fraud_service.py)
+class FraudHoldStatus(str, Enum):
+    held = "held"
+    approved = "approved"
+    rejected = "rejected"
+
+
+class FraudHold(Base):
+    __tablename__ = "fraud_holds"
+
+    id = Column(Integer, primary_key=True)
+    # The sender's pending transfer_out; its amount is already debited
+    transaction_id = Column(Integer, ForeignKey("transactions.id"), nullable=False, unique=True)
+    wallet_id = Column(Integer, ForeignKey("wallets.id"), nullable=False, index=True)
+    destination_type = Column(String, nullable=False)  # wallet | bank | bulk
+    recipient_wallet_id = Column(Integer, ForeignKey("wallets.id"), nullable=True)
+    bank_code = Column(String(10), nullable=True)
+    account_number = Column(String(20), nullable=True)
+    reference = Column(String, nullable=True)  # Paystack reference used on approval
+    items = Column(Text, nullable=True)  # bulk: JSON [[index, amount_kobo, recipient_wallet_id], ...]
+    amount_kobo = Column(Integer, nullable=False)
+    score = Column(Integer, nullable=False)
+    reasons = Column(String, nullable=False, default="")
+    status = Column(String, default="held", nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    reviewed_at = Column(DateTime, nullable=True)
+
+    transaction = relationship("Transaction")
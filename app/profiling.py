@@ -0,0 +1,202 @@
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+# off | header (only requests sending `X-SQL-Profile: 1`) | all
+SQL_PROFILING = os.getenv("SQL_PROFILING", "off")
+# The same SELECT shape this many times in one request is reported as N+1
+SQL_PROFILE_N_PLUS_ONE = int(os.getenv("SQL_PROFILE_N_PLUS_ONE", "5"))
+# Profiles kept for GET /admin/stats/sql-profiles
+SQL_PROFILE_HISTORY = int(os.getenv("SQL_PROFILE_HISTORY", "200"))
+
+PROFILE_HEADER = b"x-sql-profile"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|\$\d+|:\w+|\?|%s")
+_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement shape with literals and bind params folded, IN lists collapsed."""
+    shape = _STRING.sub("?", statement)
+    shape = _PARAM.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _LIST.sub("(?)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryProfile:
+    """Queries seen during one request or one `query_budget` block."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.queries = []  # (statement, seconds)
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        with self._lock:
+            self.queries.append((statement, seconds))
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def seconds(self) -> float:
+        return sum(seconds for _, seconds in self.queries)
+
+    def repeated(self) -> list:
+        """(fingerprint, times, seconds) for shapes run more than once, most frequent first."""
+        counts, seconds = Counter(), Counter()
+        for statement, elapsed in self.queries:
+            shape = fingerprint(statement)
+            counts[shape] += 1
+            seconds[shape] += elapsed
+        return [
+            (shape, times, seconds[shape])
+            for shape, times in counts.most_common()
+            if times > 1
+        ]
+
+    def n_plus_one(self, threshold: int = SQL_PROFILE_N_PLUS_ONE) -> list:
+        return [
+            (shape, times, seconds)
+            for shape, times, seconds in self.repeated()
+            if times >= threshold and shape.upper().startswith("SELECT")
+        ]
+
+    def summary(self) -> dict:
+        return {
+            "label": self.label,
+            "queries": self.count,
+            "total_ms": round(self.seconds * 1000, 3),
+            "repeated": [
+                {"fingerprint": shape, "count": times, "total_ms": round(seconds * 1000, 3)}
+                for shape, times, seconds in self.repeated()
+            ],
+            "n_plus_one": [shape for shape, _, _ in self.n_plus_one()],
+        }
+
+    def header(self) -> str:
+        return f"queries={self.count}; total_ms={self.seconds * 1000:.2f}; n_plus_one={len(self.n_plus_one())}"
+
+
+# -------------------- Engine hooks --------------------
+# The request being profiled; sync routes see it through the threadpool's copied context
+_current = contextvars.ContextVar("sql_profile", default=None)
+# Open query_budget blocks. Also a context variable, so a budget sees its
+# own thread's queries and those of requests it makes (TestClient and the
+# threadpool carry the context along) but not background job threads
+_budgets = contextvars.ContextVar("query_budgets", default=())
+
+profiles = deque(maxlen=SQL_PROFILE_HISTORY)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["profile_query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("profile_query_start", None)
+    if start is None:
+        return
+    profile = _current.get()
+    budgets = _budgets.get()
+    if profile is None and not budgets:
+        return
+    elapsed = time.perf_counter() - start
+    if profile is not None:
+        profile.record(statement, elapsed)
+    for budget in budgets:
+        budget.record(statement, elapsed)
+
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# -------------------- Query budgets --------------------
+@contextmanager
+def query_budget(max_queries: int, allow_n_plus_one: bool = False, label: str = ""):
+    """
+    Fail with AssertionError if the block runs more than `max_queries`
+    statements (or an N+1 pattern), listing the repeated shapes. Counts
+    the queries of this context, which includes requests made through
+    TestClient (served from another thread, with this context) but not
+    the app's background jobs:
+
+        with query_budget(6, label="POST /wallets/transfer"):
+            client.post("/wallets/transfer", json=..., headers=...)
+    """
+    profile = QueryProfile(label)
+    token = _budgets.set(_budgets.get() + (profile,))
+    try:
+        yield profile
+    finally:
+        _budgets.reset(token)
+
+    problems = []
+    if profile.count > max_queries:
+        problems.append(f"{profile.count} queries, budget {max_queries}")
+    if not allow_n_plus_one and profile.n_plus_one():
+        problems.append("N+1 pattern")
+    if problems:
+        repeated = "\n".join(f"  {times}x {shape}" for shape, times, _ in profile.repeated())
+        raise AssertionError(f"{label or 'query budget'}: {', '.join(problems)}\n{repeated}")
+
+
+# -------------------- Middleware --------------------
+class SQLProfilerMiddleware:
+    """
+    Profiles requests per SQL_PROFILING and adds an `X-SQL-Profile`
+    response header (count, total time, N+1 shapes). Full summaries of
+    recent requests are kept for the admin stats endpoint.
+    """
+
+    def __init__(self, app, mode: str = SQL_PROFILING):
+        self.app = app
+        self.mode = mode
+
+    def _wanted(self, scope) -> bool:
+        if self.mode == "all":
+            return True
+        if self.mode == "header":
+            return any(key == PROFILE_HEADER and value == b"1" for key, value in scope["headers"])
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        profile = QueryProfile(f"{scope['method']} {scope['path']}")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_HEADER, profile.header().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            profiles.append(profile.summary())
+
+
+def recent_profiles(limit: int = 50, n_plus_one_only: bool = False) -> list:
+    found = [p for p in profiles if p["n_plus_one"]] if n_plus_one_only else list(profiles)
+    return sorted(found, key=lambda p: p["queries"], reverse=True)[:limit]
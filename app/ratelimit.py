@@ -0,0 +1,262 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from dotenv import load_dotenv
+from jose import jwt, JWTError
+from starlette.responses import JSONResponse
+
+from app.cache import TTLCache
+from app.security import ALGORITHM, SECRET_KEY
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true") == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | redis
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+# Buckets kept per worker by the memory backend; least recently used go first
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Only honour X-Forwarded-For behind a proxy that sets it
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false") == "true"
+
+
+class Limit:
+    """`requests` per `seconds`, refilled continuously; bursts up to `requests`."""
+
+    __slots__ = ("capacity", "rate")
+
+    def __init__(self, requests: int, seconds: float):
+        self.capacity = requests
+        self.rate = requests / seconds
+
+    @classmethod
+    def parse(cls, spec: str) -> Optional["Limit"]:
+        """"30/60" -> 30 requests per 60 seconds; "0" or "" -> no limit."""
+        if not spec or spec == "0":
+            return None
+        requests, seconds = spec.split("/")
+        return cls(int(requests), float(seconds))
+
+
+class Policy:
+    def __init__(self, name: str, method: str, path: str, user: str = "", ip: str = ""):
+        self.name = name
+        self.method = method
+        self.path = re.compile(path)
+        self.user = Limit.parse(os.getenv(f"RATE_LIMIT_{name.upper()}_USER", user))
+        self.ip = Limit.parse(os.getenv(f"RATE_LIMIT_{name.upper()}_IP", ip))
+
+
+# Money-moving and Paystack-backed routes. Per-user buckets are keyed on the
+# bearer token's subject; per-IP buckets also cover unauthenticated callers.
+POLICIES = [
+    Policy("transfer", "POST", r"^/wallets/transfer(/bulk)?/?$", user="30/60", ip="120/60"),
+    Policy("deposit", "POST", r"^/wallets/\d+/deposit/?$", user="30/60", ip="120/60"),
+    Policy("withdraw", "POST", r"^/wallets/\d+/withdraw/?$", user="30/60", ip="120/60"),
+    Policy("withdrawal", "POST", r"^/withdrawals/?$", user="10/60", ip="60/60"),
+    Policy("resolve_account", "POST", r"^/resolve-account/?$", ip="30/60"),
+    Policy("login", "POST", r"^/auth/login/?$", ip="10/60"),
+    Policy("register", "POST", r"^/auth/register/?$", ip="5/60"),
+]
+
+
+class RateLimitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.policies = {}
+
+    def record(self, policy: str, outcome: str):
+        with self._lock:
+            counts = self.policies.setdefault(policy, {"allowed": 0, "limited": 0})
+            counts[outcome] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {policy: dict(counts) for policy, counts in self.policies.items()}
+
+
+rate_limit_stats = RateLimitStats()
+
+
+# -------------------- Stores --------------------
+class MemoryBucketStore:
+    """Token buckets in this process only: each worker enforces its own share."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, limit: Limit) -> float:
+        return self.take_sync(key, limit)
+
+    def take_sync(self, key: str, limit: Limit) -> float:
+        """Spend one token. Returns 0 if allowed, else seconds until one is free."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = limit.capacity
+            else:
+                tokens = min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.rate)
+                self._buckets.move_to_end(key)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / limit.rate
+
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    async def close(self):
+        pass
+
+
+class RedisBucketStore:
+    """
+    Token buckets shared by every worker through Redis. Each take is one
+    round trip running a Lua script, so the read-refill-spend is atomic.
+    Requires the `redis` package.
+    """
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def take(self, key: str, limit: Limit) -> float:
+        return float(await self._script(keys=[self.prefix + key], args=[limit.capacity, limit.rate]))
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def make_store(backend: str = RATE_LIMIT_BACKEND):
+    if backend == "memory":
+        return MemoryBucketStore()
+    if backend == "redis":
+        return RedisBucketStore()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {backend!r}")
+
+
+bucket_store = make_store()
+
+
+# -------------------- Middleware --------------------
+# Verified bearer token -> user id, so a hot client costs one JWT decode a minute
+_token_subjects = TTLCache(RATE_LIMIT_MAX_KEYS, 60)
+
+
+def token_user_id(token: str) -> Optional[int]:
+    user_id = _token_subjects.get(token)
+    if user_id is not None:
+        return user_id
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = int(payload.get("sub"))
+    except (JWTError, ValueError, TypeError):
+        return None
+    _token_subjects.set(token, user_id)
+    return user_id
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def client_ip(scope) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """
+    Token-bucket limits per user and per client IP for the routes in
+    POLICIES; everything else passes straight through. Over-limit requests
+    get `429` with `Retry-After` before reaching the route.
+    """
+
+    def __init__(self, app, policies: list = None, store=None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.enabled = enabled
+        self.store = store or bucket_store
+        self.policies = {}
+        for policy in POLICIES if policies is None else policies:
+            self.policies.setdefault(policy.method, []).append(policy)
+
+    def match(self, method: str, path: str) -> Optional[Policy]:
+        for policy in self.policies.get(method, ()):
+            if policy.path.match(path):
+                return policy
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        policy = self.match(scope["method"], scope["path"])
+        if policy is None:
+            return await self.app(scope, receive, send)
+
+        wait = 0.0
+        if policy.user:
+            authorization = _header(scope, b"authorization")
+            if authorization and authorization[:7].lower() == "bearer ":
+                user_id = token_user_id(authorization[7:])
+                if user_id is not None:
+                    wait = await self.store.take(f"{policy.name}:user:{user_id}", policy.user)
+        if not wait and policy.ip:
+            wait = await self.store.take(f"{policy.name}:ip:{client_ip(scope)}", policy.ip)
+
+        if wait:
+            rate_limit_stats.record(policy.name, "limited")
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            return await response(scope, receive, send)
+
+        rate_limit_stats.record(policy.name, "allowed")
+        return await self.app(scope, receive, send)
@@ -1,8 +1,17 @@
 # routes/admin_audit.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from typing import Optional
+import json
 from app import database, security, models
-from app.services.audit_service import recalculate_wallet_balance
+from app.serialization import FastJSONResponse, TRANSACTION_COLUMNS, transaction_rows
+from app.services.audit_service import (
+    recalculate_wallet_balance,
+    checkpoint_wallets,
+    CHECKPOINT_SETTLE_SECONDS,
+)
+from app.services import reconciliation_service
 router = APIRouter(prefix="/audit", tags=["Admin Audit"])
 
 
@@ -11,12 +20,12 @@ def admin_all_transactions(
     db: Session = Depends(database.get_db),
     admin=Depends(security.require_admin)
 ):
-    return (
-        db.query(models.Transaction)
+    return FastJSONResponse(transaction_rows(
+        db.query(*TRANSACTION_COLUMNS)
         .order_by(models.Transaction.timestamp.desc())
         .limit(1000)
         .all()
-    )
+    ))
 
 
 @router.get("/wallet/{wallet_id}")
@@ -30,24 +39,55 @@ def audit_wallet(
 
 @router.get("/mismatches")
 def audit_all_wallets(
+    min_wallet_id: Optional[int] = None,
+    max_wallet_id: Optional[int] = None,
+    after_wallet_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(database.get_db),
     admin = Depends(security.require_admin)
 ):
-    wallets = db.query(models.Wallet).all()
-    broken = []
-
-    for w in wallets:
-        audit = recalculate_wallet_balance(db, w.id)
-        if not audit["valid"]:
-            broken.append(audit)
+    broken = list(
+        reconciliation_service.iter_mismatched_wallets(
+            db,
+            min_wallet_id=min_wallet_id,
+            max_wallet_id=max_wallet_id,
+            after_wallet_id=after_wallet_id,
+            limit=limit,
+        )
+    )
 
     return {
-        "total_wallets": len(wallets),
+        "total_wallets": reconciliation_service.count_wallets(db, min_wallet_id, max_wallet_id),
         "mismatched_wallets": len(broken),
-        "details": broken
+        "details": broken,
+        "next_after_wallet_id": broken[-1]["wallet_id"] if len(broken) == limit else None,
     }
 
 
+@router.get("/mismatches/stream")
+def stream_mismatched_wallets(
+    min_wallet_id: Optional[int] = None,
+    max_wallet_id: Optional[int] = None,
+    admin = Depends(security.require_admin)
+):
+    """Stream every mismatched wallet in the range as NDJSON."""
+
+    def rows():
+        # Own session: the request-scoped one may close before the body is sent
+        db = database.SessionLocal()
+        try:
+            for audit in reconciliation_service.iter_mismatched_wallets(
+                db,
+                min_wallet_id=min_wallet_id,
+                max_wallet_id=max_wallet_id,
+            ):
+                yield json.dumps(audit) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
 @router.post("/fix/{wallet_id}")
 def fix_wallet_balance(
     wallet_id: int,
@@ -59,14 +99,24 @@ def fix_wallet_balance(
     if audit["valid"]:
         return {"message": "Wallet already valid"}
 
+    # Shard sub-balances are left alone; the wallet row absorbs the difference
     db.query(models.Wallet)\
         .filter(models.Wallet.id == wallet_id)\
-        .update({"balance_kobo": audit["calculated_balance"]})
+        .update({"balance_kobo": audit["calculated_balance_kobo"] - audit["shard_balance_kobo"]})
 
     db.commit()
 
     return {
         "message": "Wallet corrected",
-        "new_balance": audit["calculated_balance"]
+        "new_balance": audit["calculated_balance_kobo"]
     }
+
+
+@router.post("/checkpoints")
+def run_checkpoints(
+    settle_seconds: int = CHECKPOINT_SETTLE_SECONDS,
+    db: Session = Depends(database.get_db),
+    admin = Depends(security.require_admin)
+):
+    return {"checkpointed_wallets": checkpoint_wallets(db, settle_seconds)}
 # .\venv\Scripts\python.exe -m uvicorn app.main:app --reload
\ No newline at end of file
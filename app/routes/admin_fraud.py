@@ -0,0 +1,92 @@
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app import database, models, security
+from app.locking import run_with_retry
+from app.services import fraud_service
+
+router = APIRouter(prefix="/admin/fraud", tags=["Admin Fraud"])
+
+
+def hold_out(hold: models.FraudHold) -> dict:
+    return {
+        "id": hold.id,
+        "transaction_id": hold.transaction_id,
+        "wallet_id": hold.wallet_id,
+        "destination_type": hold.destination_type,
+        "recipient_wallet_id": hold.recipient_wallet_id,
+        "bank_code": hold.bank_code,
+        "account_number": hold.account_number,
+        "items": [
+            {"index": index, "amount_kobo": amount_kobo, "recipient_wallet_id": wallet_id}
+            for index, amount_kobo, wallet_id in json.loads(hold.items)
+        ] if hold.items else None,
+        "amount_kobo": hold.amount_kobo,
+        "score": hold.score,
+        "reasons": hold.reasons.split("; ") if hold.reasons else [],
+        "status": hold.status,
+        "created_at": hold.created_at,
+        "reviewed_at": hold.reviewed_at,
+    }
+
+
+@router.get("/holds")
+def list_holds(
+    status: str = Query(models.FraudHoldStatus.held.value),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(database.get_db),
+    admin = Depends(security.require_admin)
+):
+    holds = (
+        db.query(models.FraudHold)
+        .filter(models.FraudHold.status == status)
+        .order_by(models.FraudHold.id)
+        .limit(limit)
+        .all()
+    )
+    return [hold_out(hold) for hold in holds]
+
+
+def review(db: Session, hold_id: int, endpoint: str, action):
+    try:
+        return hold_out(run_with_retry(db, endpoint, lambda: action(db, hold_id)))
+    except LookupError as e:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/holds/{hold_id}/approve")
+def approve_hold(
+    hold_id: int,
+    db: Session = Depends(database.get_db),
+    admin = Depends(security.require_admin)
+):
+    """Release a held transfer to its recipient."""
+    return review(db, hold_id, "fraud.approve", fraud_service.approve_hold)
+
+
+@router.post("/holds/{hold_id}/reject")
+def reject_hold(
+    hold_id: int,
+    db: Session = Depends(database.get_db),
+    admin = Depends(security.require_admin)
+):
+    """Refund the sender and fail the held transfer."""
+    return review(db, hold_id, "fraud.reject", fraud_service.reject_hold)
+
+
+@router.get("/velocity/{wallet_id}")
+def wallet_velocity(
+    wallet_id: int,
+    admin = Depends(security.require_admin)
+):
+    """This worker's outgoing transfer counters for a wallet."""
+    return {
+        window: {"count": count, "amount_kobo": amount}
+        for window, (count, amount) in fraud_service.velocity.snapshot(wallet_id).items()
+    }
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app import database, security
+from app import profiling
+from app.locking import lock_stats
+from app.ratelimit import rate_limit_stats
+from app.services.account_resolver import account_resolver
+from app.services import webhook_service
+from app.services.transfer_reconciler import reconciler
+
+router = APIRouter(prefix="/admin/stats", tags=["Admin Stats"])
+
+
+@router.get("/account-resolution")
+def account_resolution_stats(admin = Depends(security.require_admin)):
+    return account_resolver.snapshot()
+
+
+@router.get("/db-pool")
+def db_pool_stats(admin = Depends(security.require_admin)):
+    return database.pool_status()
+
+
+@router.get("/webhooks")
+def webhook_queue_stats(
+    db: Session = Depends(database.get_db),
+    admin = Depends(security.require_admin)
+):
+    return webhook_service.queue_stats(db)
+
+
+@router.get("/transfer-reconciler")
+def transfer_reconciler_stats(admin = Depends(security.require_admin)):
+    return {
+        "tracked": len(reconciler._next_check),
+        "since_start": dict(reconciler.stats),
+    }
+
+
+@router.get("/wallet-locks")
+def wallet_lock_stats(admin = Depends(security.require_admin)):
+    """Deadlock / serialization / lock-timeout retries per endpoint."""
+    return lock_stats.snapshot()
+
+
+@router.get("/rate-limits")
+def rate_limit_stats_view(admin = Depends(security.require_admin)):
+    """Allowed vs rejected requests per rate-limit policy (this worker)."""
+    return rate_limit_stats.snapshot()
+
+
+@router.get("/sql-profiles")
+def sql_profiles(
+    limit: int = Query(50, ge=1, le=500),
+    n_plus_one: bool = False,
+    admin = Depends(security.require_admin)
+):
+    """Recent profiled requests (SQL_PROFILING), most queries first."""
+    return {
+        "mode": profiling.SQL_PROFILING,
+        "profiles": profiling.recent_profiles(limit, n_plus_one),
+    }
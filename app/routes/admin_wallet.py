@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app import database, security
+from app.services import balance_service
+
+router = APIRouter(prefix="/admin/wallets", tags=["Admin Wallets"])
+
+
+@router.post("/{wallet_id}/shards")
+def enable_wallet_shards(
+    wallet_id: int,
+    count: int = Query(..., ge=1, le=balance_service.MAX_WALLET_SHARDS),
+    db: Session = Depends(database.get_db),
+    admin = Depends(security.require_admin)
+):
+    """Split a hot wallet's incoming credits across `count` sub-balances."""
+    try:
+        shards = balance_service.enable_sharding(db, wallet_id, count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"wallet_id": wallet_id, "shards": shards}
+
+
+@router.delete("/{wallet_id}/shards")
+def disable_wallet_shards(
+    wallet_id: int,
+    db: Session = Depends(database.get_db),
+    admin = Depends(security.require_admin)
+):
+    try:
+        moved = balance_service.disable_sharding(db, wallet_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"wallet_id": wallet_id, "shards": 0, "collected_kobo": moved}
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.database import get_db
+from app import security
+from app.services import webhook_replay
+
+router = APIRouter(prefix="/admin/webhooks", tags=["Admin Webhooks"])
+
+
+@router.post("/replay")
+def replay_stored_events(
+    from_id: Optional[int] = None,
+    to_id: Optional[int] = None,
+    status: List[str] = Query(["pending", "dead"]),
+    batch_size: int = webhook_replay.REPLAY_BATCH_SIZE,
+    db: Session = Depends(get_db),
+    admin = Depends(security.require_admin)
+):
+    return webhook_replay.replay_stored(db, from_id, to_id, status, batch_size)
+
+
+@router.post("/replay/payloads")
+async def replay_payloads(
+    request: Request,
+    batch_size: int = webhook_replay.REPLAY_BATCH_SIZE,
+    db: Session = Depends(get_db),
+    admin = Depends(security.require_admin)
+):
+    """Body: newline-delimited Paystack webhook payloads."""
+    body = (await request.body()).decode()
+
+    return await run_in_threadpool(
+        webhook_replay.replay_payloads,
+        db,
+        webhook_replay.read_ndjson(body.splitlines()),
+        batch_size,
+    )
@@ -1,13 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models, security
 from app.services.paystack_service import initiate_transfer
-import traceback
+from app.services import payout_service
+from app.metrics import withdrawal_sends
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/admin/withdrawals", tags=["Admin Withdrawals"])
 
 
+@router.post("/send-batch")
+def send_withdrawal_batch(
+    limit: int = Query(payout_service.PAYOUT_BATCH_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    admin = Depends(security.require_admin)
+):
+    """Pay out up to `limit` pending withdrawals via Paystack bulk transfers."""
+    summary = payout_service.send_pending_withdrawals(db, limit=limit)
+    return {
+        "sent": len(summary["sent"]),
+        "skipped_no_bank_account": summary["skipped"],
+        "failed": summary["failed"],
+        "errors": summary["errors"],
+        "elapsed_seconds": summary["elapsed_seconds"],
+    }
+
+
 @router.post("/{transaction_id}/send")
 def send_withdrawal(
     transaction_id: int,
@@ -36,15 +57,19 @@ def send_withdrawal(
         if response.get("status") is True:
             tx.transfer_reference = response["data"]["reference"]
             db.commit()
-            print(f"[Transfer Initiated] Tx:{tx.id} Ref:{tx.transfer_reference}")
+            withdrawal_sends.inc("initiated")
+            logger.info("Transfer initiated for tx %s ref %s", tx.id, tx.transfer_reference)
             return {"status": "transfer initiated"}
         else:
             db.rollback()
-            print("[Transfer Failed Response]", response)
+            withdrawal_sends.inc("rejected")
+            logger.warning("Paystack rejected transfer for tx %s: %s", transaction_id, response.get("message"))
             raise HTTPException(status_code=400, detail="Paystack transfer unavailable. Business upgrade required.")
 
-    except Exception as e:
+    except HTTPException:
+        raise
+    except Exception:
         db.rollback()
-        print("[Admin Withdrawal Error]", e)
-        traceback.print_exc()
+        withdrawal_sends.inc("error")
+        logger.exception("Admin withdrawal send failed for tx %s", transaction_id)
         raise HTTPException(status_code=500, detail="Withdrawal send failed")
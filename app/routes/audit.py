@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from app import database, models, security
 from app.services.audit_service import verify_wallet_balance
 
-router = APIRouter(prefix="/audit", tags=["Audit"])
+router = APIRouter()
 
 @router.get("/wallet/{wallet_id}")
 def audit_wallet(
@@ -1,40 +1,75 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app import models, schemas, security, database
+from app.passwords import PasswordPoolBusy
 
 router = APIRouter()
 
+
+async def _hashing(coro):
+    # Hashing runs on its own bounded pool; shed load instead of queueing forever
+    try:
+        return await coro
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+
 # Register user
 @router.post("/register", response_model=schemas.UserOut, status_code=201)
-def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    existing = db.query(models.User).filter(models.User.email == user.email).first()
+async def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+    def find_existing():
+        return db.query(models.User).filter(models.User.email == user.email).first()
+
+    existing = await run_in_threadpool(find_existing)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = security.hash_password(user.password)
+    hashed_password = await _hashing(security.hasher.hash(user.password))
 
-    db_user = models.User(
-        username=user.username,   # ✅ FIX
-        email=user.email,
-        hashed_password=hashed_password,
-        phone_number = user.phone_number
-    )
+    def create():
+        db_user = models.User(
+            username=user.username,   # ✅ FIX
+            email=user.email,
+            hashed_password=hashed_password,
+            phone_number = user.phone_number
+        )
 
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+        db.add(db_user)
+        db.commit()
+        db.refresh(db_user)
+        return db_user
 
-    return db_user
+    return await run_in_threadpool(create)
 
 # Login user
 @router.post("/login")
-def login(user: schemas.UserLogin, db: Session = Depends(database.get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+async def login(user: schemas.UserLogin, db: Session = Depends(database.get_db)):
+    def find_user():
+        return db.query(models.User).filter(models.User.email == user.email).first()
+
+    db_user = await run_in_threadpool(find_user)
 
-    if not db_user or not security.verify_password(
-        user.password, db_user.hashed_password
-    ):
+    if not db_user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    valid, new_hash = await _hashing(
+        security.hasher.verify_and_update(user.password, db_user.hashed_password)
+    )
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # Transparently upgrade hashes made with older Argon2 parameters
+    if new_hash:
+        def rehash():
+            db_user.hashed_password = new_hash
+            db.commit()
+
+        await run_in_threadpool(rehash)
+
     token = security.create_access_token({"sub": str(db_user.id)})
     return {"access_token": token, "token_type": "bearer"}
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models, security
-from app.services.paystack_service import resolve_bank_account
+from app.services.account_resolver import account_resolver
 
 router = APIRouter(prefix="/bank-accounts", tags=["Bank Accounts"])
 
@@ -14,7 +14,7 @@ def add_bank_account(
     user: models.User = Depends(security.get_current_user)
 ):
     try:
-        resolved = resolve_bank_account(account_number, bank_code)
+        resolved = account_resolver.resolve(account_number, bank_code, db)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
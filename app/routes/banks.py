@@ -1,13 +1,13 @@
 from fastapi import APIRouter, HTTPException
-from app.services.paystack_service import get_banks
+from app.services.bank_directory import bank_directory
 
 router = APIRouter(prefix="/banks", tags=["Banks"])
 
 @router.get("/")
-def list_banks():
-    response = get_banks()
-
-    if not response.get("status"):
+async def list_banks():
+    try:
+        banks = await bank_directory.get_async()
+    except Exception:
         raise HTTPException(status_code=400, detail="Failed to fetch banks")
 
     return [
@@ -15,5 +15,5 @@ def list_banks():
             "name": bank["name"],
             "code": bank["code"]
         }
-        for bank in response["data"]
+        for bank in banks
     ]
\ No newline at end of file
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, HTTPException
-from app.services.paystack_service import resolve_bank_account
+from app.services.account_resolver import account_resolver
 
 router = APIRouter(prefix="/resolve-account", tags=["Bank Resolution"])
 
 @router.post("/")
-def resolve_account(payload: dict):
+async def resolve_account(payload: dict):
     try:
-        result = resolve_bank_account(
+        result = await account_resolver.resolve_async(
             account_number=payload["account_number"],
             bank_code=payload["bank_code"]
         )
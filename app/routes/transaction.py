@@ -1,58 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 from app import database, models, schemas, security
-from app.services import wallet_service, transaction_service
+from app.serialization import FastJSONResponse, TRANSACTION_COLUMNS, TRANSACTION_OUT_COLUMNS, transaction_out, transaction_rows
+from app.services import transaction_service, statement_service
 from datetime import datetime
 router = APIRouter()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 100
+
+
+async def _page(db: AsyncSession, query, limit: int, offset: int, cursor: Optional[str]):
+    """
+    One newest-first page of TransactionOut, fetched as column tuples and
+    encoded directly (same JSON as the response_model, without per-row
+    ORM objects or validation).
+    """
+    try:
+        query = transaction_service.newest_first(query, limit, offset, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = (await db.execute(query)).all()
+
+    response = FastJSONResponse(transaction_out(rows))
+    next_cursor = transaction_service.next_cursor(rows, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    return response
+
+
 @router.get("/my", response_model=List[schemas.TransactionOut])
-def get_my_transactions(
-    limit: int = 20,
-    offset: int=0,
-    db: Session = Depends(database.get_db),
+async def get_my_transactions(
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_db),
     current_user: models.User = Depends(security.get_current_user),
 ):
-    limit = min(limit,100)
-    transactions = (
-        db.query(models.Transaction)
-        .join(models.Wallet)
-        .filter(models.Wallet.user_id == current_user.id)
-        .order_by(models.Transaction.timestamp.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
+    wallet_ids = (
+        await db.execute(
+            select(models.Wallet.id).where(models.Wallet.user_id == current_user.id)
+        )
+    ).scalars().all()
 
-    return transactions
+    # Filter on wallet_id directly so the (wallet_id, timestamp) index is used
+    query = select(*TRANSACTION_OUT_COLUMNS).where(models.Transaction.wallet_id.in_(wallet_ids))
+
+    return await _page(db, query, limit, offset, cursor)
 
 
 @router.get("/wallet/{wallet_id}/transactions", response_model=list[schemas.TransactionOut])
-def get_wallet_transactions(
+async def get_wallet_transactions(
     wallet_id: int,
-    limit: int = 20,
-    offset: int=0,
-    db: Session = Depends(database.get_db),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_db),
     current_user: models.User = Depends(security.get_current_user),
 ):
-    limit = min(limit, 100)
-    wallet = wallet_service.get_wallet(db, wallet_id)
+    wallet = await db.get(models.Wallet, wallet_id)
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
 
     if wallet.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Unauthorized")
 
-    transactions = (
-        db.query(models.Transaction)
-        .filter(models.Transaction.wallet_id == wallet_id)
-        .order_by(models.Transaction.timestamp.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
+    query = select(*TRANSACTION_OUT_COLUMNS).where(models.Transaction.wallet_id == wallet_id)
 
-    return transactions
+    return await _page(db, query, limit, offset, cursor)
 
 
 
@@ -60,10 +81,30 @@ def get_wallet_transactions(
 def account_statement(
     from_date: datetime,
     to_date: datetime,
+    format: Literal["json", "csv", "ndjson"] = "json",
+    gzip: bool = False,
     db: Session = Depends(database.get_db),
     user=Depends(security.get_current_user)
 ):
     wallet = db.query(models.Wallet).filter_by(user_id=user.id).first()
+
+    # Streamed exports: constant memory regardless of range size
+    if format != "json":
+        if not wallet:
+            raise HTTPException(status_code=404, detail="Wallet not found")
+
+        filename = f"statement-{from_date:%Y%m%d}-{to_date:%Y%m%d}.{format}"
+        media_type = statement_service.MEDIA_TYPES[format]
+        if gzip:
+            filename += ".gz"
+            media_type = "application/gzip"
+
+        return StreamingResponse(
+            statement_service.stream_statement(wallet.id, from_date, to_date, format, gzip),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
     if not wallet:
         return {
             "from": from_date,
@@ -71,8 +112,8 @@ def account_statement(
             "count": 0,
             "transactions": []
         }
-    txs = (
-        db.query(models.Transaction)
+    txs = transaction_rows(
+        db.query(*TRANSACTION_COLUMNS)
         .filter(
             models.Transaction.wallet_id == wallet.id,
             models.Transaction.timestamp.between(from_date, to_date)
@@ -80,14 +121,13 @@ def account_statement(
         .order_by(models.Transaction.timestamp.asc())
         .all()
     )
-    
 
-    return {
+    return FastJSONResponse({
         "from": from_date,
         "to": to_date,
         "count": len(txs),
         "transactions": txs
-    }
+    })
 
     
 
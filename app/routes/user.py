@@ -1,7 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app import models, database, security
 from app.schemas import UserOut
+from app.services import balance_service
 
 router = APIRouter()
 
@@ -9,15 +12,17 @@ router = APIRouter()
 # Get Current Logged-in User
 
 @router.get("/me")
-def get_current_user_profile(
+async def get_current_user_profile(
     current_user: models.User = Depends(security.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
 ):
     wallet = (
-        db.query(models.Wallet)
-        .filter(models.Wallet.user_id == current_user.id)
-        .first()
-    )
+        await db.execute(
+            select(models.Wallet)
+            .where(models.Wallet.user_id == current_user.id)
+            .limit(1)
+        )
+    ).scalars().first()
 
     return {
         "id": current_user.id,
@@ -27,7 +32,7 @@ def get_current_user_profile(
         "role": current_user.role,
         "wallet": {
             "id": wallet.id if wallet else None,
-            "balance_kobo": wallet.balance_kobo if wallet else 0,
+            "balance_kobo": await balance_service.total_balance_async(db, wallet) if wallet else 0,
             "currency": wallet.currency if wallet else "NGN",
         }
     }
@@ -1,41 +1,40 @@
 from fastapi import APIRouter, Depends, HTTPException, Header
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
 from typing import Optional
 import uuid
-import requests
-import os
 
 from app import database, models, schemas, security
-from app.services import wallet_service, idempotency_service
-from app.services.paystack_service import resolve_bank_account, initiate_transfer, get_transfer_status
+from app.locking import WalletBusy, lock_wallet, lock_wallets, run_with_retry
+from app.services import wallet_service, bulk_transfer_service, balance_service
+from app.services.idempotency_service import idempotent
+from app.services.fraud_service import FraudService, hold_transfer, velocity
+from app.services.paystack_service import initiate_transfer
+from app.services.bank_directory import bank_directory
+from app.services.account_resolver import account_resolver
 
 router = APIRouter()
 
-PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY")
-PAYSTACK_BASE_URL = "https://api.paystack.co"
-
 
 # -------------------- Utility --------------------
-def lock_wallet(db: Session, wallet_id: int):
-    """Lock a wallet row for updates to prevent race conditions."""
-    return (
-        db.query(models.Wallet)
-        .filter(models.Wallet.id == wallet_id)
-        .with_for_update()
-        .first()
-    )
-
+def wallet_out(db: Session, wallet: models.Wallet):
+    """WalletOut with any shard sub-balances folded into balance_kobo."""
+    out = schemas.WalletOut.model_validate(wallet)
+    balance = balance_service.total_balance(db, wallet)
+    if balance != out.balance_kobo:
+        out = out.model_copy(update={"balance_kobo": balance})
+    return out
 
 
 # -------------------- BANKS --------------------
 @router.get("/banks")
-def list_banks():
-    headers = {"Authorization": f"Bearer {PAYSTACK_SECRET_KEY}"}
-    response = requests.get(f"{PAYSTACK_BASE_URL}/bank?country=nigeria", headers=headers)
-    if response.status_code != 200:
+async def list_banks():
+    try:
+        return await bank_directory.get_async()
+    except Exception:
         raise HTTPException(status_code=400, detail="Failed to fetch banks")
-    return response.json()["data"]
 
 
 # -------------------- WALLET LOOKUP --------------------
@@ -82,19 +81,31 @@ def create_wallet(
 
 # -------------------- GET MY WALLET --------------------
 @router.get("/me", response_model=schemas.WalletOut)
-def get_my_wallet(
+async def get_my_wallet(
     current_user: models.User = Depends(security.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
 ):
-    wallet = db.query(models.Wallet).filter_by(user_id=current_user.id).first()
+    wallet = (
+        await db.execute(
+            select(models.Wallet)
+            .options(joinedload(models.Wallet.owner))
+            .where(models.Wallet.user_id == current_user.id)
+            .limit(1)
+        )
+    ).scalars().first()
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
+
+    balance = await balance_service.total_balance_async(db, wallet)
+    if balance != wallet.balance_kobo:
+        return schemas.WalletOut.model_validate(wallet).model_copy(update={"balance_kobo": balance})
     return wallet
 
 
 
 # -------------------- DEPOSIT --------------------
 @router.post("/{wallet_id}/deposit", response_model=schemas.WalletOut)
+@idempotent("wallets.deposit")
 def deposit(
     wallet_id: int,
     payload: schemas.DepositRequest,
@@ -119,12 +130,7 @@ def deposit(
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
 
-    # Check idempotency
-    existing_tx = idempotency_service.get_existing_transaction(db, wallet_id, idempotency_key)
-    if existing_tx:
-        return wallet  # return previous successful transaction
-
-    try:
+    def apply():
         # Lock wallet for update
         wallet_locked = lock_wallet(db, wallet_id)
         wallet_locked.balance_kobo += payload.amount_kobo
@@ -141,9 +147,11 @@ def deposit(
         db.add(tx)
         db.commit()
         db.refresh(wallet_locked)
-
         return wallet_locked
 
+    try:
+        return wallet_out(db, run_with_retry(db, "wallets.deposit", apply))
+
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=409, detail="Duplicate transaction")
@@ -152,6 +160,7 @@ def deposit(
 
 # -------------------- WITHDRAW --------------------
 @router.post("/{wallet_id}/withdraw", response_model=schemas.WalletOut)
+@idempotent("wallets.withdraw")
 def withdraw(
     wallet_id: int,
     payload: schemas.WithdrawRequest,
@@ -175,14 +184,9 @@ def withdraw(
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
 
-    # Check idempotency
-    existing_tx = idempotency_service.get_existing_transaction(db, wallet_id, idempotency_key)
-    if existing_tx:
-        return wallet  # return previous successful transaction
-
-    try:
+    def apply():
         wallet_locked = lock_wallet(db, wallet_id)
-        if wallet_locked.balance_kobo < payload.amount_kobo:
+        if not balance_service.ensure_available(db, wallet_locked, payload.amount_kobo):
             raise HTTPException(status_code=400, detail="Insufficient funds")
 
         wallet_locked.balance_kobo -= payload.amount_kobo
@@ -200,12 +204,16 @@ def withdraw(
         db.refresh(wallet_locked)
         return wallet_locked
 
+    try:
+        return wallet_out(db, run_with_retry(db, "wallets.withdraw", apply))
+
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=409, detail="Duplicate transaction")
 
 # -------------------- TRANSFER --------------------
 @router.post("/transfer", response_model=schemas.TransferResponse)
+@idempotent("wallets.transfer")
 def transfer(
     payload: schemas.TransferRequest,
     idempotency_key: str = Header(...),
@@ -225,14 +233,6 @@ def transfer(
     if not sender_wallet:
         raise HTTPException(status_code=404, detail="Sender wallet not found")
 
-    # Idempotency check
-    existing_tx = idempotency_service.get_existing_transaction(db, sender_wallet.id, idempotency_key)
-    if existing_tx:
-        return schemas.TransferResponse(
-            sender_wallet=sender_wallet,
-            destination_type=payload.destination_type,
-        )
-
     # ---------- WALLET TO WALLET ----------
     if payload.destination_type == "wallet":
         if not payload.username and not payload.phone_number:
@@ -259,53 +259,63 @@ def transfer(
         if not recipient_wallet:
             raise HTTPException(status_code=404, detail="Recipient wallet not found")
 
-        # Lock both wallets
-        wallets = (
-            db.query(models.Wallet)
-            .options(joinedload(models.Wallet.owner))
-            .filter(models.Wallet.id.in_([sender_wallet.id, recipient_wallet.id]))
-            .with_for_update()
-            .all()
-        )
-        wallet_map = {w.id: w for w in wallets}
-        sender = wallet_map[sender_wallet.id]
-        receiver = wallet_map[recipient_wallet.id]
+        def apply():
+            # Lock both wallets; a sharded recipient is credited without its lock
+            recipient_shards = balance_service.shard_count(db, recipient_wallet.id)
+            lock_ids = [sender_wallet.id] if recipient_shards else [sender_wallet.id, recipient_wallet.id]
+            wallet_map = lock_wallets(db, lock_ids, joinedload(models.Wallet.owner))
+            sender = wallet_map[sender_wallet.id]
+            receiver = wallet_map.get(recipient_wallet.id, recipient_wallet)
 
-        if sender.balance_kobo < payload.amount_kobo:
-            raise HTTPException(status_code=400, detail="Insufficient funds")
+            if not balance_service.ensure_available(db, sender, payload.amount_kobo):
+                raise HTTPException(status_code=400, detail="Insufficient funds")
 
-        try:
-            sender.balance_kobo -= payload.amount_kobo
-            receiver.balance_kobo += payload.amount_kobo
+            # Scored under the sender's lock so its velocity counters are current
+            score, reasons = FraudService.calculate_SCORE(sender.id, receiver.id, payload.amount_kobo)
+            flagged = FraudService.is_flagged(score)
 
-            db.add_all([
-                models.Transaction(
-                    wallet_id=sender.id,
-                    amount_kobo=payload.amount_kobo,
-                    type="transfer_out",
-                    idempotency_key=f"{idempotency_key}:out",
-                    operation_id=str(uuid.uuid4()),
-                    status="success",
-                ),
-                models.Transaction(
+            sender.balance_kobo -= payload.amount_kobo
+            operation_id = str(uuid.uuid4())
+            tx_out = models.Transaction(
+                wallet_id=sender.id,
+                amount_kobo=payload.amount_kobo,
+                type="transfer_out",
+                idempotency_key=f"{idempotency_key}:out",
+                operation_id=operation_id,
+                status="pending" if flagged else "success",
+            )
+            db.add(tx_out)
+
+            if flagged:
+                # Debited but held: the recipient is credited only on approval
+                hold_transfer(db, tx_out, score, reasons, destination_type="wallet", recipient_wallet_id=receiver.id)
+            else:
+                balance_service.credit(db, receiver, payload.amount_kobo, idempotency_key, recipient_shards)
+                db.add(models.Transaction(
                     wallet_id=receiver.id,
                     amount_kobo=payload.amount_kobo,
                     type="transfer_in",
                     idempotency_key=f"{idempotency_key}:in",
-                    operation_id=str(uuid.uuid4()),
+                    operation_id=operation_id,
                     status="success",
-                ),
-            ])
+                ))
             db.commit()
+            velocity.record(sender.id, payload.amount_kobo)
+            return sender, receiver, reasons if flagged else None
+
+        try:
+            sender, receiver, held_for = run_with_retry(db, "wallets.transfer", apply)
         except IntegrityError:
             db.rollback()
             raise HTTPException(status_code=409, detail="Duplicate transaction")
 
         return schemas.TransferResponse(
-            sender_wallet=sender,
-            recipient_wallet=receiver,
+            sender_wallet=wallet_out(db, sender),
+            recipient_wallet=None if held_for else wallet_out(db, receiver),
             destination_type="wallet",
             amount_kobo=payload.amount_kobo,
+            status="held" if held_for else "success",
+            fraud_reasons=held_for,
         )
 
     # ---------- BANK TRANSFER ----------
@@ -314,14 +324,15 @@ def transfer(
         if not payload.bank_code or not payload.account_number:
             raise HTTPException(status_code=400, detail="Bank details required")
 
-        if sender_wallet.balance_kobo < payload.amount_kobo:
+        if balance_service.total_balance(db, sender_wallet) < payload.amount_kobo:
             raise HTTPException(status_code=400, detail="Insufficient funds")
 
         # Resolve account first
         try:
-            resolved = resolve_bank_account(
+            resolved = account_resolver.resolve(
                 payload.account_number,
-                payload.bank_code
+                payload.bank_code,
+                db
             )
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
@@ -330,55 +341,127 @@ def transfer(
 
         reference = str(uuid.uuid4())
 
-        try:
+        def apply():
             # Lock wallet
             wallet_locked = lock_wallet(db, sender_wallet.id)
 
-            if wallet_locked.balance_kobo < payload.amount_kobo:
+            if not balance_service.ensure_available(db, wallet_locked, payload.amount_kobo):
                 raise HTTPException(status_code=400, detail="Insufficient funds")
 
-            # Create pending transaction FIRST
+            score, reasons = FraudService.calculate_SCORE(wallet_locked.id, None, payload.amount_kobo)
+            flagged = FraudService.is_flagged(score)
+
+            # Create pending transaction FIRST; a held one gets its reference
+            # only once approved, so the reconciler leaves it alone until then
             tx = models.Transaction(
                 wallet_id=wallet_locked.id,
                 amount_kobo=payload.amount_kobo,
                 type=models.TransactionType.transfer_out.value,
                 idempotency_key=idempotency_key,
-                transfer_reference=reference,
+                transfer_reference=None if flagged else reference,
                 status=models.TransactionStatus.pending.value,
             )
 
             db.add(tx)
             db.flush()
 
-            # Initiate transfer with Paystack
-            initiate_transfer(
-                amount_kobo=payload.amount_kobo,
-                bank_code=payload.bank_code,
-                account_number=payload.account_number,
-                reference=reference
-            )
+            if flagged:
+                hold_transfer(
+                    db, tx, score, reasons,
+                    destination_type="bank",
+                    bank_code=payload.bank_code,
+                    account_number=payload.account_number,
+                    reference=reference,
+                )
+            else:
+                # Initiate transfer with Paystack
+                initiate_transfer(
+                    amount_kobo=payload.amount_kobo,
+                    bank_code=payload.bank_code,
+                    account_number=payload.account_number,
+                    reference=reference
+                )
 
-            # Debit wallet only if Paystack accepted request
+            # Debit wallet only if Paystack accepted request (or the transfer is held)
             wallet_locked.balance_kobo -= payload.amount_kobo
 
             db.commit()
+            velocity.record(wallet_locked.id, payload.amount_kobo)
             db.refresh(wallet_locked)
+            return wallet_locked, reasons if flagged else None
 
+        try:
+            # Paystack dedupes on `reference`, so a retried attempt can't pay twice
+            wallet_locked, held_for = run_with_retry(db, "wallets.transfer_bank", apply)
+        except (HTTPException, WalletBusy):
+            db.rollback()
+            raise
         except Exception as e:
             db.rollback()
             raise HTTPException(status_code=400, detail=str(e))
 
         return schemas.TransferResponse(
-            sender_wallet=wallet_locked,
-            bank_name="Resolved Bank",
+            sender_wallet=wallet_out(db, wallet_locked),
+            bank_name=bank_directory.bank_name(payload.bank_code),
             account_number=payload.account_number,
             recipient_name=account_name,
             destination_type="bank",
             amount_kobo=payload.amount_kobo,
+            status="held" if held_for else "pending",
+            fraud_reasons=held_for,
         )
     raise HTTPException(status_code=400, detail="Invalid destination type")
 
 
+# -------------------- BULK TRANSFER --------------------
+@router.post("/transfer/bulk", response_model=schemas.BulkTransferResponse)
+@idempotent("wallets.transfer_bulk")
+def bulk_transfer(
+    payload: schemas.BulkTransferRequest,
+    idempotency_key: str = Header(...),
+    current_user: models.User = Depends(security.get_current_user),
+    db: Session = Depends(database.get_db),
+):
+    sender_wallet = (
+        db.query(models.Wallet)
+        .options(joinedload(models.Wallet.owner))
+        .filter(models.Wallet.user_id == current_user.id)
+        .first()
+    )
+    if not sender_wallet:
+        raise HTTPException(status_code=404, detail="Sender wallet not found")
+
+    def apply():
+        sender, total, results, held_for = bulk_transfer_service.apply_bulk_transfer(
+            db, sender_wallet.id, current_user.id, payload.items, idempotency_key
+        )
+        db.commit()
+        if total:
+            # The batch is one transfer to the velocity limits, as it was scored
+            velocity.record(sender.id, total)
+        return sender, total, results, held_for
+
+    try:
+        sender, total, results, held_for = run_with_retry(db, "wallets.transfer_bulk", apply)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Duplicate transaction")
+
+    succeeded = sum(1 for r in results if r["status"] == "success")
+    return schemas.BulkTransferResponse(
+        sender_wallet=wallet_out(db, sender),
+        total_kobo=total,
+        succeeded=succeeded,
+        failed=sum(1 for r in results if r["status"] == "failed"),
+        held=sum(1 for r in results if r["status"] == "held"),
+        fraud_reasons=held_for,
+        results=results,
+    )
+
+
 @router.get("/transfer/status/{reference}")
 def transfer_status(
     reference: str,
@@ -398,18 +481,9 @@ def transfer_status(
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
-   
-    if tx.status == models.TransactionStatus.pending.value:
-        try:
-            ps_data = get_transfer_status(reference)
-            tx.status = ps_data.get("status", tx.status)
-            db.commit()
-            db.refresh(tx)
-        except Exception as e:
-            print(f"Paystack verification failed: {e}")
-
+    # Pending transfers are settled by webhooks and the background reconciler
     return {
         "reference": reference,
         "status": tx.status,
         "amount_kobo": tx.amount_kobo
-    }
\ No newline at end of file
+    }
@@ -4,6 +4,8 @@ import uuid
 
 from app.database import get_db
 from app import models, security
+from app.locking import WalletBusy, lock_wallet, run_with_retry
+from app.services import balance_service
 
 router = APIRouter(prefix="/withdrawals", tags=["Withdrawals"])
 
@@ -17,8 +19,11 @@ def request_withdrawal(
 ):
     wallet = db.query(models.Wallet).filter_by(user_id=user.id).first()
 
-    if wallet.balance_kobo < amount_kobo:
-        raise HTTPException(400, "Insufficient funds")
+    if not wallet:
+        raise HTTPException(404, "Wallet not found")
+
+    if amount_kobo <= 0:
+        raise HTTPException(400, "Invalid amount")
 
     bank_account = db.query(models.BankAccount).filter_by(
         id=bank_account_id,
@@ -30,11 +35,15 @@ def request_withdrawal(
 
     reference = str(uuid.uuid4())
 
-    try:
-        wallet.balance_kobo -= amount_kobo
+    def apply():
+        wallet_locked = lock_wallet(db, wallet.id)
+        if not balance_service.ensure_available(db, wallet_locked, amount_kobo):
+            raise HTTPException(400, "Insufficient funds")
+
+        wallet_locked.balance_kobo -= amount_kobo
 
         tx = models.Transaction(
-            wallet_id=wallet.id,
+            wallet_id=wallet_locked.id,
             amount_kobo=amount_kobo,
             type="withdraw",
             status="pending",
@@ -44,7 +53,12 @@ def request_withdrawal(
         db.add(tx)
         db.commit()
 
-    except:
+    try:
+        run_with_retry(db, "withdrawals.request", apply)
+    except (HTTPException, WalletBusy):
+        db.rollback()
+        raise
+    except Exception:
         db.rollback()
         raise HTTPException(500, "Withdrawal failed")
 
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, computed_field
+from pydantic import BaseModel, EmailStr, Field, computed_field
 from datetime import datetime
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 
 class UserCreate(BaseModel):
     username: str
@@ -94,11 +94,50 @@ class TransferResponse(BaseModel):
 
     destination_type: Literal["wallet", "bank"]
 
+    # "held" when fraud scoring parked the transfer for review
+    status: Optional[Literal["success", "pending", "held"]] = None
+    fraud_reasons: Optional[List[str]] = None
+
     model_config = {
         "from_attributes": True
     }
 
 
+# Bulk wallet-to-wallet transfers (payroll, disbursements)
+BULK_TRANSFER_MAX_ITEMS = 5000
+
+
+class BulkTransferItem(BaseModel):
+    amount_kobo: int
+    username: Optional[str] = None
+    phone_number: Optional[str] = None
+
+
+class BulkTransferRequest(BaseModel):
+    items: List[BulkTransferItem] = Field(..., min_length=1, max_length=BULK_TRANSFER_MAX_ITEMS)
+
+
+class BulkTransferItemResult(BaseModel):
+    index: int
+    amount_kobo: int
+    username: Optional[str] = None
+    phone_number: Optional[str] = None
+    recipient_wallet_id: Optional[int] = None
+    # "held" when the batch was flagged by fraud scoring and awaits review
+    status: Literal["success", "failed", "held"]
+    error: Optional[str] = None
+
+
+class BulkTransferResponse(BaseModel):
+    sender_wallet: WalletOut
+    total_kobo: int
+    succeeded: int
+    failed: int
+    held: int = 0
+    fraud_reasons: Optional[List[str]] = None
+    results: List[BulkTransferItemResult]
+
+
 class WalletLookupResponse(BaseModel):
     username: str
     phone_number: Optional[str] = None
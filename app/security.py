@@ -1,11 +1,16 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Optional
+import os
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from app import database, models
-from sqlalchemy.orm import Session  # ✅ ADD THIS
+from app.passwords import pwd_context, hash_password, verify_password, hasher  # noqa: F401
+from app.cache import TTLCache
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session  # ✅ ADD THIS
 
 security = HTTPBearer()
 
@@ -13,18 +18,9 @@ SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(
-    schemes=["argon2"],
-    deprecated="auto"
-)
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
 
-# Password hashing
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-    
 # JWT token creation
 def create_access_token(data: dict, expires_delta: int = None):
     to_encode = data.copy()
@@ -40,24 +36,82 @@ def decode_access_token(token: str):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# -------------------- Principal cache --------------------
+@dataclass(frozen=True)
+class Principal:
+    """Immutable snapshot of the authenticated user, safe to share across requests."""
+    id: int
+    email: str
+    username: Optional[str]
+    role: str
+    phone_number: str
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            role=user.role,
+            phone_number=user.phone_number,
+        )
+
+
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def invalidate_principal(user_id: int):
+    principal_cache.pop(user_id)
+
+
+# Changed users are evicted only once their transaction commits: evicting
+# at flush would let a concurrent request re-read the old row and cache it
+# again for the full TTL
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_on_change(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        invalidate_principal(target.id)
+        return
+    session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_principal(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session):
+    session.info.pop("changed_user_ids", None)
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(database.get_db),
-):
+) -> Principal:
     token = credentials.credentials
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = int(payload.get("sub"))
-    except (JWTError, ValueError):
+    except (JWTError, ValueError, TypeError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    principal = principal_cache.get(user_id)
+    if principal:
+        return principal
+
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.set(user_id, principal)
+    return principal
 
-def require_admin(current_user: models.User = Depends(get_current_user)):
+def require_admin(current_user: Principal = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
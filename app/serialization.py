@@ -0,0 +1,72 @@
+"""
+Fast JSON path for large listings: select plain column tuples, build the
+response dicts directly and encode them with orjson, skipping ORM object
+construction and per-row Pydantic validation. The JSON matches what the
+slow path (response_model / jsonable_encoder on ORM rows) produced.
+"""
+from datetime import date, datetime
+import json
+
+from sqlalchemy import inspect
+from starlette.responses import Response
+
+from app import models
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# -------------------- Transactions --------------------
+# schemas.TransactionOut, in field order
+TRANSACTION_OUT_COLUMNS = (
+    models.Transaction.id,
+    models.Transaction.wallet_id,
+    models.Transaction.amount_kobo,
+    models.Transaction.type,
+    models.Transaction.timestamp,
+)
+
+# Every mapped column, as jsonable_encoder emits for a raw ORM row
+TRANSACTION_FIELDS = tuple(attr.key for attr in inspect(models.Transaction).column_attrs)
+TRANSACTION_COLUMNS = tuple(getattr(models.Transaction, key) for key in TRANSACTION_FIELDS)
+
+
+def transaction_out(rows) -> list:
+    """Rows of TRANSACTION_OUT_COLUMNS -> schemas.TransactionOut JSON objects."""
+    return [
+        {
+            "id": tx_id,
+            "wallet_id": wallet_id,
+            "amount_kobo": amount_kobo,
+            "type": tx_type,
+            "timestamp": timestamp,
+            "amount_naira": amount_kobo / 100,
+        }
+        for tx_id, wallet_id, amount_kobo, tx_type, timestamp in rows
+    ]
+
+
+def transaction_rows(rows) -> list:
+    """Rows of TRANSACTION_COLUMNS -> full transaction JSON objects."""
+    return [dict(zip(TRANSACTION_FIELDS, row)) for row in rows]
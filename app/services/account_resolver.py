@@ -0,0 +1,203 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import TTLCache
+from app.database import SessionLocal
+from app.services import paystack_service
+
+load_dotenv()
+
+ACCOUNT_RESOLUTION_CACHE_SIZE = int(os.getenv("ACCOUNT_RESOLUTION_CACHE_SIZE", "10000"))
+ACCOUNT_RESOLUTION_TTL_SECONDS = float(os.getenv("ACCOUNT_RESOLUTION_TTL_SECONDS", "86400"))
+# Longest a coalesced caller waits on the leader's lookup before giving up
+ACCOUNT_RESOLUTION_WAIT_SECONDS = float(os.getenv("ACCOUNT_RESOLUTION_WAIT_SECONDS", "30"))
+
+
+class AccountResolver:
+    """
+    Bank account resolution with three tiers: an in-memory LRU+TTL cache,
+    already-verified BankAccount rows, then Paystack.
+
+    Concurrent lookups of the same (account_number, bank_code) are
+    coalesced: the first caller queries upstream and the rest wait on
+    its result. Only successful resolutions are cached.
+    """
+
+    def __init__(
+        self,
+        max_size: int = ACCOUNT_RESOLUTION_CACHE_SIZE,
+        ttl: float = ACCOUNT_RESOLUTION_TTL_SECONDS,
+        wait_seconds: float = ACCOUNT_RESOLUTION_WAIT_SECONDS,
+    ):
+        self._cache = TTLCache(max_size, ttl)
+        self.wait_seconds = wait_seconds
+        self._in_flight: dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "wait_timeouts": 0,
+        }
+
+    # -------------------- Memory tier --------------------
+    def _get_cached(self, key: tuple) -> Optional[dict]:
+        value = self._cache.get(key)
+        if value is None:
+            return None
+
+        self.stats["memory_hits"] += 1
+        return dict(value)
+
+    def _put(self, key: tuple, value: dict):
+        self._cache.set(key, dict(value))
+
+    # -------------------- DB tier --------------------
+    def _from_db(self, key: tuple, db: Optional[Session] = None) -> Optional[dict]:
+        account_number, bank_code = key
+        session = db or SessionLocal()
+        try:
+            account = (
+                session.query(models.BankAccount)
+                .filter_by(bank_code=bank_code, account_number=account_number)
+                .first()
+            )
+        finally:
+            if db is None:
+                session.close()
+
+        if not account:
+            return None
+
+        self.stats["db_hits"] += 1
+        return {
+            "account_name": account.account_name,
+            "account_number": account.account_number,
+            "bank_code": bank_code,
+        }
+
+    # -------------------- Single flight --------------------
+    def _join_or_lead(self, key: tuple) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future:
+                self.stats["coalesced"] += 1
+                return future, False
+
+            future = Future()
+            self._in_flight[key] = future
+            return future, True
+
+    def _finish(self, key: tuple, future: Future, value: dict = None, error: BaseException = None):
+        """
+        Settle the leader's future and free the key. Called from a `finally`,
+        so it also runs when the leader is cancelled (client disconnect):
+        otherwise every later lookup of the key would wait on it forever.
+        """
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+        if value is not None:
+            self._put(key, value)
+            future.set_result(value)
+            return
+
+        self.stats["errors"] += 1
+        if not isinstance(error, Exception):
+            # Cancelled or interrupted: followers get an ordinary error, not our cancellation
+            error = ValueError("Account resolution was interrupted; please retry")
+        future.set_exception(error)
+
+    def _timed_out(self):
+        self.stats["wait_timeouts"] += 1
+        return ValueError("Account resolution is taking too long; please retry")
+
+    # -------------------- Resolve --------------------
+    def resolve(self, account_number: str, bank_code: str, db: Optional[Session] = None) -> dict:
+        key = (account_number, bank_code)
+
+        cached = self._get_cached(key)
+        if cached:
+            return cached
+
+        future, leader = self._join_or_lead(key)
+        if not leader:
+            try:
+                return dict(future.result(timeout=self.wait_seconds))
+            except FutureTimeout:
+                raise self._timed_out() from None
+
+        value, error = None, None
+        try:
+            value = self._from_db(key, db)
+            if value is None:
+                self.stats["misses"] += 1
+                value = paystack_service.resolve_bank_account(account_number, bank_code)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._finish(key, future, value, error)
+        return dict(value)
+
+    async def resolve_async(self, account_number: str, bank_code: str) -> dict:
+        key = (account_number, bank_code)
+
+        cached = self._get_cached(key)
+        if cached:
+            return cached
+
+        future, leader = self._join_or_lead(key)
+        if not leader:
+            # shield: a cancelled follower must not cancel the shared future
+            try:
+                return dict(await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(future)), self.wait_seconds,
+                ))
+            except asyncio.TimeoutError:
+                raise self._timed_out() from None
+
+        value, error = None, None
+        try:
+            value = await run_in_threadpool(self._from_db, key)
+            if value is None:
+                self.stats["misses"] += 1
+                value = await paystack_service.resolve_bank_account_async(account_number, bank_code)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._finish(key, future, value, error)
+        return dict(value)
+
+    def snapshot(self) -> dict:
+        size = len(self._cache)
+        with self._lock:
+            in_flight = len(self._in_flight)
+
+        lookups = sum(self.stats[k] for k in ("memory_hits", "db_hits", "misses", "coalesced"))
+        hits = self.stats["memory_hits"] + self.stats["db_hits"] + self.stats["coalesced"]
+
+        return {
+            **self.stats,
+            "size": size,
+            "max_size": self._cache.max_size,
+            "in_flight": in_flight,
+            "hit_ratio": hits / lookups if lookups else None,
+        }
+
+    def clear(self):
+        self._cache.clear()
+
+
+account_resolver = AccountResolver()
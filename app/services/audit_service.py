@@ -1,3 +1,9 @@
+from datetime import datetime, timedelta
+from typing import Optional
+import os
+
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app import models
 
@@ -8,51 +14,212 @@ TX_SIGN = {
     "transfer_out": -1,
 }
 
-def verify_wallet_balance(db: Session, wallet: models.Wallet) -> dict:
-    transactions = (
-        db.query(models.Transaction)
-        .filter(models.Transaction.wallet_id == wallet.id)
-        .all()
+# Statuses whose amount is reflected in the wallet balance. Pending debits
+# are taken up front; failed/reversed ones have already been refunded.
+LEDGER_STATUSES = ("success", "pending")
+
+CHECKPOINT_INTERVAL_SECONDS = int(os.getenv("AUDIT_CHECKPOINT_INTERVAL_SECONDS", "3600"))
+CHECKPOINT_SETTLE_SECONDS = int(os.getenv("AUDIT_CHECKPOINT_SETTLE_SECONDS", "300"))
+
+
+def signed_amount():
+    """SQL expression for a transaction's signed effect on its wallet."""
+    sign = case(TX_SIGN, value=models.Transaction.type, else_=0)
+    return case(
+        (
+            models.Transaction.status.in_(LEDGER_STATUSES),
+            models.Transaction.amount_kobo * sign,
+        ),
+        else_=0,
     )
 
-    calculated_balance = sum(
-        tx.amount_kobo * TX_SIGN.get(tx.type, 0)
-        for tx in transactions
+
+# -------------------- Shards --------------------
+def shard_balances():
+    """Per-wallet sum of shard sub-balances, for joining onto wallets."""
+    return (
+        select(
+            models.WalletShard.wallet_id.label("wallet_id"),
+            func.sum(models.WalletShard.balance_kobo).label("shard_balance_kobo"),
+        )
+        .group_by(models.WalletShard.wallet_id)
+        .subquery("shards")
+    )
+
+
+def shard_balance(db: Session, wallet_id: int) -> int:
+    return db.execute(
+        select(func.coalesce(func.sum(models.WalletShard.balance_kobo), 0))
+        .where(models.WalletShard.wallet_id == wallet_id)
+    ).scalar()
+
+
+# -------------------- Checkpoints --------------------
+def get_checkpoint(db: Session, wallet_id: int) -> Optional[models.BalanceCheckpoint]:
+    return db.get(models.BalanceCheckpoint, wallet_id)
+
+
+def checkpoint_info(checkpoint: Optional[models.BalanceCheckpoint]) -> Optional[dict]:
+    if not checkpoint:
+        return None
+    return {
+        "last_transaction_id": checkpoint.last_transaction_id,
+        "verified_balance_kobo": checkpoint.verified_balance_kobo,
+        "verified_at": checkpoint.verified_at,
+    }
+
+
+def ledger_since(db: Session, wallet_id: int, checkpoint=None) -> tuple[int, int]:
+    """Signed total and row count of a wallet's transactions after `checkpoint`."""
+    after_id = checkpoint.last_transaction_id if checkpoint else 0
+
+    total, count = db.execute(
+        select(
+            func.coalesce(func.sum(signed_amount()), 0),
+            func.count(models.Transaction.id),
+        ).where(
+            models.Transaction.wallet_id == wallet_id,
+            models.Transaction.id > after_id,
+        )
+    ).one()
+
+    return total, count
+
+
+def checkpoint_wallets(db: Session, settle_seconds: int = CHECKPOINT_SETTLE_SECONDS) -> int:
+    """
+    Roll every wallet's checkpoint forward over its settled transactions.
+
+    A checkpoint never moves past a wallet's oldest pending transaction,
+    since that row's status (and so its signed amount) can still change,
+    nor past rows younger than `settle_seconds`, so late-committing
+    inserts with lower ids are not skipped. Safe to run concurrently: a
+    checkpoint moved by another run meanwhile is left to that run. Returns
+    wallets checkpointed.
+    """
+    settle_before = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    horizon_id = db.execute(
+        select(func.max(models.Transaction.id))
+        .where(models.Transaction.timestamp <= settle_before)
+    ).scalar()
+
+    if horizon_id is None:
+        return 0
+
+    first_pending = (
+        select(
+            models.Transaction.wallet_id.label("wallet_id"),
+            func.min(models.Transaction.id).label("first_pending_id"),
+        )
+        .where(models.Transaction.status == "pending")
+        .group_by(models.Transaction.wallet_id)
+        .subquery("first_pending")
     )
+    checkpoint = models.BalanceCheckpoint
+
+    rows = db.execute(
+        select(
+            models.Transaction.wallet_id,
+            func.coalesce(func.sum(signed_amount()), 0).label("delta_kobo"),
+            func.max(models.Transaction.id).label("last_transaction_id"),
+            checkpoint.last_transaction_id.label("checkpoint_id"),
+        )
+        .outerjoin(checkpoint, checkpoint.wallet_id == models.Transaction.wallet_id)
+        .outerjoin(first_pending, first_pending.c.wallet_id == models.Transaction.wallet_id)
+        .where(
+            models.Transaction.id <= horizon_id,
+            models.Transaction.id > func.coalesce(checkpoint.last_transaction_id, 0),
+            or_(
+                first_pending.c.first_pending_id.is_(None),
+                models.Transaction.id < first_pending.c.first_pending_id,
+            ),
+        )
+        .group_by(models.Transaction.wallet_id, checkpoint.last_transaction_id)
+    ).all()
+
+    # Each delta was summed from the checkpoint as it was read. Another run
+    # (another worker, or the admin endpoint) may have moved it since, so
+    # only apply a delta to the checkpoint it was computed from
+    now = datetime.utcnow()
+    advanced = 0
+    for row in rows:
+        if row.checkpoint_id is not None:
+            result = db.execute(
+                update(checkpoint)
+                .where(
+                    checkpoint.wallet_id == row.wallet_id,
+                    checkpoint.last_transaction_id == row.checkpoint_id,
+                )
+                .values(
+                    verified_balance_kobo=checkpoint.verified_balance_kobo + row.delta_kobo,
+                    last_transaction_id=row.last_transaction_id,
+                    verified_at=now,
+                )
+            )
+            advanced += result.rowcount
+            continue
 
-    is_valid = calculated_balance == wallet.balance_kobo
+        savepoint = db.begin_nested()
+        try:
+            db.add(checkpoint(
+                wallet_id=row.wallet_id,
+                last_transaction_id=row.last_transaction_id,
+                verified_balance_kobo=row.delta_kobo,
+                verified_at=now,
+            ))
+            savepoint.commit()
+            advanced += 1
+        except IntegrityError:
+            # Created by a concurrent run meanwhile
+            savepoint.rollback()
+
+    db.commit()
+    return advanced
+
+
+# -------------------- Audits --------------------
+def verify_wallet_balance(db: Session, wallet: models.Wallet) -> dict:
+    checkpoint = get_checkpoint(db, wallet.id)
+    delta, scanned = ledger_since(db, wallet.id, checkpoint)
+
+    calculated_balance = delta + (checkpoint.verified_balance_kobo if checkpoint else 0)
+    shards = shard_balance(db, wallet.id)
+    stored_balance = wallet.balance_kobo + shards
+
+    is_valid = calculated_balance == stored_balance
 
     return {
         "wallet_id": wallet.id,
-        "stored_balance_kobo": wallet.balance_kobo,
+        "stored_balance_kobo": stored_balance,
+        "shard_balance_kobo": shards,
         "calculated_balance_kobo": calculated_balance,
         "valid": is_valid,
+        "checkpoint": checkpoint_info(checkpoint),
+        "delta_transaction_count": scanned,
     }
 
 def recalculate_wallet_balance(db: Session, wallet_id: int):
-    txs = (
-        db.query(models.Transaction)
-        .filter(models.Transaction.wallet_id == wallet_id)
-        .all()
-    )
-
-    calculated_balance = 0
+    checkpoint = get_checkpoint(db, wallet_id)
+    delta, scanned = ledger_since(db, wallet_id, checkpoint)
 
-    for tx in txs:
-        calculated_balance += tx.amount_kobo * TX_SIGN.get(tx.type, 0)
+    calculated_balance = delta + (checkpoint.verified_balance_kobo if checkpoint else 0)
 
     wallet = db.query(models.Wallet).filter_by(id=wallet_id).first()
+    shards = shard_balance(db, wallet_id)
+    stored_balance = wallet.balance_kobo + shards if wallet else None
 
     difference = (
-        calculated_balance - wallet.balance_kobo
+        calculated_balance - stored_balance
         if wallet else None
     )
 
     return {
         "wallet_id": wallet_id,
-        "stored_balance_kobo": wallet.balance_kobo if wallet else None,
+        "stored_balance_kobo": stored_balance,
+        "shard_balance_kobo": shards,
         "calculated_balance_kobo": calculated_balance,
         "difference_kobo": difference,
         "valid": difference == 0,
-        "transaction_count": len(txs),
+        "checkpoint": checkpoint_info(checkpoint),
+        "delta_transaction_count": scanned,
     }
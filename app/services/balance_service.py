@@ -0,0 +1,189 @@
+import os
+import zlib
+
+from dotenv import load_dotenv
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import TTLCache
+from app.locking import lock_wallet
+
+load_dotenv()
+
+MAX_WALLET_SHARDS = int(os.getenv("MAX_WALLET_SHARDS", "64"))
+SHARD_CACHE_SIZE = int(os.getenv("SHARD_CACHE_SIZE", "100000"))
+# How long a process may keep crediting a wallet the old way after
+# sharding is enabled elsewhere; both ways are correct, just slower
+SHARD_CACHE_TTL_SECONDS = float(os.getenv("SHARD_CACHE_TTL_SECONDS", "30"))
+
+# wallet id -> number of shards (0 = not sharded)
+shard_cache = TTLCache(SHARD_CACHE_SIZE, SHARD_CACHE_TTL_SECONDS)
+
+
+# -------------------- Shard lookup --------------------
+def shard_count(db: Session, wallet_id: int) -> int:
+    count = shard_cache.get(wallet_id)
+    if count is None:
+        count = db.execute(
+            select(func.count()).where(models.WalletShard.wallet_id == wallet_id)
+        ).scalar()
+        shard_cache.set(wallet_id, count)
+    return count
+
+
+def shard_counts(db: Session, wallet_ids) -> dict:
+    """shard_count for many wallets, with one query for the cache misses."""
+    counts, missing = {}, []
+    for wallet_id in set(wallet_ids):
+        count = shard_cache.get(wallet_id)
+        if count is None:
+            missing.append(wallet_id)
+        else:
+            counts[wallet_id] = count
+
+    if missing:
+        found = dict(
+            db.query(models.WalletShard.wallet_id, func.count())
+            .filter(models.WalletShard.wallet_id.in_(missing))
+            .group_by(models.WalletShard.wallet_id)
+            .all()
+        )
+        for wallet_id in missing:
+            counts[wallet_id] = found.get(wallet_id, 0)
+            shard_cache.set(wallet_id, counts[wallet_id])
+
+    return counts
+
+
+def shard_for(key: str, count: int) -> int:
+    # crc32 rather than hash(): it must agree across processes
+    return zlib.crc32(key.encode()) % count
+
+
+# -------------------- Credits --------------------
+def credit(db: Session, wallet: models.Wallet, amount_kobo: int, key: str, shards: int = None):
+    """
+    Add to a wallet's balance.
+
+    Unsharded wallets must already be locked by the caller. Sharded wallets
+    need no wallet lock: the credit lands on one shard row picked by `key`,
+    so concurrent payers only contend when they hash to the same shard.
+    """
+    if shards is None:
+        shards = shard_count(db, wallet.id)
+
+    if not shards:
+        wallet.balance_kobo += amount_kobo
+        return
+
+    result = db.execute(
+        update(models.WalletShard)
+        .where(
+            models.WalletShard.wallet_id == wallet.id,
+            models.WalletShard.shard_no == shard_for(key, shards),
+        )
+        .values(balance_kobo=models.WalletShard.balance_kobo + amount_kobo)
+    )
+    if result.rowcount == 0:
+        # Sharding was turned off since we cached the count
+        shard_cache.pop(wallet.id)
+        db.execute(
+            update(models.Wallet)
+            .where(models.Wallet.id == wallet.id)
+            .values(balance_kobo=models.Wallet.balance_kobo + amount_kobo)
+        )
+        db.expire(wallet, ["balance_kobo"])
+
+
+# -------------------- Debits --------------------
+def collect(db: Session, wallet: models.Wallet) -> int:
+    """Sweep shard balances into the (locked) wallet row. Returns kobo moved."""
+    shards = (
+        db.query(models.WalletShard)
+        .filter(models.WalletShard.wallet_id == wallet.id)
+        .order_by(models.WalletShard.shard_no)
+        .with_for_update()
+        .all()
+    )
+    moved = 0
+    for shard in shards:
+        moved += shard.balance_kobo
+        shard.balance_kobo = 0
+    wallet.balance_kobo += moved
+    return moved
+
+
+def ensure_available(db: Session, wallet: models.Wallet, amount_kobo: int) -> bool:
+    """
+    Whether a locked wallet can be debited `amount_kobo`. Shards are only
+    swept (and so only locked) when the wallet row alone can't cover it.
+    """
+    if wallet.balance_kobo >= amount_kobo:
+        return True
+    if shard_count(db, wallet.id):
+        collect(db, wallet)
+    return wallet.balance_kobo >= amount_kobo
+
+
+# -------------------- Reads --------------------
+def total_balance(db: Session, wallet: models.Wallet) -> int:
+    if not shard_count(db, wallet.id):
+        return wallet.balance_kobo
+    shard_total = db.execute(
+        select(func.coalesce(func.sum(models.WalletShard.balance_kobo), 0))
+        .where(models.WalletShard.wallet_id == wallet.id)
+    ).scalar()
+    return wallet.balance_kobo + shard_total
+
+
+async def total_balance_async(db: AsyncSession, wallet: models.Wallet) -> int:
+    if shard_cache.get(wallet.id) == 0:
+        return wallet.balance_kobo
+
+    count, shard_total = (await db.execute(
+        select(func.count(), func.coalesce(func.sum(models.WalletShard.balance_kobo), 0))
+        .where(models.WalletShard.wallet_id == wallet.id)
+    )).one()
+    shard_cache.set(wallet.id, count)
+    return wallet.balance_kobo + shard_total
+
+
+# -------------------- Admin --------------------
+def enable_sharding(db: Session, wallet_id: int, shards: int) -> int:
+    """Give a wallet `shards` sub-balances (growing only). Commits."""
+    if not 1 <= shards <= MAX_WALLET_SHARDS:
+        raise ValueError(f"Shard count must be between 1 and {MAX_WALLET_SHARDS}")
+
+    wallet = lock_wallet(db, wallet_id)
+    if not wallet:
+        raise ValueError("Wallet not found")
+
+    existing = shard_count(db, wallet_id)
+    if shards < existing:
+        raise ValueError("Shard count can only grow; disable sharding first")
+
+    db.add_all([
+        models.WalletShard(wallet_id=wallet_id, shard_no=n, balance_kobo=0)
+        for n in range(existing, shards)
+    ])
+    db.commit()
+    shard_cache.set(wallet_id, shards)
+    return shards
+
+
+def disable_sharding(db: Session, wallet_id: int) -> int:
+    """Fold all shards back into the wallet row and drop them. Commits."""
+    wallet = lock_wallet(db, wallet_id)
+    if not wallet:
+        raise ValueError("Wallet not found")
+
+    moved = collect(db, wallet)
+    db.flush()
+    db.query(models.WalletShard)\
+        .filter(models.WalletShard.wallet_id == wallet_id)\
+        .delete(synchronize_session=False)
+    db.commit()
+    shard_cache.set(wallet_id, 0)
+    return moved
@@ -0,0 +1,135 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from app.services import paystack_service
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BANK_DIRECTORY_TTL_SECONDS = float(os.getenv("BANK_DIRECTORY_TTL_SECONDS", "86400"))
+# Start a background refresh once this fraction of the TTL has elapsed
+BANK_DIRECTORY_REFRESH_AHEAD = float(os.getenv("BANK_DIRECTORY_REFRESH_AHEAD", "0.8"))
+# After a failed refresh, serve the stale list this long before retrying
+BANK_DIRECTORY_RETRY_SECONDS = float(os.getenv("BANK_DIRECTORY_RETRY_SECONDS", "60"))
+
+
+class BankDirectory:
+    """
+    Cached Paystack bank list with a code -> name index.
+
+    Entries are served from memory until `ttl` expires. Past the
+    refresh-ahead point a background thread refetches them, and if the
+    provider fails the last good list keeps being served (stale while
+    revalidate). Failed refreshes back off for BANK_DIRECTORY_RETRY_SECONDS.
+    """
+
+    def __init__(self, ttl: float = BANK_DIRECTORY_TTL_SECONDS, refresh_ahead: float = BANK_DIRECTORY_REFRESH_AHEAD):
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.banks: list[dict] = []
+        self.by_code: dict[str, str] = {}
+        self.fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._retry_at = 0.0
+
+    # -------------------- State --------------------
+    def _age(self) -> float:
+        return time.monotonic() - self.fetched_at if self.fetched_at is not None else float("inf")
+
+    def _store(self, response: dict):
+        if not response.get("status"):
+            raise ValueError(response.get("message", "Failed to fetch banks"))
+
+        banks = response["data"]
+        with self._lock:
+            self.banks = banks
+            self.by_code = {bank["code"]: bank["name"] for bank in banks}
+            self.fetched_at = time.monotonic()
+
+    def _serve_stale_or_raise(self, error: Exception):
+        self._retry_at = time.monotonic() + BANK_DIRECTORY_RETRY_SECONDS
+        if not self.banks:
+            raise error
+        logger.warning("Bank directory serving stale list: %s", error)
+
+    def _expired(self) -> bool:
+        return self._age() >= self.ttl and time.monotonic() >= self._retry_at
+
+    # -------------------- Refresh --------------------
+    def refresh(self):
+        try:
+            self._store(paystack_service.get_banks())
+        except Exception as e:
+            self._serve_stale_or_raise(e)
+        finally:
+            self._refreshing = False
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Bank directory refresh failed")
+
+        threading.Thread(target=run, name="Bank Directory Refresh", daemon=True).start()
+
+    def _needs_refresh_ahead(self) -> bool:
+        return (
+            self._age() >= self.ttl * self.refresh_ahead
+            and time.monotonic() >= self._retry_at
+        )
+
+    # -------------------- Access --------------------
+    def get(self) -> list[dict]:
+        if self._expired():
+            self.refresh()
+        elif self._needs_refresh_ahead():
+            self._refresh_in_background()
+
+        return self._available()
+
+    async def get_async(self) -> list[dict]:
+        if self._expired():
+            try:
+                self._store(await paystack_service.get_banks_async())
+            except Exception as e:
+                self._serve_stale_or_raise(e)
+        elif self._needs_refresh_ahead():
+            self._refresh_in_background()
+
+        return self._available()
+
+    def _available(self) -> list[dict]:
+        if not self.banks:
+            raise ValueError("Bank directory unavailable")
+        return self.banks
+
+    def bank_name(self, code: str) -> Optional[str]:
+        """Name for a bank code, or None if unknown or the directory is unavailable."""
+        try:
+            self.get()
+        except Exception:
+            return None
+        return self.by_code.get(code)
+
+    def clear(self):
+        with self._lock:
+            self.banks = []
+            self.by_code = {}
+            self.fetched_at = None
+            self._retry_at = 0.0
+
+
+bank_directory = BankDirectory()
@@ -0,0 +1,203 @@
+from datetime import datetime
+import json
+import uuid
+
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import Session, joinedload
+
+from app import models
+from app.locking import lock_wallets
+from app.services import balance_service
+from app.services.fraud_service import FraudService, hold_transfer
+
+
+def item_key(idempotency_key: str, index: int, direction: str) -> str:
+    return f"{idempotency_key}:{index}:{direction}"
+
+
+def _resolve_recipients(db: Session, items: list) -> tuple[dict, dict]:
+    """Map usernames and phone numbers to (user_id, wallet_id) in one query."""
+    usernames = list({item.username for item in items if item.username})
+    phones = list({item.phone_number for item in items if item.phone_number and not item.username})
+
+    filters = []
+    if usernames:
+        filters.append(models.User.username.in_(usernames))
+    if phones:
+        filters.append(models.User.phone_number.in_(phones))
+    if not filters:
+        return {}, {}
+
+    rows = (
+        db.query(models.User.id, models.User.username, models.User.phone_number, models.Wallet.id)
+        .outerjoin(models.Wallet, models.Wallet.user_id == models.User.id)
+        .filter(or_(*filters))
+        .order_by(models.User.id, models.Wallet.id)
+        .all()
+    )
+
+    by_username, by_phone = {}, {}
+    for user_id, username, phone_number, wallet_id in rows:
+        # First wallet per user, as the single transfer does
+        by_username.setdefault(username, (user_id, wallet_id))
+        by_phone.setdefault(phone_number, (user_id, wallet_id))
+    return by_username, by_phone
+
+
+def _result(index: int, item, wallet_id=None, error=None) -> dict:
+    return {
+        "index": index,
+        "amount_kobo": item.amount_kobo,
+        "username": item.username,
+        "phone_number": item.phone_number,
+        "recipient_wallet_id": wallet_id,
+        "status": "failed" if error else "success",
+        "error": error,
+    }
+
+
+def _row(wallet_id: int, amount_kobo: int, type: models.TransactionType, key: str, operation_id: str, now) -> dict:
+    return {
+        "wallet_id": wallet_id,
+        "amount_kobo": amount_kobo,
+        "type": type.value,
+        "idempotency_key": key,
+        "operation_id": operation_id,
+        "status": models.TransactionStatus.success.value,
+        "currency": "NGN",
+        "timestamp": now,
+    }
+
+
+def _credit_recipients(db: Session, payable: list, wallets: dict, shards: dict, idempotency_key: str):
+    """Credit every (index, amount_kobo, wallet_id) item; unsharded recipients must be locked in `wallets`."""
+    credits = {}
+    for index, amount_kobo, wallet_id in payable:
+        if shards[wallet_id]:
+            # Shard picked per item, so one payroll spreads over all shards
+            wallet = wallets.get(wallet_id) or db.get(models.Wallet, wallet_id)
+            balance_service.credit(db, wallet, amount_kobo, item_key(idempotency_key, index, "in"), shards[wallet_id])
+        else:
+            credits[wallet_id] = credits.get(wallet_id, 0) + amount_kobo
+    for wallet_id, amount in credits.items():
+        wallets[wallet_id].balance_kobo += amount
+
+
+def _hold_batch(db: Session, sender: models.Wallet, payable: list, total: int, idempotency_key: str, score: int, reasons: list):
+    """Debit the sender with one held transfer_out for the batch; recipients are credited on approval."""
+    tx = models.Transaction(
+        wallet_id=sender.id,
+        amount_kobo=total,
+        type=models.TransactionType.transfer_out.value,
+        idempotency_key=f"{idempotency_key}:out",
+        operation_id=str(uuid.uuid4()),
+        status=models.TransactionStatus.pending.value,
+        currency="NGN",
+    )
+    db.add(tx)
+    sender.balance_kobo -= total
+    hold_transfer(db, tx, score, reasons, destination_type="bulk", items=json.dumps(payable))
+
+
+def release_held_batch(db: Session, hold: models.FraudHold):
+    """
+    Credit every recipient of an approved bulk hold. The transfer_in rows
+    share the held transfer_out's operation_id. Does not commit.
+    """
+    tx = hold.transaction
+    payable = [tuple(item) for item in json.loads(hold.items)]
+
+    recipient_ids = {wallet_id for _, _, wallet_id in payable}
+    shards = balance_service.shard_counts(db, recipient_ids)
+    unsharded = {w for w in recipient_ids if not shards[w]}
+    wallets = lock_wallets(db, unsharded)
+    if len(wallets) < len(unsharded):
+        raise ValueError("Recipient wallet no longer exists")
+
+    key = tx.idempotency_key.rsplit(":", 1)[0]
+    _credit_recipients(db, payable, wallets, shards, key)
+
+    now = datetime.utcnow()
+    db.execute(insert(models.Transaction), [
+        _row(wallet_id, amount_kobo, models.TransactionType.transfer_in, item_key(key, index, "in"), tx.operation_id, now)
+        for index, amount_kobo, wallet_id in payable
+    ])
+    tx.status = models.TransactionStatus.success.value
+
+
+def apply_bulk_transfer(db: Session, sender_wallet_id: int, sender_user_id: int, items: list, idempotency_key: str):
+    """
+    Pay many wallets from one sender in a single transaction.
+
+    Items that can't be paid (bad amount, unknown recipient, self) are
+    reported individually; the rest are applied together. The batch is
+    fraud-scored once, for its total, as one transfer against the
+    sender's velocity; a flagged batch is debited and held for review as
+    a single hold. Raises ValueError if the sender can't cover the
+    payable total. Does not commit.
+
+    Returns (sender, total, results, fraud reasons if held else None).
+    """
+    by_username, by_phone = _resolve_recipients(db, items)
+
+    results, payable = [], []
+    for index, item in enumerate(items):
+        if item.amount_kobo <= 0:
+            results.append(_result(index, item, error="Invalid amount"))
+            continue
+        if not item.username and not item.phone_number:
+            results.append(_result(index, item, error="Provide username or phone number"))
+            continue
+
+        match = by_username.get(item.username) if item.username else by_phone.get(item.phone_number)
+        if not match:
+            results.append(_result(index, item, error="Recipient not found"))
+            continue
+
+        user_id, wallet_id = match
+        if user_id == sender_user_id:
+            results.append(_result(index, item, error="Cannot send to yourself"))
+            continue
+        if wallet_id is None:
+            results.append(_result(index, item, error="Recipient wallet not found"))
+            continue
+
+        payable.append((index, item.amount_kobo, wallet_id))
+        results.append(_result(index, item, wallet_id=wallet_id))
+
+    # Lock sender and every unsharded recipient in ascending id order;
+    # sharded recipients are credited on a shard row instead
+    recipient_ids = {wallet_id for _, _, wallet_id in payable}
+    shards = balance_service.shard_counts(db, recipient_ids)
+    wallet_ids = {sender_wallet_id} | {w for w in recipient_ids if not shards[w]}
+    wallets = lock_wallets(db, wallet_ids, joinedload(models.Wallet.owner))
+    sender = wallets[sender_wallet_id]
+
+    total = sum(amount_kobo for _, amount_kobo, _ in payable)
+    if not balance_service.ensure_available(db, sender, total):
+        raise ValueError("Insufficient funds")
+
+    if payable:
+        # Scored under the sender's lock so its velocity counters are current
+        score, reasons = FraudService.calculate_SCORE(sender.id, None, total)
+        if FraudService.is_flagged(score):
+            _hold_batch(db, sender, payable, total, idempotency_key, score, reasons)
+            for result in results:
+                if result["status"] == "success":
+                    result["status"] = "held"
+            return sender, total, results, reasons
+
+    now = datetime.utcnow()
+    rows = []
+    for index, amount_kobo, wallet_id in payable:
+        operation_id = str(uuid.uuid4())
+        rows.append(_row(sender.id, amount_kobo, models.TransactionType.transfer_out, item_key(idempotency_key, index, "out"), operation_id, now))
+        rows.append(_row(wallet_id, amount_kobo, models.TransactionType.transfer_in, item_key(idempotency_key, index, "in"), operation_id, now))
+
+    sender.balance_kobo -= total
+    _credit_recipients(db, payable, wallets, shards, idempotency_key)
+
+    if rows:
+        db.execute(insert(models.Transaction), rows)
+
+    return sender, total, results, None
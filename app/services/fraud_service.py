@@ -1,43 +1,271 @@
-from sqlalchemy.orm import SessionTransaction, Session
+from collections import deque
+from datetime import datetime, timedelta, timezone
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.orm import Session
 from app import models
-from datetime import datetime, timedelta
+from app.locking import lock_wallet
+from app.services import balance_service
+from app.services.paystack_service import initiate_transfer
+
+load_dotenv()
+
+
+class SlidingWindow:
+    """
+    Count and amount over the last `seconds`, kept in `buckets` time
+    buckets so memory per wallet stays fixed however busy it is. Totals
+    are exact to within one bucket (1/60 of the window by default).
+    """
+
+    def __init__(self, seconds: int, buckets: int = 60):
+        self.seconds = seconds
+        self.bucket_seconds = seconds / buckets
+        self._buckets = deque()  # [bucket_start, count, amount]
+        self.count = 0
+        self.amount = 0
+
+    def _expire(self, now: float):
+        cutoff = now - self.seconds
+        while self._buckets and self._buckets[0][0] <= cutoff:
+            _, count, amount = self._buckets.popleft()
+            self.count -= count
+            self.amount -= amount
+
+    def add(self, at: float, amount: int):
+        start = at - (at % self.bucket_seconds)
+        if self._buckets and self._buckets[-1][0] == start:
+            self._buckets[-1][1] += 1
+            self._buckets[-1][2] += amount
+        else:
+            self._buckets.append([start, 1, amount])
+        self.count += 1
+        self.amount += amount
+
+    def totals(self, now: float) -> tuple[int, int]:
+        self._expire(now)
+        return self.count, self.amount
+
+
+class VelocityTracker:
+    """
+    Per-wallet outgoing transfer counters over 1m/1h/24h, in memory.
+
+    Each worker process keeps its own counters, rehydrated from the last
+    24h of transactions at startup, so scoring a transfer costs no query.
+    """
+
+    WINDOWS = {"1m": 60, "1h": 3600, "24h": 86400}
+
+    def __init__(self):
+        self._wallets = {}
+        self._lock = threading.Lock()
+
+    def _windows(self, wallet_id: int) -> dict:
+        windows = self._wallets.get(wallet_id)
+        if windows is None:
+            windows = {name: SlidingWindow(seconds) for name, seconds in self.WINDOWS.items()}
+            self._wallets[wallet_id] = windows
+        return windows
+
+    def record(self, wallet_id: int, amount_kobo: int, at: float = None):
+        at = time.time() if at is None else at
+        with self._lock:
+            for window in self._windows(wallet_id).values():
+                window.add(at, amount_kobo)
+
+    def snapshot(self, wallet_id: int) -> dict:
+        now = time.time()
+        with self._lock:
+            windows = self._wallets.get(wallet_id)
+            if windows is None:
+                return {name: (0, 0) for name in self.WINDOWS}
+            snapshot = {name: window.totals(now) for name, window in windows.items()}
+            if snapshot["24h"][0] == 0:
+                # Idle for a day: drop it so memory tracks active wallets only
+                del self._wallets[wallet_id]
+            return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._wallets.clear()
+
+    def __len__(self):
+        return len(self._wallets)
+
+    def rehydrate(self, db: Session) -> int:
+        """
+        Rebuild counters from the last 24h of outgoing transfers. The rows
+        of one bulk transfer share a timestamp and count as one transfer,
+        as they did when recorded.
+        """
+        since = datetime.utcnow() - timedelta(seconds=self.WINDOWS["24h"])
+        rows = (
+            db.query(models.Transaction.wallet_id, func.sum(models.Transaction.amount_kobo), models.Transaction.timestamp)
+            .filter(
+                models.Transaction.type == models.TransactionType.transfer_out.value,
+                models.Transaction.status.in_([
+                    models.TransactionStatus.success.value,
+                    models.TransactionStatus.pending.value,
+                ]),
+                models.Transaction.timestamp >= since,
+            )
+            .group_by(models.Transaction.wallet_id, models.Transaction.timestamp)
+            .order_by(models.Transaction.timestamp)
+            .yield_per(5000)
+        )
+
+        self.clear()
+        loaded = 0
+        for wallet_id, amount_kobo, timestamp in rows:
+            self.record(wallet_id, amount_kobo, timestamp.replace(tzinfo=timezone.utc).timestamp())
+            loaded += 1
+        return loaded
+
+
+velocity = VelocityTracker()
+
 
 class FraudService:
     HIGH_AMOUNT_THRESHOLD = 50
     MAX_TRANSFER_SCORE = 30
     SELF_TRANSFER_SCORE = 100
-    FRAUD_THRESHOLD = 60
+    HOURLY_VELOCITY_SCORE = 30
+    DAILY_AMOUNT_SCORE = 40
+    FRAUD_THRESHOLD = int(os.getenv("FRAUD_THRESHOLD", "60"))
+
+    HIGH_AMOUNT_KOBO = int(os.getenv("FRAUD_HIGH_AMOUNT_KOBO", "1000000"))
+    MAX_TRANSFERS_PER_MINUTE = int(os.getenv("FRAUD_MAX_TRANSFERS_PER_MINUTE", "3"))
+    MAX_TRANSFERS_PER_HOUR = int(os.getenv("FRAUD_MAX_TRANSFERS_PER_HOUR", "20"))
+    DAILY_AMOUNT_LIMIT_KOBO = int(os.getenv("FRAUD_DAILY_AMOUNT_LIMIT_KOBO", "5000000"))
 
 
     @staticmethod
-    def calculate_SCORE(db: Session, sender_wallet_id: int, reciever_wallet_id: int, amount:float):
+    def calculate_SCORE(sender_wallet_id: int, reciever_wallet_id, amount_kobo: int):
+        """
+        Score a transfer against the sender's recent velocity. Counts are
+        for transfers before this one; `reciever_wallet_id` is None for
+        bank and bulk transfers. A bulk transfer is scored once, for its
+        total, as one transfer.
+        """
         score = 0
-        reasons =[]
+        reasons = []
 
-        if amount >= 10000:
+        if amount_kobo >= FraudService.HIGH_AMOUNT_KOBO:
             score += FraudService.HIGH_AMOUNT_THRESHOLD
-            reasons.append("High Transaction AMpunt")
+            reasons.append("High transaction amount")
 
         if sender_wallet_id == reciever_wallet_id:
-            score +=FraudService.SELF_TRANSFER_SCORE
-            reasons.append("Self Transfer Attempt")
-
-        one_minute_ago = datetime.utcnow() - timedelta(minutes=1)
-        recent_transfers = (db.query (models.Transaction).filter(
-            models.Transaction.sender_wallet_id == sender_wallet_id,
-            models.Transaction.created_at >= one_minute_ago,
-            models.Transaction.type == "transfer"
-        )
-        .count()
-    )
-        if recent_transfers >= 3:
+            score += FraudService.SELF_TRANSFER_SCORE
+            reasons.append("Self transfer attempt")
+
+        recent = velocity.snapshot(sender_wallet_id)
+
+        if recent["1m"][0] >= FraudService.MAX_TRANSFERS_PER_MINUTE:
             score += FraudService.MAX_TRANSFER_SCORE
-            reasons.append("Too may trasfers within one minute")
+            reasons.append("Too many transfers within one minute")
+
+        if recent["1h"][0] >= FraudService.MAX_TRANSFERS_PER_HOUR:
+            score += FraudService.HOURLY_VELOCITY_SCORE
+            reasons.append("Too many transfers within one hour")
+
+        if recent["24h"][1] + amount_kobo > FraudService.DAILY_AMOUNT_LIMIT_KOBO:
+            score += FraudService.DAILY_AMOUNT_SCORE
+            reasons.append("Daily transfer amount exceeded")
 
         return score, reasons
-    
+
     @staticmethod
     def is_flagged(score: int):
         return score >= FraudService.FRAUD_THRESHOLD
 
-        
\ No newline at end of file
+
+# -------------------- Holds --------------------
+def hold_transfer(db: Session, tx: models.Transaction, score: int, reasons: list, **destination) -> models.FraudHold:
+    """
+    Park a flagged transfer for review. `tx` is the sender's pending
+    transfer_out, already debited; nothing reaches the recipient until
+    the hold is approved. Does not commit.
+    """
+    db.flush()
+    hold = models.FraudHold(
+        transaction_id=tx.id,
+        wallet_id=tx.wallet_id,
+        amount_kobo=tx.amount_kobo,
+        score=score,
+        reasons="; ".join(reasons),
+        status=models.FraudHoldStatus.held.value,
+        **destination,
+    )
+    db.add(hold)
+    return hold
+
+
+def _open_hold(db: Session, hold_id: int) -> models.FraudHold:
+    hold = db.query(models.FraudHold).filter_by(id=hold_id).with_for_update().first()
+    if not hold:
+        raise LookupError("Hold not found")
+    if hold.status != models.FraudHoldStatus.held.value:
+        raise ValueError(f"Hold already {hold.status}")
+    return hold
+
+
+def approve_hold(db: Session, hold_id: int) -> models.FraudHold:
+    """
+    Release a held transfer: credit the recipient wallet (every recipient,
+    for a bulk hold), or send the bank transfer to Paystack and leave it
+    pending for webhooks/the reconciler.
+    """
+    hold = _open_hold(db, hold_id)
+    tx = hold.transaction
+
+    if hold.destination_type == "wallet":
+        receiver = lock_wallet(db, hold.recipient_wallet_id)
+        if receiver is None:
+            raise ValueError("Recipient wallet no longer exists")
+        key = tx.idempotency_key.rsplit(":", 1)[0]
+        balance_service.credit(db, receiver, hold.amount_kobo, key)
+        db.add(models.Transaction(
+            wallet_id=receiver.id,
+            amount_kobo=hold.amount_kobo,
+            type=models.TransactionType.transfer_in.value,
+            idempotency_key=f"{key}:in",
+            operation_id=tx.operation_id,
+            status=models.TransactionStatus.success.value,
+        ))
+        tx.status = models.TransactionStatus.success.value
+    elif hold.destination_type == "bulk":
+        # Imported here: bulk_transfer_service scores and holds through this module
+        from app.services.bulk_transfer_service import release_held_batch
+        release_held_batch(db, hold)
+    else:
+        # Paystack dedupes on the reference, so a retried approval can't pay twice
+        initiate_transfer(
+            amount_kobo=hold.amount_kobo,
+            bank_code=hold.bank_code,
+            account_number=hold.account_number,
+            reference=hold.reference,
+        )
+        tx.transfer_reference = hold.reference
+
+    hold.status = models.FraudHoldStatus.approved.value
+    hold.reviewed_at = datetime.utcnow()
+    db.commit()
+    return hold
+
+
+def reject_hold(db: Session, hold_id: int) -> models.FraudHold:
+    """Refund the sender and fail the held transfer."""
+    hold = _open_hold(db, hold_id)
+    sender = lock_wallet(db, hold.wallet_id)
+    sender.balance_kobo += hold.amount_kobo
+    hold.transaction.status = models.TransactionStatus.failed.value
+
+    hold.status = models.FraudHoldStatus.rejected.value
+    hold.reviewed_at = datetime.utcnow()
+    db.commit()
+    return hold
@@ -1,6 +1,41 @@
+from datetime import datetime, timedelta
+from typing import Callable
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from app import models
+from app.cache import TTLCache
+from app.database import IdempotencySessionLocal
+
+load_dotenv()
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "50000"))
+# How long a duplicate waits for the in-flight original before giving up
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+# In-progress claims older than this are assumed orphaned by a crashed worker
+IDEMPOTENCY_INFLIGHT_TIMEOUT_SECONDS = int(os.getenv("IDEMPOTENCY_INFLIGHT_TIMEOUT_SECONDS", "60"))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = int(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+IDEMPOTENCY_PURGE_BATCH_SIZE = 5000
+
+# (user_id, key) -> (request_hash, response_code, response_body) for completed keys
+response_cache = TTLCache(IDEMPOTENCY_CACHE_SIZE, min(IDEMPOTENCY_TTL_SECONDS, 3600))
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request."""
+
+
+class IdempotencyInProgress(Exception):
+    """The original request with this key is still running."""
 
 
 def get_existing_transaction(
@@ -26,3 +61,215 @@ def save_transaction(db: Session, tx: models.Transaction):
     except IntegrityError:
         db.rollback()
         raise
+
+
+# -------------------- Idempotency store --------------------
+def request_hash(endpoint: str, payload) -> str:
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{endpoint}\n{body}".encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Idempotency-Key bookkeeping kept apart from the ledger.
+
+    The first request for a (user, key) claims a row in `idempotency_keys`
+    and stores its response when done; repeats replay that response.
+    Concurrent duplicates wait for the original instead of racing it: on
+    an in-process event when they share a worker, by polling the row when
+    they don't. Records live in their own short sessions, on their own
+    connection pool, so they are visible to other workers immediately,
+    independent of the request's own transaction.
+    """
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL_SECONDS, wait_seconds: float = IDEMPOTENCY_WAIT_SECONDS):
+        self.ttl = ttl
+        self.wait_seconds = wait_seconds
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, scope: tuple, req_hash: str):
+        hit = response_cache.get(scope)
+        if hit is None:
+            return None
+        if hit[0] != req_hash:
+            raise IdempotencyConflict("Idempotency key was used for a different request")
+        return hit[1], hit[2]
+
+    def _claim(self, user_id: int, key: str, endpoint: str, req_hash: str):
+        """Insert our in-progress row, or return the stored record's state."""
+        db = IdempotencySessionLocal()
+        try:
+            now = datetime.utcnow()
+            db.add(models.IdempotencyRecord(
+                user_id=user_id,
+                key=key,
+                endpoint=endpoint,
+                request_hash=req_hash,
+                status=models.IdempotencyStatus.in_progress.value,
+                expires_at=now + timedelta(seconds=self.ttl),
+            ))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+
+            record = db.query(models.IdempotencyRecord).filter_by(user_id=user_id, key=key).first()
+            if record is None:
+                return "retry"
+            orphaned = (
+                record.status == models.IdempotencyStatus.in_progress.value
+                and record.created_at <= now - timedelta(seconds=IDEMPOTENCY_INFLIGHT_TIMEOUT_SECONDS)
+            )
+            if record.expires_at <= now or orphaned:
+                # Expired but not purged yet, or abandoned mid-flight: the key is free again
+                db.delete(record)
+                db.commit()
+                return "retry"
+            if record.request_hash != req_hash:
+                raise IdempotencyConflict("Idempotency key was used for a different request")
+            if record.status == models.IdempotencyStatus.completed.value:
+                stored = (record.response_code, json.loads(record.response_body))
+                response_cache.set((user_id, key), (req_hash, *stored))
+                return stored
+            return "wait"
+        finally:
+            db.close()
+
+    def begin(self, user_id: int, key: str, endpoint: str, req_hash: str):
+        """
+        Claim the key. Returns None if the caller should run the request, or
+        the stored (status_code, body) to replay.
+        """
+        scope = (user_id, key)
+        deadline = time.monotonic() + self.wait_seconds
+
+        while True:
+            cached = self._cached(scope, req_hash)
+            if cached:
+                return cached
+
+            with self._lock:
+                event = self._inflight.get(scope)
+                if event is None:
+                    self._inflight[scope] = threading.Event()
+
+            if event is not None:
+                # Same worker is already running it: wait for its outcome
+                if not event.wait(max(deadline - time.monotonic(), 0)):
+                    raise IdempotencyInProgress("A request with this idempotency key is in progress")
+                continue
+
+            try:
+                state = self._claim(user_id, key, endpoint, req_hash)
+            except Exception:
+                self._release_local(scope)
+                raise
+
+            if state is None:
+                return None
+
+            self._release_local(scope)
+            if state == "retry":
+                continue
+            if state == "wait":
+                if time.monotonic() >= deadline:
+                    raise IdempotencyInProgress("A request with this idempotency key is in progress")
+                time.sleep(0.05)
+                continue
+            return state
+
+    def _release_local(self, scope: tuple):
+        with self._lock:
+            event = self._inflight.pop(scope, None)
+        if event:
+            event.set()
+
+    def complete(self, user_id: int, key: str, req_hash: str, status_code: int, body):
+        db = IdempotencySessionLocal()
+        try:
+            db.query(models.IdempotencyRecord)\
+                .filter_by(user_id=user_id, key=key)\
+                .update({
+                    "status": models.IdempotencyStatus.completed.value,
+                    "response_code": status_code,
+                    "response_body": json.dumps(body),
+                })
+            db.commit()
+        finally:
+            db.close()
+        response_cache.set((user_id, key), (req_hash, status_code, body))
+        self._release_local((user_id, key))
+
+    def abandon(self, user_id: int, key: str):
+        """Free the key after a failed attempt so the client may retry it."""
+        db = IdempotencySessionLocal()
+        try:
+            db.query(models.IdempotencyRecord)\
+                .filter_by(user_id=user_id, key=key, status=models.IdempotencyStatus.in_progress.value)\
+                .delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        self._release_local((user_id, key))
+
+    def run(self, user_id: int, key: str, endpoint: str, payload, func: Callable):
+        """
+        Run `func()` at most once per (user, key) and return its JSON-ready
+        response; repeats get the original response back. Only successful
+        responses are stored; errors free the key for another attempt.
+        """
+        req_hash = request_hash(endpoint, payload)
+        replay = self.begin(user_id, key, endpoint, req_hash)
+        if replay is not None:
+            return replay[1]
+
+        try:
+            body = jsonable_encoder(func())
+        except BaseException:
+            self.abandon(user_id, key)
+            raise
+
+        self.complete(user_id, key, req_hash, 200, body)
+        return body
+
+
+store = IdempotencyStore()
+
+
+def idempotent(endpoint: str):
+    """
+    Route decorator: make a sync route that takes `idempotency_key` and
+    `current_user` replay its first successful response for repeated keys.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            user = kwargs["current_user"]
+            request = {
+                name: value for name, value in kwargs.items()
+                if name not in ("db", "current_user", "idempotency_key")
+            }
+            return store.run(user.id, kwargs["idempotency_key"], endpoint, request, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def purge_expired(db: Session, batch_size: int = IDEMPOTENCY_PURGE_BATCH_SIZE) -> int:
+    """Delete expired idempotency records in batches. Returns rows deleted."""
+    deleted = 0
+    while True:
+        ids = [
+            record_id for (record_id,) in
+            db.query(models.IdempotencyRecord.id)
+            .filter(models.IdempotencyRecord.expires_at < datetime.utcnow())
+            .limit(batch_size)
+        ]
+        if not ids:
+            return deleted
+        db.query(models.IdempotencyRecord)\
+            .filter(models.IdempotencyRecord.id.in_(ids))\
+            .delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
@@ -1,23 +1,9 @@
 from sqlalchemy.orm import Session
 from app import models
 from app.services.idempotency_service import get_existing_transaction
+from app.services.paystack_service import get_banks  # noqa: F401 (kept for existing callers)
 from uuid import uuid4
 from datetime import datetime
-import os
-import requests
-from dotenv import load_dotenv
-
-load_dotenv()
-
-USE_MOCK = os.getenv("USE_MOCK_PAYSTACK") == "true"
-PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY")
-
-BASE_URL = "https://api.paystack.co"
-
-headers = {
-    "Authorization": f"Bearer {PAYSTACK_SECRET_KEY}",
-    "Content-Type": "application/json"
-}
 
 
 def process_successful_payment(db: Session, payload: dict):
@@ -73,20 +59,3 @@ def process_successful_payment(db: Session, payload: dict):
     except Exception:
         db.rollback()
         raise
-
-
-def get_banks():
-    if USE_MOCK:
-        return {
-            "status": True,
-            "data": [
-                {"name": "Mock Bank", "code": "000"}
-            ]
-        }
-
-    response = requests.get(
-        f"{BASE_URL}/bank?country=nigeria",
-        headers=headers
-    )
-
-    return response.json()
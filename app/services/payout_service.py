@@ -0,0 +1,199 @@
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import TTLCache
+from app.services import paystack_service
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Withdrawals picked up per run, and per Paystack bulk request
+PAYOUT_BATCH_SIZE = int(os.getenv("PAYOUT_BATCH_SIZE", "500"))
+PAYOUT_CHUNK_SIZE = min(
+    int(os.getenv("PAYOUT_CHUNK_SIZE", str(paystack_service.BULK_TRANSFER_MAX))),
+    paystack_service.BULK_TRANSFER_MAX,
+)
+# Payouts move real money, so the periodic job is opt-in (0 = disabled)
+PAYOUT_INTERVAL_SECONDS = int(os.getenv("PAYOUT_INTERVAL_SECONDS", "0"))
+RECIPIENT_CACHE_SIZE = int(os.getenv("RECIPIENT_CACHE_SIZE", "10000"))
+
+# Recipient codes don't change for an account, so a long TTL is fine
+recipient_cache = TTLCache(RECIPIENT_CACHE_SIZE, 24 * 3600)
+
+
+# -------------------- Recipients --------------------
+def recipient_codes(db: Session, accounts: set) -> dict:
+    """
+    Recipient code for each (bank_code, account_number): memory first, then
+    the transfer_recipients table, creating on Paystack only when unseen.
+    """
+    codes = {}
+    missing = set()
+    for account in accounts:
+        code = recipient_cache.get(account)
+        if code:
+            codes[account] = code
+        else:
+            missing.add(account)
+
+    if missing:
+        stored = (
+            db.query(models.TransferRecipient)
+            .filter(models.TransferRecipient.account_number.in_([a for _, a in missing]))
+            .all()
+        )
+        for row in stored:
+            account = (row.bank_code, row.account_number)
+            if account in missing:
+                codes[account] = row.recipient_code
+                recipient_cache.set(account, row.recipient_code)
+                missing.discard(account)
+
+    for bank_code, account_number in missing:
+        code = paystack_service.create_transfer_recipient(bank_code, account_number)
+        savepoint = db.begin_nested()
+        try:
+            db.add(models.TransferRecipient(
+                bank_code=bank_code,
+                account_number=account_number,
+                recipient_code=code,
+            ))
+            savepoint.commit()
+        except IntegrityError:
+            # Another payout run stored it first; Paystack returns the same code
+            savepoint.rollback()
+        codes[(bank_code, account_number)] = code
+        recipient_cache.set((bank_code, account_number), code)
+
+    return codes
+
+
+# -------------------- Payouts --------------------
+def claim_withdrawals(db: Session, limit: int, exclude: set = frozenset()) -> list:
+    """Lock pending withdrawals not yet sent to Paystack, oldest first."""
+    query = (
+        db.query(models.Transaction)
+        .filter(
+            models.Transaction.type == models.TransactionType.withdraw.value,
+            models.Transaction.status == models.TransactionStatus.pending.value,
+            models.Transaction.transfer_reference.is_(None),
+        )
+    )
+    if exclude:
+        # Already attempted this run (skipped or failed); leave for the next
+        query = query.filter(models.Transaction.id.notin_(list(exclude)))
+
+    return (
+        query.order_by(models.Transaction.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+
+def _payout_accounts(db: Session, withdrawals: list) -> dict:
+    """Payout bank account per wallet (the owner's first linked account)."""
+    rows = (
+        db.query(models.Wallet.id, models.BankAccount)
+        .join(models.BankAccount, models.BankAccount.user_id == models.Wallet.user_id)
+        .filter(models.Wallet.id.in_(list({tx.wallet_id for tx in withdrawals})))
+        .order_by(models.BankAccount.id)
+        .all()
+    )
+    accounts = {}
+    for wallet_id, bank_account in rows:
+        accounts.setdefault(wallet_id, bank_account)
+    return accounts
+
+
+def send_chunk(db: Session, withdrawals: list) -> dict:
+    """Submit one bulk transfer for already-locked withdrawals and commit."""
+    accounts = _payout_accounts(db, withdrawals)
+    skipped = [tx.id for tx in withdrawals if tx.wallet_id not in accounts]
+    sendable = [tx for tx in withdrawals if tx.wallet_id in accounts]
+
+    if not sendable:
+        db.commit()
+        return {"sent": [], "skipped": skipped, "failed": []}
+
+    codes = recipient_codes(db, {
+        (accounts[tx.wallet_id].bank_code, accounts[tx.wallet_id].account_number)
+        for tx in sendable
+    })
+
+    transfers = []
+    for tx in sendable:
+        account = accounts[tx.wallet_id]
+        transfers.append({
+            "amount": tx.amount_kobo,
+            "recipient": codes[(account.bank_code, account.account_number)],
+            # Same reference as the single-send path, so Paystack dedupes retries
+            "reference": tx.idempotency_key,
+        })
+
+    response = paystack_service.initiate_bulk_transfer(transfers)
+    queued = {item.get("reference") for item in response.get("data", [])}
+
+    sent, failed = [], []
+    for tx in sendable:
+        if tx.idempotency_key in queued:
+            tx.transfer_reference = tx.idempotency_key
+            sent.append(tx.id)
+        else:
+            failed.append(tx.id)
+
+    db.commit()
+    return {"sent": sent, "skipped": skipped, "failed": failed}
+
+
+def send_pending_withdrawals(db: Session, limit: int = PAYOUT_BATCH_SIZE, chunk_size: int = PAYOUT_CHUNK_SIZE) -> dict:
+    """
+    Pay out up to `limit` pending withdrawals through Paystack's bulk
+    transfer API. Each chunk is claimed, submitted and committed on its own,
+    so row locks are only held for one Paystack call at a time.
+    """
+    started = time.perf_counter()
+    summary = {"sent": [], "skipped": [], "failed": [], "errors": []}
+    remaining = limit
+    seen = set()
+
+    while remaining > 0:
+        withdrawals = claim_withdrawals(db, min(chunk_size, remaining), seen)
+        if not withdrawals:
+            db.commit()
+            break
+
+        ids = [tx.id for tx in withdrawals]
+        seen.update(ids)
+        remaining -= len(ids)
+
+        try:
+            result = send_chunk(db, withdrawals)
+        except Exception as e:
+            db.rollback()
+            summary["errors"].append(str(e))
+            summary["failed"].extend(ids)
+            continue
+
+        for key in ("sent", "skipped", "failed"):
+            summary[key].extend(result[key])
+
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def run_payouts(db: Session):
+    """PeriodicJob entry point."""
+    summary = send_pending_withdrawals(db)
+    if summary["sent"] or summary["errors"]:
+        logger.info(
+            "Payouts sent=%d skipped=%d failed=%d errors=%s",
+            len(summary["sent"]), len(summary["skipped"]), len(summary["failed"]), summary["errors"][:3],
+        )
@@ -0,0 +1,75 @@
+import os
+import threading
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PAYSTACK_SECRET = os.getenv("PAYSTACK_SECRET_KEY")
+BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
+
+# Connection pool and timeouts (seconds)
+POOL_SIZE = int(os.getenv("PAYSTACK_POOL_SIZE", "20"))
+POOL_KEEPALIVE = int(os.getenv("PAYSTACK_POOL_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("PAYSTACK_KEEPALIVE_EXPIRY", "30"))
+CONNECT_TIMEOUT = float(os.getenv("PAYSTACK_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("PAYSTACK_TIMEOUT", "15"))
+POOL_TIMEOUT = float(os.getenv("PAYSTACK_POOL_TIMEOUT", "5"))
+
+
+def _client_options() -> dict:
+    return {
+        "base_url": BASE_URL,
+        "headers": {
+            "Authorization": f"Bearer {PAYSTACK_SECRET}",
+            "Content-Type": "application/json",
+        },
+        "limits": httpx.Limits(
+            max_connections=POOL_SIZE,
+            max_keepalive_connections=POOL_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(
+            READ_TIMEOUT,
+            connect=CONNECT_TIMEOUT,
+            pool=POOL_TIMEOUT,
+        ),
+    }
+
+
+_lock = threading.Lock()
+_client = None
+_async_client = None
+
+
+def get_client() -> httpx.Client:
+    """Process-wide Paystack client; connections are kept alive and reused."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = httpx.Client(**_client_options())
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Async counterpart of `get_client` for use from async routes."""
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = httpx.AsyncClient(**_client_options())
+    return _async_client
+
+
+async def close_clients():
+    global _client, _async_client
+    with _lock:
+        client, async_client = _client, _async_client
+        _client = _async_client = None
+
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
@@ -1,108 +1,235 @@
-import requests
 import os
 from dotenv import load_dotenv
 
+from app.metrics import observe_paystack
+from app.services.paystack_client import get_client, get_async_client
+
 load_dotenv()
-PAYSTACK_SECRET = os.getenv("PAYSTACK_SECRET_KEY")
 USE_MOCK = os.getenv("USE_MOCK_PAYSTACK") == "true"
-BASE_URL = "https://api.paystack.co"
 
-headers = {
-    "Authorization": f"Bearer {PAYSTACK_SECRET}",
-    "Content-Type": "application/json"
+# Paystack caps the number of transfers per bulk request
+BULK_TRANSFER_MAX = 100
+
+MOCK_BANKS = {
+    "status": True,
+    "data": [
+        {"name": "Mock Bank", "code": "000"}
+    ]
 }
 
 
+def _checked(data: dict, message: str) -> dict:
+    if not data.get("status"):
+        raise ValueError(data.get("message", message))
+    return data
+
+
+def _recipient_payload(bank_code: str, account_number: str) -> dict:
+    return {
+        "type": "nuban",
+        "name": "Wallet Withdrawal",
+        "account_number": account_number,
+        "bank_code": bank_code,
+        "currency": "NGN"
+    }
+
+
+def _transfer_payload(amount_kobo: int, recipient_code: str, reference: str) -> dict:
+    return {
+        "source": "balance",
+        "amount": amount_kobo,
+        "recipient": recipient_code,
+        "reference": reference
+    }
+
+
+def _transfer_status(data: dict) -> dict:
+    # Paystack returns data.status as 'success', 'failed', or 'pending'
+    return {
+        "status": data["data"]["status"],
+        "amount_kobo": data["data"]["amount"]
+    }
+
+
+def _resolved_account(data: dict, bank_code: str) -> dict:
+    return {
+        "account_name": data["data"]["account_name"],
+        "account_number": data["data"]["account_number"],
+        "bank_code": bank_code
+    }
+
+
+# -------------------- Sync --------------------
+@observe_paystack("initiate_transfer")
 def initiate_transfer(amount_kobo: int, bank_code: str, account_number: str, reference: str):
 
     if USE_MOCK:
         from app.mock_paystack.routes import mock_transfer
         return mock_transfer(reference, succeed=True)
 
-    headers = {
-        "Authorization": f"Bearer {PAYSTACK_SECRET}",
-        "Content-Type": "application/json"
-    }
+    client = get_client()
 
     # 1️⃣ Create transfer recipient
-    recipient_resp = requests.post(
-        f"{BASE_URL}/transferrecipient",
-        json={
-            "type": "nuban",
-            "name": "Wallet Withdrawal",
-            "account_number": account_number,
-            "bank_code": bank_code,
-            "currency": "NGN"
-        },
-        headers=headers,
-        timeout=15
-    ).json()
-
-    if not recipient_resp.get("status"):
-        raise ValueError(recipient_resp.get("message"))
+    recipient_resp = _checked(
+        client.post(
+            "/transferrecipient",
+            json=_recipient_payload(bank_code, account_number)
+        ).json(),
+        "Failed to create transfer recipient"
+    )
 
     recipient_code = recipient_resp["data"]["recipient_code"]
 
     # 2️⃣ Initiate transfer
-    transfer_resp = requests.post(
-        f"{BASE_URL}/transfer",
-        json={
-            "source": "balance",
-            "amount": amount_kobo,
-            "recipient": recipient_code,
-            "reference": reference
-        },
-        headers=headers,
-        timeout=15
-    ).json()
-
-    if not transfer_resp.get("status"):
-        raise ValueError(transfer_resp.get("message"))
-
-    return transfer_resp
+    return _checked(
+        client.post(
+            "/transfer",
+            json=_transfer_payload(amount_kobo, recipient_code, reference)
+        ).json(),
+        "Failed to initiate transfer"
+    )
 
+@observe_paystack("create_transfer_recipient")
+def create_transfer_recipient(bank_code: str, account_number: str) -> str:
+    """Register a payout account with Paystack and return its recipient code."""
+    if USE_MOCK:
+        from app.mock_paystack.routes import mock_create_recipient
+        return mock_create_recipient(bank_code, account_number)["data"]["recipient_code"]
+
+    data = _checked(
+        get_client().post(
+            "/transferrecipient",
+            json=_recipient_payload(bank_code, account_number)
+        ).json(),
+        "Failed to create transfer recipient"
+    )
+    return data["data"]["recipient_code"]
+
+
+@observe_paystack("initiate_bulk_transfer")
+def initiate_bulk_transfer(transfers: list):
+    """
+    Queue up to BULK_TRANSFER_MAX transfers in one call. Each item needs
+    `amount`, `recipient` (recipient code) and `reference`.
+    """
+    if USE_MOCK:
+        from app.mock_paystack.routes import mock_bulk_transfer
+        return mock_bulk_transfer(transfers)
+
+    return _checked(
+        get_client().post(
+            "/transfer/bulk",
+            json={
+                "currency": "NGN",
+                "source": "balance",
+                "transfers": transfers
+            }
+        ).json(),
+        "Failed to initiate bulk transfer"
+    )
+
+
+@observe_paystack("get_transfer_status")
 def get_transfer_status(reference: str):
     """Fetch the current status of a transfer from Paystack."""
     if USE_MOCK:
         from app.mock_paystack.routes import mock_transfer_status
         return mock_transfer_status(reference)
 
-    response = requests.get(
-        f"{BASE_URL}/transfer/{reference}",
-        headers=headers,
-        timeout=15
+    data = _checked(
+        get_client().get(f"/transfer/{reference}").json(),
+        "Failed to fetch transfer status"
     )
 
-    data = response.json()
-    if not data.get("status"):
-        raise ValueError(data.get("message", "Failed to fetch transfer status"))
-
-    # Paystack returns data.status as 'success', 'failed', or 'pending'
-    return {
-        "status": data["data"]["status"],
-        "amount_kobo": data["data"]["amount"]
-    }
+    return _transfer_status(data)
 
 
+@observe_paystack("resolve_bank_account")
 def resolve_bank_account(account_number: str, bank_code: str):
-    response = requests.get(
-        f"{BASE_URL}/bank/resolve",
-        params={
-            "account_number": account_number,
-            "bank_code": bank_code
-        },
-        headers=headers,
-        timeout=15
+    data = _checked(
+        get_client().get(
+            "/bank/resolve",
+            params={
+                "account_number": account_number,
+                "bank_code": bank_code
+            }
+        ).json(),
+        "Account resolution failed"
     )
 
-    data = response.json()
+    return _resolved_account(data, bank_code)
 
-    if not data.get("status"):
-        raise ValueError(data.get("message", "Account resolution failed"))
 
-    return {
-    "account_name": data["data"]["account_name"],
-    "account_number": data["data"]["account_number"],
-    "bank_code": bank_code
-}
-    
+@observe_paystack("get_banks")
+def get_banks():
+    if USE_MOCK:
+        return MOCK_BANKS
+
+    return get_client().get("/bank", params={"country": "nigeria"}).json()
+
+
+# -------------------- Async --------------------
+@observe_paystack("initiate_transfer")
+async def initiate_transfer_async(amount_kobo: int, bank_code: str, account_number: str, reference: str):
+
+    if USE_MOCK:
+        from app.mock_paystack.routes import mock_transfer
+        return mock_transfer(reference, succeed=True)
+
+    client = get_async_client()
+
+    recipient_resp = _checked(
+        (await client.post(
+            "/transferrecipient",
+            json=_recipient_payload(bank_code, account_number)
+        )).json(),
+        "Failed to create transfer recipient"
+    )
+
+    recipient_code = recipient_resp["data"]["recipient_code"]
+
+    return _checked(
+        (await client.post(
+            "/transfer",
+            json=_transfer_payload(amount_kobo, recipient_code, reference)
+        )).json(),
+        "Failed to initiate transfer"
+    )
+
+
+@observe_paystack("get_transfer_status")
+async def get_transfer_status_async(reference: str):
+    if USE_MOCK:
+        from app.mock_paystack.routes import mock_transfer_status
+        return mock_transfer_status(reference)
+
+    data = _checked(
+        (await get_async_client().get(f"/transfer/{reference}")).json(),
+        "Failed to fetch transfer status"
+    )
+
+    return _transfer_status(data)
+
+
+@observe_paystack("resolve_bank_account")
+async def resolve_bank_account_async(account_number: str, bank_code: str):
+    data = _checked(
+        (await get_async_client().get(
+            "/bank/resolve",
+            params={
+                "account_number": account_number,
+                "bank_code": bank_code
+            }
+        )).json(),
+        "Account resolution failed"
+    )
+
+    return _resolved_account(data, bank_code)
+
+
+@observe_paystack("get_banks")
+async def get_banks_async():
+    if USE_MOCK:
+        return MOCK_BANKS
+
+    return (await get_async_client().get("/bank", params={"country": "nigeria"})).json()
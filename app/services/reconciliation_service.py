@@ -0,0 +1,122 @@
+from typing import Iterator, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.audit_service import shard_balances, signed_amount
+
+
+def _ledger_subquery(
+    min_wallet_id: Optional[int] = None,
+    max_wallet_id: Optional[int] = None,
+):
+    """Signed total and row count per wallet since its checkpoint, in one grouped scan."""
+    checkpoint = models.BalanceCheckpoint
+
+    query = (
+        select(
+            models.Transaction.wallet_id.label("wallet_id"),
+            func.coalesce(func.sum(signed_amount()), 0).label("delta_kobo"),
+            func.count(models.Transaction.id).label("transaction_count"),
+        )
+        .outerjoin(checkpoint, checkpoint.wallet_id == models.Transaction.wallet_id)
+        .where(models.Transaction.id > func.coalesce(checkpoint.last_transaction_id, 0))
+    )
+
+    if min_wallet_id is not None:
+        query = query.where(models.Transaction.wallet_id >= min_wallet_id)
+    if max_wallet_id is not None:
+        query = query.where(models.Transaction.wallet_id <= max_wallet_id)
+
+    return query.group_by(models.Transaction.wallet_id).subquery("ledger")
+
+
+def mismatch_query(
+    min_wallet_id: Optional[int] = None,
+    max_wallet_id: Optional[int] = None,
+    after_wallet_id: Optional[int] = None,
+    limit: Optional[int] = None,
+):
+    """
+    Wallets whose stored balance differs from their ledger, ordered by id.
+
+    The comparison happens in the database so only mismatched rows are
+    sent back; `after_wallet_id` is a keyset cursor for paging.
+    """
+    ledger = _ledger_subquery(min_wallet_id, max_wallet_id)
+    shards = shard_balances()
+    checkpoint = models.BalanceCheckpoint
+    calculated = (
+        func.coalesce(checkpoint.verified_balance_kobo, 0)
+        + func.coalesce(ledger.c.delta_kobo, 0)
+    )
+    stored = models.Wallet.balance_kobo + func.coalesce(shards.c.shard_balance_kobo, 0)
+
+    query = (
+        select(
+            models.Wallet.id.label("wallet_id"),
+            stored.label("stored_balance_kobo"),
+            calculated.label("calculated_balance_kobo"),
+            func.coalesce(ledger.c.transaction_count, 0).label("transaction_count"),
+        )
+        .outerjoin(checkpoint, checkpoint.wallet_id == models.Wallet.id)
+        .outerjoin(ledger, ledger.c.wallet_id == models.Wallet.id)
+        .outerjoin(shards, shards.c.wallet_id == models.Wallet.id)
+        .where(stored != calculated)
+        .order_by(models.Wallet.id)
+    )
+
+    if min_wallet_id is not None:
+        query = query.where(models.Wallet.id >= min_wallet_id)
+    if max_wallet_id is not None:
+        query = query.where(models.Wallet.id <= max_wallet_id)
+    if after_wallet_id is not None:
+        query = query.where(models.Wallet.id > after_wallet_id)
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query
+
+
+def _to_audit(row) -> dict:
+    difference = row.calculated_balance_kobo - row.stored_balance_kobo
+    return {
+        "wallet_id": row.wallet_id,
+        "stored_balance_kobo": row.stored_balance_kobo,
+        "calculated_balance_kobo": row.calculated_balance_kobo,
+        "difference_kobo": difference,
+        "valid": difference == 0,
+        "delta_transaction_count": row.transaction_count,
+    }
+
+
+def iter_mismatched_wallets(
+    db: Session,
+    min_wallet_id: Optional[int] = None,
+    max_wallet_id: Optional[int] = None,
+    after_wallet_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    batch_size: int = 500,
+) -> Iterator[dict]:
+    """Yield mismatched wallets in id order without buffering the full result."""
+    query = mismatch_query(min_wallet_id, max_wallet_id, after_wallet_id, limit)
+    result = db.execute(query.execution_options(yield_per=batch_size))
+
+    for row in result:
+        yield _to_audit(row)
+
+
+def count_wallets(
+    db: Session,
+    min_wallet_id: Optional[int] = None,
+    max_wallet_id: Optional[int] = None,
+) -> int:
+    query = select(func.count(models.Wallet.id))
+
+    if min_wallet_id is not None:
+        query = query.where(models.Wallet.id >= min_wallet_id)
+    if max_wallet_id is not None:
+        query = query.where(models.Wallet.id <= max_wallet_id)
+
+    return db.execute(query).scalar_one()
@@ -0,0 +1,133 @@
+from datetime import datetime
+from typing import Iterator
+import csv
+import io
+import json
+import zlib
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+
+STATEMENT_FIELDS = [
+    "id",
+    "timestamp",
+    "type",
+    "status",
+    "amount_kobo",
+    "amount_naira",
+    "currency",
+    "transfer_reference",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def iter_statement_rows(
+    db: Session,
+    wallet_id: int,
+    from_date: datetime,
+    to_date: datetime,
+    batch_size: int = 1000,
+) -> Iterator[dict]:
+    """Yield a wallet's transactions in the range oldest-first, `batch_size` rows at a time."""
+    query = (
+        select(
+            models.Transaction.id,
+            models.Transaction.timestamp,
+            models.Transaction.type,
+            models.Transaction.status,
+            models.Transaction.amount_kobo,
+            models.Transaction.currency,
+            models.Transaction.transfer_reference,
+        )
+        .where(
+            models.Transaction.wallet_id == wallet_id,
+            models.Transaction.timestamp.between(from_date, to_date),
+        )
+        .order_by(models.Transaction.timestamp.asc(), models.Transaction.id.asc())
+        .execution_options(yield_per=batch_size)
+    )
+
+    for row in db.execute(query):
+        yield {
+            "id": row.id,
+            "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+            "type": row.type,
+            "status": row.status,
+            "amount_kobo": row.amount_kobo,
+            "amount_naira": row.amount_kobo / 100,
+            "currency": row.currency,
+            "transfer_reference": row.transfer_reference,
+        }
+
+
+def _encode_csv(rows: Iterator[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=STATEMENT_FIELDS)
+    writer.writeheader()
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def _encode_ndjson(rows: Iterator[dict]) -> Iterator[str]:
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(row))
+        if len(chunk) >= 500:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def _gzip(chunks: Iterator[str]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_statement(
+    wallet_id: int,
+    from_date: datetime,
+    to_date: datetime,
+    format: str,
+    compress: bool = False,
+):
+    """
+    Encoded statement body for a StreamingResponse.
+
+    Uses its own session because the body is produced after the route
+    returns, when the request-scoped session may already be closed.
+    """
+    encode = _encode_csv if format == "csv" else _encode_ndjson
+
+    def body():
+        db = SessionLocal()
+        try:
+            chunks = encode(iter_statement_rows(db, wallet_id, from_date, to_date))
+            if compress:
+                yield from _gzip(chunks)
+            else:
+                for chunk in chunks:
+                    yield chunk.encode()
+        finally:
+            db.close()
+
+    return body()
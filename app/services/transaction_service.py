@@ -1,6 +1,8 @@
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from app import models
 from datetime import datetime
+import base64
 
 def create_transaction(db: Session, wallet_id: int, amount_kobo: int, type: str):
     transaction = models.Transaction(
@@ -13,3 +15,49 @@ def create_transaction(db: Session, wallet_id: int, amount_kobo: int, type: str)
     db.commit()
     db.refresh(transaction)
     return transaction
+
+
+# -------------------- Keyset pagination --------------------
+def encode_cursor(tx: models.Transaction) -> str:
+    raw = f"{tx.timestamp.isoformat()}|{tx.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, tx_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(tx_id)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def newest_first(query, limit: int, offset: int = 0, cursor: str = None):
+    """
+    Order a transaction Query or select() newest-first by (timestamp, id)
+    and apply the page window.
+
+    With a cursor the page starts strictly after that row, so it is an index
+    seek rather than an offset scan and is stable under new inserts.
+    """
+    query = query.order_by(
+        models.Transaction.timestamp.desc(),
+        models.Transaction.id.desc(),
+    )
+
+    if cursor:
+        timestamp, tx_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(models.Transaction.timestamp, models.Transaction.id) < tuple_(timestamp, tx_id)
+        )
+    else:
+        query = query.offset(offset)
+
+    return query.limit(limit)
+
+
+def next_cursor(transactions: list, limit: int):
+    """Cursor for the page after `transactions`, or None on the last page."""
+    if not transactions or len(transactions) < limit:
+        return None
+    return encode_cursor(transactions[-1])
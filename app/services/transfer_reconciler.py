@@ -0,0 +1,189 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from app import models
+from app.locking import lock_wallets, run_with_retry
+from app.services import paystack_service, webhook_service
+from app.services.webhook_service import WebhookIgnored
+
+load_dotenv()
+
+TRANSFER_RECONCILE_INTERVAL_SECONDS = int(os.getenv("TRANSFER_RECONCILE_INTERVAL_SECONDS", "30"))
+TRANSFER_RECONCILE_BATCH_SIZE = int(os.getenv("TRANSFER_RECONCILE_BATCH_SIZE", "200"))
+# Concurrent status lookups against Paystack per run
+TRANSFER_RECONCILE_CONCURRENCY = int(os.getenv("TRANSFER_RECONCILE_CONCURRENCY", "8"))
+# Most pending transfers read per run while looking for ones that are due
+TRANSFER_RECONCILE_SCAN_LIMIT = int(os.getenv("TRANSFER_RECONCILE_SCAN_LIMIT", "2000"))
+
+# (max age in seconds, seconds between checks): young transfers usually
+# settle quickly, old ones are checked less and less often
+BACKOFF_SCHEDULE = (
+    (5 * 60, 30),
+    (60 * 60, 2 * 60),
+    (24 * 60 * 60, 15 * 60),
+)
+MAX_CHECK_INTERVAL = 60 * 60
+
+FINAL_STATUSES = {
+    "success": "transfer.success",
+    "failed": "transfer.failed",
+    "reversed": "transfer.reversed",
+}
+
+
+def check_interval(age_seconds: float) -> int:
+    for max_age, interval in BACKOFF_SCHEDULE:
+        if age_seconds < max_age:
+            return interval
+    return MAX_CHECK_INTERVAL
+
+
+class TransferReconciler:
+    """
+    Settles pending bank transfers by polling Paystack in the background,
+    so clients polling /transfer/status only ever read the database.
+    Webhooks remain the fast path; this catches the ones that never arrive.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = TRANSFER_RECONCILE_BATCH_SIZE,
+        concurrency: int = TRANSFER_RECONCILE_CONCURRENCY,
+        scan_limit: int = TRANSFER_RECONCILE_SCAN_LIMIT,
+    ):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.scan_limit = scan_limit
+        # transaction id -> monotonic time of the next allowed check
+        self._next_check = {}
+        # Id the next scan resumes after
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self.stats = {"checked": 0, "settled": 0, "still_pending": 0, "errors": 0}
+
+    def _due(self, db: Session) -> list:
+        """
+        Up to batch_size pending transfers whose next check is due. Reads
+        id-ordered pages of batch_size, resuming where the previous run
+        stopped and starting over once the end is reached, and stops after
+        scan_limit rows: a large backlog of transfers in backoff costs a
+        bounded amount per run instead of a full scan.
+        """
+        now = time.monotonic()
+        due, scanned = [], 0
+
+        while len(due) < self.batch_size and scanned < self.scan_limit:
+            start = self._cursor
+            rows = (
+                db.query(models.Transaction.id, models.Transaction.transfer_reference, models.Transaction.timestamp)
+                .filter(
+                    models.Transaction.id > start,
+                    models.Transaction.type.in_([
+                        models.TransactionType.transfer_out.value,
+                        models.TransactionType.withdraw.value,
+                    ]),
+                    models.Transaction.status == models.TransactionStatus.pending.value,
+                    models.Transaction.transfer_reference.isnot(None),
+                )
+                .order_by(models.Transaction.id)
+                .limit(self.batch_size)
+                .all()
+            )
+            scanned += len(rows)
+            end = rows[-1][0] if len(rows) == self.batch_size else None
+
+            with self._lock:
+                # Forget transactions in this id range that settled elsewhere (e.g. by webhook)
+                pending = {tx_id for tx_id, _, _ in rows}
+                for tx_id in list(self._next_check):
+                    if tx_id > start and (end is None or tx_id <= end) and tx_id not in pending:
+                        del self._next_check[tx_id]
+
+                due.extend(
+                    (tx_id, reference, timestamp)
+                    for tx_id, reference, timestamp in rows
+                    if self._next_check.get(tx_id, 0) <= now
+                )
+
+            if end is None:
+                # Reached the newest pending transfer; the next run starts over
+                self._cursor = 0
+                break
+            self._cursor = end
+
+        return due[:self.batch_size]
+
+    def _fetch(self, reference: str):
+        try:
+            return paystack_service.get_transfer_status(reference)
+        except Exception as e:
+            return e
+
+    def _settle(self, db: Session, results: dict):
+        """Apply final statuses under wallet locks taken in ascending id order."""
+        transactions = (
+            db.query(models.Transaction)
+            .filter(models.Transaction.id.in_(list(results)))
+            .all()
+        )
+        wallets = lock_wallets(db, {tx.wallet_id for tx in transactions})
+
+        settled = 0
+        for tx in (
+            db.query(models.Transaction)
+            .filter(models.Transaction.id.in_(list(results)))
+            .with_for_update()
+            .all()
+        ):
+            # Re-checked under lock: a webhook may have settled it meanwhile
+            if tx.status != models.TransactionStatus.pending.value:
+                continue
+            status = results[tx.id]
+            try:
+                webhook_service.apply_transfer_status(db, FINAL_STATUSES[status], tx, wallets.get(tx.wallet_id))
+            except WebhookIgnored:
+                continue
+            settled += 1
+
+        db.commit()
+        return settled
+
+    def run(self, db: Session) -> dict:
+        due = self._due(db)
+        if not due:
+            return {"checked": 0, "settled": 0}
+
+        with ThreadPoolExecutor(max_workers=max(self.concurrency, 1)) as pool:
+            statuses = list(pool.map(self._fetch, [reference for _, reference, _ in due]))
+
+        now = time.monotonic()
+        utcnow = datetime.utcnow()
+        final, errors = {}, 0
+        with self._lock:
+            for (tx_id, _, timestamp), status in zip(due, statuses):
+                if isinstance(status, Exception):
+                    errors += 1
+                elif status.get("status") in FINAL_STATUSES:
+                    final[tx_id] = status["status"]
+                    continue
+                age = (utcnow - timestamp).total_seconds() if timestamp else 0
+                self._next_check[tx_id] = now + check_interval(age)
+
+        settled = run_with_retry(db, "transfer_reconciler", lambda: self._settle(db, final)) if final else 0
+
+        with self._lock:
+            self.stats["checked"] += len(due)
+            self.stats["settled"] += settled
+            self.stats["still_pending"] += len(due) - len(final) - errors
+            self.stats["errors"] += errors
+
+        return {"checked": len(due), "settled": settled, "errors": errors}
+
+
+reconciler = TransferReconciler()
@@ -0,0 +1,299 @@
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+import json
+import time
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services import webhook_service
+from app.services.webhook_service import WebhookIgnored
+
+REPLAY_BATCH_SIZE = 500
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _lock_wallets(db: Session, events: list[models.WebhookEvent]) -> tuple[dict, dict, dict]:
+    """
+    Resolve and lock every wallet a batch touches, in ascending id order.
+
+    Returns wallets by id, wallet id by customer email, and transfer
+    transactions by reference.
+    """
+    payloads = {event.id: json.loads(event.payload).get("data", {}) for event in events}
+    emails = {
+        payloads[e.id].get("customer", {}).get("email")
+        for e in events if e.event == "charge.success"
+    } - {None}
+    references = {
+        payloads[e.id].get("reference")
+        for e in events if e.event != "charge.success"
+    } - {None}
+
+    users = (
+        db.query(models.User.id, models.User.email)
+        .filter(models.User.email.in_(list(emails)))
+        .all()
+    ) if emails else []
+    user_emails = {user_id: email for user_id, email in users}
+
+    transfers = (
+        db.query(models.Transaction)
+        .filter(models.Transaction.transfer_reference.in_(list(references)))
+        .all()
+    ) if references else []
+
+    wallet_rows = (
+        db.query(models.Wallet)
+        .filter(
+            (models.Wallet.user_id.in_(list(user_emails)))
+            | (models.Wallet.id.in_([tx.wallet_id for tx in transfers]))
+        )
+        .order_by(models.Wallet.id)
+        .with_for_update()
+        .all()
+    ) if user_emails or transfers else []
+
+    wallets = {wallet.id: wallet for wallet in wallet_rows}
+    by_email = {}
+    for wallet in wallet_rows:
+        email = user_emails.get(wallet.user_id)
+        if email and email not in by_email:
+            by_email[email] = wallet
+
+    # Users without a wallet get one, as the single-event path does
+    for user_id, email in user_emails.items():
+        if email not in by_email:
+            wallet = models.Wallet(user_id=user_id)
+            db.add(wallet)
+            db.flush()
+            wallets[wallet.id] = wallet
+            by_email[email] = wallet
+
+    if transfers:
+        # Re-read under lock now that the owning wallets are held
+        transfers = (
+            db.query(models.Transaction)
+            .filter(models.Transaction.id.in_([tx.id for tx in transfers]))
+            .with_for_update()
+            .all()
+        )
+
+    return wallets, by_email, {tx.transfer_reference: tx for tx in transfers}
+
+
+def _existing_deposits(db: Session, events: list[models.WebhookEvent]) -> set:
+    references = [e.reference for e in events if e.event == "charge.success"]
+    if not references:
+        return set()
+    return {
+        key for (key,) in
+        db.query(models.Transaction.idempotency_key)
+        .filter(
+            models.Transaction.type == "deposit",
+            models.Transaction.idempotency_key.in_(references),
+        )
+    }
+
+
+def _apply(db: Session, event: models.WebhookEvent, wallets, by_email, transfers, deposited) -> str:
+    data = json.loads(event.payload).get("data", {})
+
+    if event.event == "charge.success":
+        if event.reference in deposited:
+            raise WebhookIgnored("Already applied")
+        wallet = by_email.get(data.get("customer", {}).get("email"))
+        if wallet is None:
+            raise ValueError("User not found")
+        webhook_service.apply_charge_success(db, data, wallet=wallet)
+        deposited.add(event.reference)
+
+    elif event.event in webhook_service.TRANSFER_EVENTS:
+        tx = transfers.get(event.reference)
+        if tx is None:
+            raise WebhookIgnored("Unknown transfer reference")
+        webhook_service.apply_transfer_status(db, event.event, tx, wallets.get(tx.wallet_id))
+
+    else:
+        raise WebhookIgnored(f"Unhandled event {event.event}")
+
+    return models.WebhookStatus.processed.value
+
+
+def apply_batch(db: Session, events: list[models.WebhookEvent]) -> list[dict]:
+    """
+    Apply a batch of stored events under one set of wallet locks and one
+    commit. Each event runs in a savepoint so one failure doesn't sink the
+    batch; failures go through the normal retry/dead-letter bookkeeping.
+    """
+    wallets, by_email, transfers = _lock_wallets(db, events)
+    deposited = _existing_deposits(db, events)
+    outcomes = []
+
+    for event in events:
+        savepoint = db.begin_nested()
+        error = None
+        try:
+            status = _apply(db, event, wallets, by_email, transfers, deposited)
+            db.flush()
+            savepoint.commit()
+            webhook_service.mark_processed(event, status)
+        except WebhookIgnored as e:
+            savepoint.rollback()
+            status = models.WebhookStatus.ignored.value
+            error = str(e)
+            webhook_service.mark_processed(event, status)
+            event.last_error = error
+        except Exception as e:
+            savepoint.rollback()
+            error = str(e)
+            webhook_service.mark_failed(event, e)
+            status = event.status
+
+        outcomes.append({
+            "id": event.id,
+            "reference": event.reference,
+            "event": event.event,
+            "outcome": status,
+            "error": error,
+        })
+
+    db.commit()
+    return outcomes
+
+
+def _summary(outcomes: list[dict], duplicates: int, started: float) -> dict:
+    elapsed = time.perf_counter() - started
+    counts = {}
+    for outcome in outcomes:
+        counts[outcome["outcome"]] = counts.get(outcome["outcome"], 0) + 1
+
+    return {
+        "events": len(outcomes),
+        "duplicates_skipped": duplicates,
+        "by_outcome": counts,
+        "elapsed_seconds": round(elapsed, 3),
+        "events_per_second": round(len(outcomes) / elapsed, 1) if elapsed else None,
+        "outcomes": outcomes,
+    }
+
+
+def replay_stored(
+    db: Session,
+    from_id: Optional[int] = None,
+    to_id: Optional[int] = None,
+    statuses: Iterable[str] = ("pending", "dead"),
+    batch_size: int = REPLAY_BATCH_SIZE,
+) -> dict:
+    """Re-drive stored events in an id range, `batch_size` at a time."""
+    started = time.perf_counter()
+    outcomes = []
+    after_id = (from_id - 1) if from_id is not None else 0
+
+    while True:
+        query = (
+            db.query(models.WebhookEvent)
+            .filter(
+                models.WebhookEvent.id > after_id,
+                models.WebhookEvent.status.in_(list(statuses)),
+            )
+        )
+        if to_id is not None:
+            query = query.filter(models.WebhookEvent.id <= to_id)
+
+        events = (
+            query.order_by(models.WebhookEvent.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not events:
+            break
+
+        after_id = events[-1].id
+        for event in events:
+            # Replays are manual: give dead events a fresh retry budget
+            event.attempts = 0
+        outcomes.extend(apply_batch(db, events))
+
+    return _summary(outcomes, 0, started)
+
+
+def replay_payloads(
+    db: Session,
+    payloads: Iterable[dict],
+    batch_size: int = REPLAY_BATCH_SIZE,
+) -> dict:
+    """
+    Ingest and apply raw Paystack payloads (e.g. exported from the
+    dashboard), skipping (reference, event) pairs already stored or repeated
+    in the input.
+    """
+    started = time.perf_counter()
+    outcomes = []
+    duplicates = 0
+    seen = set()
+
+    for chunk in _chunks(payloads, batch_size):
+        candidates = {}
+        for payload in chunk:
+            reference = payload.get("data", {}).get("reference")
+            if payload.get("event") not in webhook_service.HANDLED_EVENTS or not reference:
+                outcomes.append({
+                    "id": None,
+                    "reference": reference,
+                    "event": payload.get("event"),
+                    "outcome": models.WebhookStatus.ignored.value,
+                    "error": "Unhandled event or missing reference",
+                })
+                continue
+            key = (reference, payload["event"])
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            candidates[key] = payload
+
+        stored = set(
+            db.query(models.WebhookEvent.reference, models.WebhookEvent.event)
+            .filter(models.WebhookEvent.reference.in_([reference for reference, _ in candidates]))
+        ) & set(candidates) if candidates else set()
+        duplicates += len(stored)
+
+        events = [
+            models.WebhookEvent(
+                provider="paystack",
+                event=payload["event"],
+                reference=reference,
+                payload=json.dumps(payload),
+                status=models.WebhookStatus.processing.value,
+                claimed_at=datetime.utcnow(),
+            )
+            for (reference, _), payload in candidates.items()
+            if (reference, payload["event"]) not in stored
+        ]
+        if not events:
+            continue
+
+        db.add_all(events)
+        db.flush()
+        outcomes.extend(apply_batch(db, events))
+
+    return _summary(outcomes, duplicates, started)
+
+
+def read_ndjson(lines: Iterable[str]) -> Iterator[dict]:
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
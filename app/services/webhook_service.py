@@ -0,0 +1,477 @@
+from datetime import datetime, timedelta
+from typing import Optional
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+from app.locking import lock_wallet
+from app.services.wallet_service import credit_wallet
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY")
+
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))
+WEBHOOK_POLL_SECONDS = float(os.getenv("WEBHOOK_POLL_SECONDS", "0.5"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "200"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+# Events claimed longer ago than this are assumed orphaned by a crashed worker
+WEBHOOK_CLAIM_TIMEOUT_SECONDS = int(os.getenv("WEBHOOK_CLAIM_TIMEOUT_SECONDS", "300"))
+# Claims still queued in memory are renewed this often, well inside the timeout
+WEBHOOK_CLAIM_RENEW_SECONDS = WEBHOOK_CLAIM_TIMEOUT_SECONDS / 3
+
+# Transfer events -> the terminal status each moves a pending transfer to
+TRANSFER_EVENTS = {
+    "transfer.success": models.TransactionStatus.success.value,
+    "transfer.failed": models.TransactionStatus.failed.value,
+    "transfer.reversed": models.TransactionStatus.reversed.value,
+}
+# Terminal statuses that hand the debited amount back to the wallet
+REFUNDED_STATUSES = {models.TransactionStatus.failed.value, models.TransactionStatus.reversed.value}
+# Status changes transfer events may make; anything else is a redelivery or arrived too late
+TRANSFER_TRANSITIONS = {
+    models.TransactionStatus.pending.value: set(TRANSFER_EVENTS.values()),
+    # Paystack can reverse a transfer after reporting it successful
+    models.TransactionStatus.success.value: {models.TransactionStatus.reversed.value},
+}
+
+HANDLED_EVENTS = ("charge.success", *TRANSFER_EVENTS)
+
+
+class WebhookIgnored(Exception):
+    """The event is valid but there is nothing to apply (e.g. unknown transfer)."""
+
+
+def verify_signature(body: bytes, signature: str) -> bool:
+    computed = hmac.new(
+        PAYSTACK_SECRET_KEY.encode(),
+        body,
+        hashlib.sha512
+    ).hexdigest()
+    return hmac.compare_digest(computed, signature)
+
+
+# -------------------- Apply --------------------
+def apply_charge_success(db: Session, data: dict, wallet: Optional[models.Wallet] = None):
+    reference = data.get("reference")
+    amount_kobo = data.get("amount")
+    email = data.get("customer", {}).get("email")
+
+    if not all([reference, amount_kobo, email]):
+        raise ValueError("Missing fields")
+
+    if wallet is None:
+        user = db.query(models.User)\
+            .filter_by(email=email)\
+            .first()
+
+        if not user:
+            raise ValueError("User not found")
+
+        wallet_id = db.query(models.Wallet.id)\
+            .filter_by(user_id=user.id)\
+            .order_by(models.Wallet.id)\
+            .limit(1)\
+            .scalar()
+        wallet = lock_wallet(db, wallet_id) if wallet_id else None
+
+        if not wallet:
+            wallet = models.Wallet(user_id=user.id)
+            db.add(wallet)
+            db.flush()
+
+    tx = models.Transaction(
+        wallet_id=wallet.id,
+        amount_kobo=amount_kobo,
+        type="deposit",
+        idempotency_key=reference,
+        operation_id=str(uuid.uuid4()),
+        currency="NGN",
+        timestamp=datetime.utcnow(),
+        status="success"
+    )
+
+    db.add(tx)
+    credit_wallet(db, wallet, amount_kobo)
+    return wallet
+
+
+def apply_transfer_result(db: Session, event: str, data: dict):
+    reference = data.get("reference")
+
+    # Wallet first, then the transaction: the same order as every other
+    # path that settles transfers, so they can't deadlock on each other
+    wallet_id = db.query(models.Transaction.wallet_id)\
+        .filter(models.Transaction.transfer_reference == reference)\
+        .scalar()
+
+    if wallet_id is None:
+        raise WebhookIgnored("Unknown transfer reference")
+
+    wallet = lock_wallet(db, wallet_id)
+    tx = db.query(models.Transaction)\
+        .filter(models.Transaction.transfer_reference == reference)\
+        .with_for_update()\
+        .first()
+
+    return apply_transfer_status(db, event, tx, wallet)
+
+
+def apply_transfer_status(db: Session, event: str, tx: models.Transaction, wallet: Optional[models.Wallet] = None):
+    """
+    Move a transfer to the status for `event` (see TRANSFER_TRANSITIONS),
+    refunding failed and reversed ones. A pending transfer can settle any
+    way and a successful one can still be reversed; refunded statuses are
+    final, so a redelivered, replayed or late event is ignored and nothing
+    is refunded twice or flipped back to success after a refund.
+    """
+    target = TRANSFER_EVENTS[event]
+    if target not in TRANSFER_TRANSITIONS.get(tx.status, ()):
+        raise WebhookIgnored(f"Transfer already {tx.status}")
+
+    tx.status = target
+
+    if tx.status in REFUNDED_STATUSES:
+        if wallet is None:
+            wallet = lock_wallet(db, tx.wallet_id)
+
+        wallet.balance_kobo += tx.amount_kobo
+
+    return tx
+
+
+def apply_event(db: Session, event: models.WebhookEvent):
+    """Apply one stored event's business effect. Does not commit."""
+    payload = json.loads(event.payload)
+    data = payload.get("data", {})
+
+    if event.event == "charge.success":
+        return apply_charge_success(db, data)
+
+    if event.event in TRANSFER_EVENTS:
+        return apply_transfer_result(db, event.event, data)
+
+    raise WebhookIgnored(f"Unhandled event {event.event}")
+
+
+# -------------------- Outcomes --------------------
+def mark_processed(event: models.WebhookEvent, status: str = models.WebhookStatus.processed.value):
+    event.status = status
+    event.processed_at = datetime.utcnow()
+    event.last_error = None
+
+
+def mark_failed(event: models.WebhookEvent, error: Exception):
+    """Schedule a retry with exponential backoff, or dead-letter the event."""
+    event.attempts = (event.attempts or 0) + 1
+    event.last_error = str(error)[:500]
+    event.claimed_at = None
+
+    if event.attempts >= WEBHOOK_MAX_ATTEMPTS:
+        event.status = models.WebhookStatus.dead.value
+    else:
+        event.status = models.WebhookStatus.pending.value
+        event.next_attempt_at = datetime.utcnow() + timedelta(seconds=2 ** event.attempts)
+
+
+def _take(db: Session, event_id: int, claimed_at: datetime) -> Optional[models.WebhookEvent]:
+    """Lock the event if it is still claimed by us (the claim is its claimed_at)."""
+    return db.query(models.WebhookEvent)\
+        .filter(
+            models.WebhookEvent.id == event_id,
+            models.WebhookEvent.status == models.WebhookStatus.processing.value,
+            models.WebhookEvent.claimed_at == claimed_at,
+        )\
+        .with_for_update()\
+        .first()
+
+
+def process_event(event_id: int, claimed_at: datetime) -> Optional[str]:
+    """
+    Apply a claimed event in its own transaction and record the outcome.
+    Returns None without touching it if the claim was lost (timed out and
+    taken over elsewhere), so an event is never applied twice.
+    """
+    db = SessionLocal()
+    try:
+        event = _take(db, event_id, claimed_at)
+        if event is None:
+            db.rollback()
+            return None
+        try:
+            apply_event(db, event)
+            mark_processed(event)
+        except WebhookIgnored as e:
+            db.rollback()
+            event = _take(db, event_id, claimed_at)
+            if event is None:
+                return None
+            mark_processed(event, models.WebhookStatus.ignored.value)
+            event.last_error = str(e)
+        except Exception as e:
+            db.rollback()
+            event = _take(db, event_id, claimed_at)
+            if event is None:
+                return None
+            mark_failed(event, e)
+
+        db.commit()
+        return event.status
+    finally:
+        db.close()
+
+
+# -------------------- Claiming --------------------
+def _wallet_ids_for(db: Session, events: list) -> dict:
+    """Best-effort wallet for each event, resolved in two set queries."""
+    emails, references = {}, {}
+    for event in events:
+        data = json.loads(event.payload).get("data", {})
+        if event.event == "charge.success":
+            emails[event.id] = data.get("customer", {}).get("email")
+        else:
+            references[event.id] = data.get("reference")
+
+    by_email = dict(
+        db.query(models.User.email, models.Wallet.id)
+        .join(models.Wallet, models.Wallet.user_id == models.User.id)
+        .filter(models.User.email.in_([e for e in emails.values() if e]))
+        .all()
+    ) if emails else {}
+
+    by_reference = dict(
+        db.query(models.Transaction.transfer_reference, models.Transaction.wallet_id)
+        .filter(models.Transaction.transfer_reference.in_([r for r in references.values() if r]))
+        .all()
+    ) if references else {}
+
+    wallet_ids = {event_id: by_email.get(email) for event_id, email in emails.items()}
+    wallet_ids.update({event_id: by_reference.get(ref) for event_id, ref in references.items()})
+    return wallet_ids
+
+
+def claim_pending(db: Session, limit: int = WEBHOOK_BATCH_SIZE) -> list:
+    """Claim due pending events in id order, returning (event_id, wallet_id, claimed_at)."""
+    now = datetime.utcnow()
+
+    # Recover events orphaned by a worker that died mid-processing
+    db.execute(
+        update(models.WebhookEvent)
+        .where(
+            models.WebhookEvent.status == models.WebhookStatus.processing.value,
+            models.WebhookEvent.claimed_at < now - timedelta(seconds=WEBHOOK_CLAIM_TIMEOUT_SECONDS),
+        )
+        .values(status=models.WebhookStatus.pending.value, claimed_at=None)
+    )
+
+    events = (
+        db.query(models.WebhookEvent)
+        .filter(
+            models.WebhookEvent.status == models.WebhookStatus.pending.value,
+            models.WebhookEvent.next_attempt_at <= now,
+        )
+        .order_by(models.WebhookEvent.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    if not events:
+        db.commit()
+        return []
+
+    wallet_ids = _wallet_ids_for(db, events)
+    for event in events:
+        event.status = models.WebhookStatus.processing.value
+        event.claimed_at = now
+        event.wallet_id = wallet_ids.get(event.id)
+
+    db.commit()
+    return [(event.id, event.wallet_id, now) for event in events]
+
+
+def renew_claims(db: Session, claims: dict) -> dict:
+    """
+    Move claimed_at forward on events still processing under the given
+    claims ({event_id: claimed_at}) so they aren't recovered as orphaned
+    while they wait in memory. Returns the new claims; one lost meanwhile
+    keeps a value that no longer matches, so its worker will skip it.
+    """
+    now = datetime.utcnow()
+    by_claim = {}
+    for event_id, claimed_at in claims.items():
+        by_claim.setdefault(claimed_at, []).append(event_id)
+
+    for claimed_at, event_ids in by_claim.items():
+        db.execute(
+            update(models.WebhookEvent)
+            .where(
+                models.WebhookEvent.id.in_(event_ids),
+                models.WebhookEvent.status == models.WebhookStatus.processing.value,
+                models.WebhookEvent.claimed_at == claimed_at,
+            )
+            .values(claimed_at=now)
+        )
+    db.commit()
+    return {event_id: now for event_id in claims}
+
+
+# -------------------- Worker pool --------------------
+class WebhookProcessor:
+    """
+    Drains stored webhook events in the background.
+
+    A dispatcher claims due events in id order and routes each to a worker
+    chosen by wallet id, so events for one wallet are applied in order by a
+    single thread while different wallets proceed in parallel. Claims on
+    events still waiting in the queues are renewed, so a backlog here is
+    never mistaken for a crashed worker's.
+    """
+
+    def __init__(self, workers: int = WEBHOOK_WORKERS, poll_seconds: float = WEBHOOK_POLL_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._queues = [queue.Queue() for _ in range(workers)]
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        # event id -> claimed_at for events queued here and not yet picked up
+        self._claims = {}
+        self._claims_lock = threading.Lock()
+        self._renewed_at = time.monotonic()
+        self.stats = {"processed": 0, "ignored": 0, "retried": 0, "dead": 0, "claim_lost": 0}
+        self._stats_lock = threading.Lock()
+
+    def queue_depth(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def notify(self):
+        """Wake the dispatcher early, e.g. right after an event is stored."""
+        self._wake.set()
+
+    def _record(self, status: Optional[str]):
+        key = {"pending": "retried", None: "claim_lost"}.get(status, status)
+        with self._stats_lock:
+            if key in self.stats:
+                self.stats[key] += 1
+
+    def _work(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                event_id = q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            # Popped under the lock so a renewal can't change the claim mid-flight
+            with self._claims_lock:
+                claimed_at = self._claims.pop(event_id, None)
+            try:
+                if claimed_at is not None:
+                    self._record(process_event(event_id, claimed_at))
+            except Exception:
+                logger.exception("Webhook event %s failed", event_id)
+            finally:
+                q.task_done()
+
+    def _renew_claims(self):
+        if time.monotonic() - self._renewed_at < WEBHOOK_CLAIM_RENEW_SECONDS:
+            return
+        self._renewed_at = time.monotonic()
+
+        db = SessionLocal()
+        try:
+            # Held across the update so workers see either the old claim or the new one
+            with self._claims_lock:
+                if self._claims:
+                    self._claims.update(renew_claims(db, self._claims))
+        except Exception:
+            db.rollback()
+            logger.exception("Renewing webhook claims failed")
+        finally:
+            db.close()
+
+    def _dispatch(self):
+        while not self._stop.is_set():
+            self._renew_claims()
+            claimed = []
+            # Don't claim more while workers still have a full batch queued
+            if self.queue_depth() < WEBHOOK_BATCH_SIZE:
+                db = SessionLocal()
+                try:
+                    claimed = claim_pending(db)
+                except Exception:
+                    db.rollback()
+                    logger.exception("Webhook dispatch failed")
+                finally:
+                    db.close()
+
+            with self._claims_lock:
+                self._claims.update({event_id: claimed_at for event_id, _, claimed_at in claimed})
+            for event_id, wallet_id, _ in claimed:
+                self._queues[(wallet_id or event_id) % self.workers].put(event_id)
+
+            if len(claimed) < WEBHOOK_BATCH_SIZE:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def start(self):
+        if self.workers <= 0 or self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, args=(q,), name=f"webhook-worker-{i}", daemon=True)
+            for i, q in enumerate(self._queues)
+        ]
+        self._threads.append(threading.Thread(target=self._dispatch, name="webhook-dispatch", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+
+processor = WebhookProcessor()
+
+
+def queue_stats(db: Session) -> dict:
+    counts = dict(
+        db.query(models.WebhookEvent.status, func.count(models.WebhookEvent.id))
+        .group_by(models.WebhookEvent.status)
+        .all()
+    )
+    oldest_pending = (
+        db.query(func.min(models.WebhookEvent.received_at))
+        .filter(models.WebhookEvent.status.in_([
+            models.WebhookStatus.pending.value,
+            models.WebhookStatus.processing.value,
+        ]))
+        .scalar()
+    )
+
+    return {
+        "by_status": counts,
+        "in_memory_queue_depth": processor.queue_depth(),
+        "workers": processor.workers,
+        "lag_seconds": (
+            (datetime.utcnow() - oldest_pending).total_seconds()
+            if oldest_pending else 0.0
+        ),
+        "since_start": dict(processor.stats),
+    }
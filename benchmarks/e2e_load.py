@@ -0,0 +1,306 @@
+# End-to-end throughput and latency of the main wallet flows.
+#
+#   python -m benchmarks.e2e_load [--mode asgi|http] [--requests 500] [--concurrency 32]
+#   DATABASE_URL=postgresql://... python -m benchmarks.e2e_load --mode http --workers 4
+#
+# Seeds users and wallets, then drives register, login, deposit, withdraw,
+# wallet transfer, bank transfer and Paystack webhooks one endpoint at a
+# time (then all of them mixed) and prints requests/sec and p50/p95/p99
+# per endpoint as JSON, tagged with the git commit so runs can be compared.
+#
+# --mode asgi calls the app in-process through httpx's ASGI transport (no
+# sockets, one process); --mode http starts uvicorn with --workers and
+# goes over real HTTP. Either way Paystack is the mock HTTP server from
+# app/mock_paystack/server.py with --paystack-latency-ms per call, so bank
+# transfers pay realistic upstream time through the real httpx client, and
+# webhooks are signed and go through the real verification path.
+#
+# Rate limits are off and fraud velocity limits raised unless already set
+# in the environment, so the normal (unheld, unthrottled) path is measured.
+# On SQLite, concurrent writers serialise on the database lock; expect
+# 503s from lock retries at high concurrency there.
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+BENCH_SECRET = "bench-paystack-secret"
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("PAYSTACK_SECRET_KEY", BENCH_SECRET)
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("FRAUD_THRESHOLD", "1000")
+os.environ["USE_MOCK_PAYSTACK"] = "false"
+
+ENDPOINTS = ["register", "login", "deposit", "withdraw", "wallet_transfer", "bank_transfer", "webhook"]
+PASSWORD = "bench-password"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def percentile(latencies: list, pct: float) -> float:
+    if not latencies:
+        return None
+    index = min(len(latencies) - 1, max(0, round(pct / 100 * len(latencies)) - 1))
+    return round(latencies[index] * 1000, 2)
+
+
+# -------------------- Mock Paystack --------------------
+def start_mock_paystack(latency_ms: float, jitter_ms: float):
+    import uvicorn
+    from app.mock_paystack.server import create_app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(latency_ms, jitter_ms), host="127.0.0.1", port=port, log_level="warning",
+    ))
+    thread = threading.Thread(target=server.run, name="Mock Paystack", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+# -------------------- Seed --------------------
+def seed(users: int, run_id: str) -> list:
+    """Users with funded wallets and a known password; returns their details."""
+    from app import models, security
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    hashed = security.hash_password(PASSWORD)
+    db = SessionLocal()
+    try:
+        rows = [
+            models.User(
+                email=f"bench-{run_id}-{i}@example.com",
+                username=f"bench-{run_id}-{i}",
+                phone_number=f"{run_id}{i}",
+                hashed_password=hashed,
+            )
+            for i in range(users)
+        ]
+        db.add_all(rows)
+        db.flush()
+        wallets = [models.Wallet(user_id=user.id, balance_kobo=10 ** 12) for user in rows]
+        db.add_all(wallets)
+        db.commit()
+        return [
+            {
+                "id": user.id,
+                "email": user.email,
+                "username": user.username,
+                "wallet_id": wallet.id,
+                "token": security.create_access_token({"sub": str(user.id)}, expires_delta=24 * 60),
+            }
+            for user, wallet in zip(rows, wallets)
+        ]
+    finally:
+        db.close()
+
+
+# -------------------- Requests --------------------
+def make_request(endpoint: str, users: list, i: int, run_id: str) -> tuple:
+    """(method, path, json body, headers) for the i-th call to `endpoint`."""
+    user = users[i % len(users)]
+    auth = {"Authorization": f"Bearer {user['token']}", "Idempotency-Key": str(uuid.uuid4())}
+
+    if endpoint == "register":
+        email = f"bench-{run_id}-reg{i}@example.com"
+        return "POST", "/auth/register", {
+            "username": f"bench-{run_id}-reg{i}", "email": email,
+            "password": PASSWORD, "phone_number": f"r{run_id}{i}",
+        }, {}
+    if endpoint == "login":
+        return "POST", "/auth/login", {"email": user["email"], "password": PASSWORD}, {}
+    if endpoint == "deposit":
+        return "POST", f"/wallets/{user['wallet_id']}/deposit", {"amount_kobo": 10_000}, auth
+    if endpoint == "withdraw":
+        return "POST", f"/wallets/{user['wallet_id']}/withdraw", {"amount_kobo": 100}, auth
+    if endpoint == "wallet_transfer":
+        recipient = users[(i + 1) % len(users)]
+        return "POST", "/wallets/transfer", {
+            "amount_kobo": 100, "destination_type": "wallet", "username": recipient["username"],
+        }, auth
+    if endpoint == "bank_transfer":
+        return "POST", "/wallets/transfer", {
+            "amount_kobo": 100, "destination_type": "bank",
+            "bank_code": "000", "account_number": f"{i % 50:010d}",
+        }, auth
+    if endpoint == "webhook":
+        body = json.dumps({
+            "event": "charge.success",
+            "data": {
+                "reference": f"bench-{run_id}-{uuid.uuid4().hex}",
+                "amount": 5_000,
+                "currency": "NGN",
+                "customer": {"email": user["email"]},
+            },
+        }).encode()
+        signature = hmac.new(os.environ["PAYSTACK_SECRET_KEY"].encode(), body, hashlib.sha512).hexdigest()
+        return "POST", "/webhook/paystack", body, {"x-paystack-signature": signature, "Content-Type": "application/json"}
+    raise ValueError(endpoint)
+
+
+async def drive(client, endpoints: list, users: list, total: int, concurrency: int, run_id: str) -> dict:
+    """Send `total` requests cycling through `endpoints`; stats per endpoint."""
+    latencies = {endpoint: [] for endpoint in endpoints}
+    statuses = {endpoint: Counter() for endpoint in endpoints}
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            endpoint = endpoints[i % len(endpoints)]
+            method, path, body, headers = make_request(endpoint, users, i, run_id)
+            start = time.perf_counter()
+            try:
+                if isinstance(body, bytes):
+                    response = await client.request(method, path, content=body, headers=headers)
+                else:
+                    response = await client.request(method, path, json=body, headers=headers)
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+            latencies[endpoint].append(time.perf_counter() - start)
+            statuses[endpoint][str(status)] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    results = {}
+    for endpoint in endpoints:
+        samples = sorted(latencies[endpoint])
+        ok = sum(count for status, count in statuses[endpoint].items() if status.startswith("2"))
+        results[endpoint] = {
+            "requests": len(samples),
+            "errors": len(samples) - ok,
+            "status_codes": dict(statuses[endpoint]),
+            "rps": round(len(samples) / elapsed, 1),
+            "p50_ms": percentile(samples, 50),
+            "p95_ms": percentile(samples, 95),
+            "p99_ms": percentile(samples, 99),
+        }
+    if len(endpoints) > 1:
+        results["_total"] = {"requests": total, "rps": round(total / elapsed, 1)}
+    return results
+
+
+async def run_phases(client, endpoints: list, users: list, total: int, concurrency: int, run_id: str) -> dict:
+    results = {}
+    for endpoint in endpoints:
+        results[endpoint] = (await drive(client, [endpoint], users, total, concurrency, run_id))[endpoint]
+    if len(endpoints) > 1:
+        results["mixed"] = await drive(client, endpoints, users, total * len(endpoints), concurrency, run_id + "m")
+    return results
+
+
+# -------------------- Modes --------------------
+async def run_asgi(args, users: list, run_id: str) -> dict:
+    import httpx
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await run_phases(client, args.endpoints, users, args.requests, args.concurrency, run_id)
+
+
+async def run_http(args, users: list, run_id: str) -> dict:
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("uvicorn did not start")
+                await asyncio.sleep(0.2)
+            return await run_phases(client, args.endpoints, users, args.requests, args.concurrency, run_id)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main(args) -> dict:
+    mock_server, mock_thread, mock_url = start_mock_paystack(args.paystack_latency_ms, args.paystack_jitter_ms)
+    os.environ["PAYSTACK_BASE_URL"] = mock_url
+
+    run_id = uuid.uuid4().hex[:8]
+    try:
+        users = seed(args.users, run_id)
+        runner = run_asgi if args.mode == "asgi" else run_http
+        results = asyncio.run(runner(args, users, run_id))
+    finally:
+        mock_server.should_exit = True
+        mock_thread.join(timeout=5)
+
+    from app.database import engine
+
+    return {
+        "commit": git_commit(),
+        "database": engine.url.get_backend_name(),
+        "mode": args.mode,
+        "workers": args.workers if args.mode == "http" else 1,
+        "concurrency": args.concurrency,
+        "requests_per_endpoint": args.requests,
+        "users": args.users,
+        "paystack_latency_ms": args.paystack_latency_ms,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["asgi", "http"], default="asgi")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint phase")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (http mode)")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--paystack-latency-ms", type=float, default=100)
+    parser.add_argument("--paystack-jitter-ms", type=float, default=50)
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    report = json.dumps(main(args), indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
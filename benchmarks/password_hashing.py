@@ -0,0 +1,66 @@
+# Argon2 throughput on this host for a few parameter sets.
+#
+#   python -m benchmarks.password_hashing [--seconds 3] [--workers 4]
+#
+# Prints hashes/sec single-threaded and across a worker pool as JSON, to
+# help pick ARGON2_* and PASSWORD_HASH_WORKERS values.
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.passwords import make_context
+
+PARAMETER_SETS = [
+    # (time_cost, memory_cost KiB, parallelism)
+    (2, 19456, 1),   # OWASP minimum
+    (3, 65536, 4),   # passlib default (current production)
+    (4, 131072, 4),
+]
+
+
+def _hash_for(params: tuple, seconds: float) -> int:
+    context = make_context(*params)
+    deadline = time.perf_counter() + seconds
+    count = 0
+    while time.perf_counter() < deadline:
+        context.hash("benchmark-password")
+        count += 1
+    return count
+
+
+def run(seconds: float, workers: int) -> list[dict]:
+    results = []
+    for params in PARAMETER_SETS:
+        context = make_context(*params)
+        start = time.perf_counter()
+        context.hash("benchmark-password")
+        single_latency = time.perf_counter() - start
+
+        single = _hash_for(params, seconds) / seconds
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = pool.map(_hash_for, [params] * workers, [seconds] * workers)
+            pooled = sum(counts) / seconds
+
+        time_cost, memory_cost, parallelism = params
+        results.append({
+            "time_cost": time_cost,
+            "memory_cost_kib": memory_cost,
+            "parallelism": parallelism,
+            "latency_ms": round(single_latency * 1000, 2),
+            "hashes_per_sec_single": round(single, 2),
+            "hashes_per_sec_pool": round(pooled, 2),
+            "workers": workers,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.seconds, args.workers), indent=2))
@@ -0,0 +1,108 @@
+# Per-request cost of the rate-limit middleware.
+#
+#   python -m benchmarks.rate_limit_overhead [--requests 50000] [--users 1000]
+#
+# Drives a bare ASGI endpoint directly (no HTTP, no routing) with and
+# without RateLimitMiddleware in front, so the difference is the limiter
+# alone: policy match, cached token lookup and one bucket take. Limits are
+# set high enough that nothing is rejected. Also times the in-memory
+# bucket on its own, single-threaded and across threads sharing its lock.
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.ratelimit import Limit, MemoryBucketStore, Policy, RateLimitMiddleware
+from app.security import create_access_token
+
+UNLIMITED = "1000000000/1"
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def scopes(path: str, users: int) -> list:
+    tokens = [create_access_token({"sub": str(user_id)}) for user_id in range(1, users + 1)]
+    return [
+        {
+            "type": "http",
+            "method": "POST",
+            "path": path,
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+            "client": (f"10.0.{i // 256 % 256}.{i % 256}", 50000),
+        }
+        for i, token in enumerate(tokens)
+    ]
+
+
+async def drive(app, requests: list, total: int) -> float:
+    start = time.perf_counter()
+    for i in range(total):
+        await app(requests[i % len(requests)], receive, send)
+    return time.perf_counter() - start
+
+
+def per_request_us(elapsed: float, total: int) -> float:
+    return round(elapsed / total * 1e6, 3)
+
+
+def bucket_throughput(total: int, threads: int, keys: int) -> dict:
+    store = MemoryBucketStore()
+    limit = Limit.parse(UNLIMITED)
+    per_thread = total // threads
+
+    def worker(offset: int):
+        for i in range(per_thread):
+            store.take_sync(f"k{(offset + i) % keys}", limit)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+    return {"threads": threads, "takes_per_second": round(per_thread * threads / elapsed)}
+
+
+def main(total: int, users: int) -> dict:
+    policy = Policy("transfer", "POST", r"^/wallets/transfer(/bulk)?/?$", user=UNLIMITED, ip=UNLIMITED)
+    limited = RateLimitMiddleware(endpoint, policies=[policy], store=MemoryBucketStore(), enabled=True)
+
+    matched = scopes("/wallets/transfer", users)
+    unmatched = [dict(scope, path="/transactions/my") for scope in matched]
+
+    # Warm the token cache so steady state is measured, not first decodes
+    asyncio.run(drive(limited, matched, len(matched)))
+
+    baseline = asyncio.run(drive(endpoint, matched, total))
+    limited_run = asyncio.run(drive(limited, matched, total))
+    passthrough = asyncio.run(drive(limited, unmatched, total))
+
+    return {
+        "requests": total,
+        "distinct_users": users,
+        "bare_endpoint_us": per_request_us(baseline, total),
+        "limited_route_us": per_request_us(limited_run, total),
+        "unlimited_route_us": per_request_us(passthrough, total),
+        "overhead_limited_us": per_request_us(limited_run - baseline, total),
+        "overhead_unlimited_us": per_request_us(passthrough - baseline, total),
+        "memory_bucket": [bucket_throughput(total, threads, users) for threads in (1, 4, 16)],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(json.dumps(main(args.requests, args.users), indent=2))
@@ -0,0 +1,156 @@
+# Listing serialization: ORM objects + Pydantic vs column tuples + orjson.
+#
+#   python -m benchmarks.serialization [--rows 100 1000] [--seconds 2]
+#
+# For a TransactionOut page (/transactions/my) and the full-row admin
+# listing (/admin/audit/transactions), times query + serialization to
+# response bytes both ways against the same seeded rows, and checks the
+# two produce identical JSON. The "orm" side is what those routes did
+# before: ORM rows validated through response_model (or jsonable_encoder)
+# and encoded with json.dumps the way FastAPI's JSONResponse does.
+import argparse
+import json
+import os
+import time
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app import models, schemas, serialization  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.services import transaction_service  # noqa: E402
+
+BENCH_EMAIL = "bench-serialization@example.com"
+
+page_adapter = TypeAdapter(List[schemas.TransactionOut])
+
+
+def seed(rows: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter_by(email=BENCH_EMAIL).first()
+        if not user:
+            user = models.User(email=BENCH_EMAIL, hashed_password="x", username="bench-serialization", phone_number="0")
+            db.add(user)
+            db.flush()
+            db.add(models.Wallet(user_id=user.id, balance_kobo=0))
+            db.flush()
+        wallet_id = db.query(models.Wallet.id).filter_by(user_id=user.id).scalar()
+
+        existing = db.query(models.Transaction).filter_by(wallet_id=wallet_id).count()
+        db.add_all([
+            models.Transaction(
+                wallet_id=wallet_id,
+                amount_kobo=100 + i,
+                type="transfer_out" if i % 2 else "deposit",
+                status="success",
+                idempotency_key=f"bench-serialization-{i}",
+                transfer_reference=f"ref-{i}" if i % 3 == 0 else None,
+            )
+            for i in range(existing, rows)
+        ])
+        db.commit()
+        return wallet_id
+    finally:
+        db.close()
+
+
+def _dumps(content) -> bytes:
+    # starlette JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+# -------------------- TransactionOut page --------------------
+def page_orm(db, wallet_id: int, limit: int) -> bytes:
+    query = transaction_service.newest_first(
+        select(models.Transaction).where(models.Transaction.wallet_id == wallet_id), limit
+    )
+    transactions = db.execute(query).scalars().all()
+    return _dumps(page_adapter.dump_python(page_adapter.validate_python(transactions, from_attributes=True), mode="json"))
+
+
+def page_fast(db, wallet_id: int, limit: int) -> bytes:
+    query = transaction_service.newest_first(
+        select(*serialization.TRANSACTION_OUT_COLUMNS).where(models.Transaction.wallet_id == wallet_id), limit
+    )
+    return serialization.dumps(serialization.transaction_out(db.execute(query).all()))
+
+
+# -------------------- Full rows (admin audit) --------------------
+def audit_orm(db, wallet_id: int, limit: int) -> bytes:
+    transactions = db.query(models.Transaction).order_by(models.Transaction.timestamp.desc()).limit(limit).all()
+    return _dumps(jsonable_encoder(transactions))
+
+
+def audit_fast(db, wallet_id: int, limit: int) -> bytes:
+    rows = (
+        db.query(*serialization.TRANSACTION_COLUMNS)
+        .order_by(models.Transaction.timestamp.desc())
+        .limit(limit)
+        .all()
+    )
+    return serialization.dumps(serialization.transaction_rows(rows))
+
+
+def timed(func, wallet_id: int, limit: int, seconds: float) -> dict:
+    db = SessionLocal()
+    try:
+        func(db, wallet_id, limit)  # warm up
+        db.expunge_all()
+        calls = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            func(db, wallet_id, limit)
+            # Fresh identity map each call, like a new request session
+            db.expunge_all()
+            calls += 1
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    return {"calls_per_second": round(calls / elapsed, 1), "ms_per_call": round(elapsed / calls * 1000, 3)}
+
+
+def same_json(orm, fast, wallet_id: int, limit: int) -> bool:
+    db = SessionLocal()
+    try:
+        return json.loads(orm(db, wallet_id, limit)) == json.loads(fast(db, wallet_id, limit))
+    finally:
+        db.close()
+
+
+def main(row_counts: list, seconds: float) -> dict:
+    wallet_id = seed(max(row_counts))
+    results = []
+
+    for name, orm, fast in (("transaction_page", page_orm, page_fast), ("admin_audit_transactions", audit_orm, audit_fast)):
+        for rows in row_counts:
+            orm_stats = timed(orm, wallet_id, rows, seconds)
+            fast_stats = timed(fast, wallet_id, rows, seconds)
+            results.append({
+                "listing": name,
+                "rows": rows,
+                "orm_pydantic": orm_stats,
+                "columns_orjson": fast_stats,
+                "speedup": round(orm_stats["ms_per_call"] / fast_stats["ms_per_call"], 2),
+                "identical_json": same_json(orm, fast, wallet_id, rows),
+            })
+
+    return {
+        "database": engine.url.get_backend_name(),
+        "encoder": "orjson" if serialization.orjson else "json",
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--seconds", type=float, default=2)
+    args = parser.parse_args()
+
+    print(json.dumps(main(args.rows, args.seconds), indent=2))
@@ -0,0 +1,146 @@
+# Credit throughput into one hot wallet vs number of balance shards.
+#
+#   DATABASE_URL=postgresql://... python -m benchmarks.shard_contention [--credits 4000]
+#
+# Each worker thread pays the same merchant wallet in its own transaction,
+# the way concurrent transfer_in credits do. With 0 shards every credit
+# takes FOR UPDATE on the wallet row; with N shards it updates one of N
+# shard rows. Row-level contention only exists on PostgreSQL: SQLite locks
+# the whole database per write, so expect flat numbers there (and, as
+# SQLite ignores FOR UPDATE, lost updates on the unsharded run).
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+import uuid
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+from app import models  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.services import audit_service, balance_service  # noqa: E402
+
+BENCH_EMAIL = "bench-merchant@example.com"
+
+
+def seed() -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter_by(email=BENCH_EMAIL).first()
+        if not user:
+            user = models.User(email=BENCH_EMAIL, hashed_password="x", username="bench-merchant", phone_number="0")
+            db.add(user)
+            db.flush()
+            db.add(models.Wallet(user_id=user.id, balance_kobo=0))
+            db.commit()
+        return db.query(models.Wallet.id).filter_by(user_id=user.id).scalar()
+    finally:
+        db.close()
+
+
+def set_shards(wallet_id: int, shards: int):
+    db = SessionLocal()
+    try:
+        balance_service.disable_sharding(db, wallet_id)
+        if shards:
+            balance_service.enable_sharding(db, wallet_id, shards)
+    finally:
+        db.close()
+
+
+def credit_once(wallet_id: int, shards: int):
+    db = SessionLocal()
+    try:
+        key = str(uuid.uuid4())
+        if shards:
+            wallet = db.get(models.Wallet, wallet_id)
+        else:
+            wallet = (
+                db.query(models.Wallet)
+                .filter(models.Wallet.id == wallet_id)
+                .with_for_update()
+                .one()
+            )
+        balance_service.credit(db, wallet, 100, key, shards)
+        db.add(models.Transaction(
+            wallet_id=wallet_id,
+            amount_kobo=100,
+            type="transfer_in",
+            status="success",
+            idempotency_key=key,
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def drive(wallet_id: int, shards: int, total: int, concurrency: int) -> dict:
+    latencies, errors = [], []
+    remaining = iter(range(total))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            start = time.perf_counter()
+            try:
+                credit_once(wallet_id, shards)
+            except Exception as e:
+                errors.append(type(e).__name__)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "shards": shards,
+        "credits_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p99_ms": round(latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000, 2) if latencies else None,
+        "errors": len(errors),
+    }
+
+
+def main(total: int, concurrency: int, shard_counts: list[int]):
+    wallet_id = seed()
+    results = []
+
+    for shards in shard_counts:
+        set_shards(wallet_id, shards)
+        results.append(drive(wallet_id, shards, total, concurrency))
+
+    db = SessionLocal()
+    try:
+        audit = audit_service.recalculate_wallet_balance(db, wallet_id)
+    finally:
+        db.close()
+
+    return {
+        "database": engine.url.get_backend_name(),
+        "concurrency": concurrency,
+        "credits_per_run": total,
+        "results": results,
+        "ledger_matches_balance": audit["valid"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--credits", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 1, 4, 16])
+    args = parser.parse_args()
+
+    print(json.dumps(main(args.credits, args.concurrency, args.shards), indent=2))
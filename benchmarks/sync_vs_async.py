@@ -0,0 +1,121 @@
+# Concurrency scaling of the sync (threadpool) and async DB paths.
+#
+#   DATABASE_URL=postgresql://... python -m benchmarks.sync_vs_async [--requests 2000]
+#
+# Runs the /transactions/my page query both ways at increasing concurrency
+# against the same database. The sync path goes through anyio's default
+# thread limiter, exactly like a sync FastAPI route. Defaults to a scratch
+# SQLite file so the dev database is left alone.
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+import anyio.to_thread  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app import models  # noqa: E402
+from app.database import AsyncSessionLocal, Base, SessionLocal, dispose_async_engine, engine, get_async_engine  # noqa: E402
+from app.services import transaction_service  # noqa: E402
+
+BENCH_EMAIL = "bench-sync-async@example.com"
+
+
+def seed(transactions: int = 500) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter_by(email=BENCH_EMAIL).first()
+        if user:
+            return user.id
+
+        user = models.User(email=BENCH_EMAIL, hashed_password="x", username="bench", phone_number="0")
+        db.add(user)
+        db.flush()
+        wallet = models.Wallet(user_id=user.id, balance_kobo=0)
+        db.add(wallet)
+        db.flush()
+        db.add_all([
+            models.Transaction(
+                wallet_id=wallet.id,
+                amount_kobo=100,
+                type="deposit",
+                status="success",
+                idempotency_key=f"bench-{i}",
+            )
+            for i in range(transactions)
+        ])
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def page_query(user_id: int):
+    wallet_ids = select(models.Wallet.id).where(models.Wallet.user_id == user_id)
+    query = select(models.Transaction).where(models.Transaction.wallet_id.in_(wallet_ids))
+    return transaction_service.newest_first(query, limit=20)
+
+
+def sync_request(user_id: int):
+    db = SessionLocal()
+    try:
+        return db.execute(page_query(user_id)).scalars().all()
+    finally:
+        db.close()
+
+
+async def async_request(user_id: int):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(page_query(user_id))).scalars().all()
+
+
+async def drive(call, total: int, concurrency: int) -> dict:
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+async def main(total: int, levels: list[int]):
+    user_id = seed()
+    get_async_engine()
+    results = []
+
+    for concurrency in levels:
+        sync_stats = await drive(
+            lambda: anyio.to_thread.run_sync(sync_request, user_id), total, concurrency
+        )
+        async_stats = await drive(lambda: async_request(user_id), total, concurrency)
+        results.append({"concurrency": concurrency, "sync": sync_stats, "async": async_stats})
+
+    await dispose_async_engine()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 40, 100, 200])
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(main(args.requests, args.concurrency)), indent=2))
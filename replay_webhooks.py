@@ -0,0 +1,34 @@
+# Re-drive Paystack webhooks in bulk.
+#
+#   python replay_webhooks.py --file events.ndjson
+#   python replay_webhooks.py --from-id 1200 --to-id 5400 --status dead
+import argparse
+import json
+
+from app.database import SessionLocal
+from app.services import webhook_replay
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--file", help="newline-delimited Paystack webhook payloads")
+parser.add_argument("--from-id", type=int)
+parser.add_argument("--to-id", type=int)
+parser.add_argument("--status", action="append", help="stored statuses to replay (default: pending, dead)")
+parser.add_argument("--batch-size", type=int, default=webhook_replay.REPLAY_BATCH_SIZE)
+parser.add_argument("--outcomes", action="store_true", help="print per-event outcomes")
+args = parser.parse_args()
+
+db = SessionLocal()
+try:
+    if args.file:
+        with open(args.file) as f:
+            result = webhook_replay.replay_payloads(db, webhook_replay.read_ndjson(f), args.batch_size)
+    else:
+        result = webhook_replay.replay_stored(
+            db, args.from_id, args.to_id, args.status or ["pending", "dead"], args.batch_size
+        )
+finally:
+    db.close()
+
+if not args.outcomes:
+    result.pop("outcomes")
+print(json.dumps(result, indent=2))
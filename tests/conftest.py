@@ -0,0 +1,59 @@
+import os
+import tempfile
+import uuid
+
+# The app reads its settings at import, so these must be set first
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/tests.db"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["USE_MOCK_PAYSTACK"] = "true"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models, security
+from app.database import SessionLocal
+from app.main import app
+from app.services import balance_service
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(client):
+    """Create a user with one funded wallet; returns its id, username, wallet_id and auth headers."""
+    def make(balance_kobo: int = 1_000_000, role: str = "user") -> dict:
+        name = f"user-{uuid.uuid4().hex[:12]}"
+        db = SessionLocal()
+        try:
+            user = models.User(email=f"{name}@example.com", username=name, phone_number=name, hashed_password="x", role=role)
+            db.add(user)
+            db.flush()
+            wallet = models.Wallet(user_id=user.id, balance_kobo=balance_kobo)
+            db.add(wallet)
+            db.commit()
+            return {
+                "id": user.id,
+                "username": name,
+                "wallet_id": wallet.id,
+                "headers": {"Authorization": f"Bearer {security.create_access_token({'sub': str(user.id)})}"},
+            }
+        finally:
+            db.close()
+    return make
+
+
+def idempotent(user: dict, key: str = None) -> dict:
+    return {**user["headers"], "Idempotency-Key": key or str(uuid.uuid4())}
+
+
+def balance(user: dict) -> int:
+    db = SessionLocal()
+    try:
+        return balance_service.total_balance(db, db.get(models.Wallet, user["wallet_id"]))
+    finally:
+        db.close()
@@ -0,0 +1,82 @@
+from app import models
+from app.database import SessionLocal
+from app.services.fraud_service import velocity
+
+from conftest import balance, idempotent
+
+
+def _bulk(client, sender: dict, items: list, key: str = None):
+    return client.post("/wallets/transfer/bulk", json={"items": items}, headers=idempotent(sender, key))
+
+
+def test_bulk_transfer_pays_every_recipient(client, make_user):
+    sender = make_user(1_000_000)
+    recipients = [make_user(0) for _ in range(3)]
+    items = [{"username": r["username"], "amount_kobo": 1_000 * (i + 1)} for i, r in enumerate(recipients)]
+    items.append({"username": "no-such-user", "amount_kobo": 500})
+
+    response = _bulk(client, sender, items)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"], body["held"]) == (3, 1, 0)
+    assert body["total_kobo"] == 6_000
+    assert body["results"][3]["error"] == "Recipient not found"
+    assert balance(sender) == 994_000
+    assert [balance(r) for r in recipients] == [1_000, 2_000, 3_000]
+
+
+def test_bulk_transfer_legs_share_an_operation(client, make_user):
+    sender, recipient = make_user(), make_user(0)
+    key = "bulk-legs"
+    assert _bulk(client, sender, [{"username": recipient["username"], "amount_kobo": 700}], key).status_code == 200
+
+    db = SessionLocal()
+    try:
+        out, in_ = (
+            db.query(models.Transaction)
+            .filter(models.Transaction.idempotency_key.in_([f"{key}:0:out", f"{key}:0:in"]))
+            .order_by(models.Transaction.type.desc())
+            .all()
+        )
+    finally:
+        db.close()
+    assert (out.wallet_id, in_.wallet_id) == (sender["wallet_id"], recipient["wallet_id"])
+    assert out.operation_id == in_.operation_id
+
+
+def test_large_batch_counts_as_one_transfer(client, make_user):
+    sender = make_user(1_000_000)
+    recipients = [make_user(0) for _ in range(25)]
+
+    response = _bulk(client, sender, [{"username": r["username"], "amount_kobo": 100} for r in recipients])
+
+    assert response.status_code == 200
+    assert (response.json()["succeeded"], response.json()["held"]) == (25, 0)
+    assert velocity.snapshot(sender["wallet_id"])["1m"] == (1, 2_500)
+
+
+def test_flagged_batch_is_held_as_one(client, make_user):
+    sender = make_user(10_000_000)
+    recipients = [make_user(0), make_user(0)]
+    items = [
+        {"username": recipients[0]["username"], "amount_kobo": 3_000_000},
+        {"username": recipients[1]["username"], "amount_kobo": 2_500_000},
+    ]
+
+    response = _bulk(client, sender, items)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["held"]) == (0, 2)
+    assert "Daily transfer amount exceeded" in body["fraud_reasons"]
+    assert balance(sender) == 4_500_000
+    assert [balance(r) for r in recipients] == [0, 0]
+
+    db = SessionLocal()
+    try:
+        hold = db.query(models.FraudHold).filter_by(wallet_id=sender["wallet_id"]).one()
+        assert (hold.destination_type, hold.amount_kobo) == ("bulk", 5_500_000)
+        assert hold.transaction.status == models.TransactionStatus.pending.value
+    finally:
+        db.close()
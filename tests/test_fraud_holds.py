@@ -0,0 +1,90 @@
+import pytest
+
+from app import models
+from app.database import SessionLocal
+
+from conftest import balance, idempotent
+
+
+@pytest.fixture
+def admin(make_user):
+    return make_user(0, role="admin")
+
+
+def _hold_id(client, admin: dict, sender: dict) -> int:
+    response = client.get("/admin/fraud/holds", headers=admin["headers"])
+    assert response.status_code == 200
+    return next(h["id"] for h in response.json() if h["wallet_id"] == sender["wallet_id"])
+
+
+def _held_batch(client, make_user) -> tuple:
+    sender = make_user(10_000_000)
+    recipients = [make_user(0), make_user(0)]
+    items = [
+        {"username": recipients[0]["username"], "amount_kobo": 3_000_000},
+        {"username": recipients[1]["username"], "amount_kobo": 2_500_000},
+    ]
+    response = client.post("/wallets/transfer/bulk", json={"items": items}, headers=idempotent(sender))
+    assert response.json()["held"] == 2
+    return sender, recipients
+
+
+def test_approve_held_transfer(client, make_user, admin):
+    sender, recipient = make_user(10_000_000), make_user(0)
+    response = client.post(
+        "/wallets/transfer",
+        json={"amount_kobo": 6_000_000, "destination_type": "wallet", "username": recipient["username"]},
+        headers=idempotent(sender),
+    )
+    assert response.json()["status"] == "held"
+    assert balance(recipient) == 0
+
+    hold_id = _hold_id(client, admin, sender)
+    response = client.post(f"/admin/fraud/holds/{hold_id}/approve", headers=admin["headers"])
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "approved"
+    assert balance(sender) == 4_000_000
+    assert balance(recipient) == 6_000_000
+
+    response = client.post(f"/admin/fraud/holds/{hold_id}/approve", headers=admin["headers"])
+    assert response.status_code == 400
+    assert balance(recipient) == 6_000_000
+
+
+def test_approve_held_batch(client, make_user, admin):
+    sender, recipients = _held_batch(client, make_user)
+
+    hold_id = _hold_id(client, admin, sender)
+    response = client.post(f"/admin/fraud/holds/{hold_id}/approve", headers=admin["headers"])
+
+    assert response.status_code == 200
+    assert [item["recipient_wallet_id"] for item in response.json()["items"]] == [r["wallet_id"] for r in recipients]
+    assert balance(sender) == 4_500_000
+    assert [balance(r) for r in recipients] == [3_000_000, 2_500_000]
+
+    db = SessionLocal()
+    try:
+        hold = db.get(models.FraudHold, hold_id)
+        credits = db.query(models.Transaction).filter_by(operation_id=hold.transaction.operation_id, type="transfer_in").all()
+        assert hold.transaction.status == models.TransactionStatus.success.value
+        assert sorted(tx.amount_kobo for tx in credits) == [2_500_000, 3_000_000]
+    finally:
+        db.close()
+
+
+def test_reject_held_batch_refunds_sender(client, make_user, admin):
+    sender, recipients = _held_batch(client, make_user)
+
+    hold_id = _hold_id(client, admin, sender)
+    response = client.post(f"/admin/fraud/holds/{hold_id}/reject", headers=admin["headers"])
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "rejected"
+    assert balance(sender) == 10_000_000
+    assert [balance(r) for r in recipients] == [0, 0]
+
+
+def test_review_requires_admin(client, make_user):
+    user = make_user()
+    assert client.post("/admin/fraud/holds/1/approve", headers=user["headers"]).status_code == 403
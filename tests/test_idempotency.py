@@ -0,0 +1,41 @@
+from conftest import balance, idempotent
+
+
+def test_replay_returns_first_response(client, make_user):
+    sender, recipient = make_user(1_000_000), make_user(0)
+    headers = idempotent(sender)
+    payload = {"amount_kobo": 2_500, "destination_type": "wallet", "username": recipient["username"]}
+
+    first = client.post("/wallets/transfer", json=payload, headers=headers)
+    replay = client.post("/wallets/transfer", json=payload, headers=headers)
+
+    assert first.status_code == replay.status_code == 200
+    assert replay.json() == first.json()
+    assert balance(sender) == 997_500
+    assert balance(recipient) == 2_500
+
+
+def test_replayed_bulk_transfer_pays_once(client, make_user):
+    sender, recipient = make_user(1_000_000), make_user(0)
+    headers = idempotent(sender)
+    payload = {"items": [{"username": recipient["username"], "amount_kobo": 4_000}]}
+
+    first = client.post("/wallets/transfer/bulk", json=payload, headers=headers)
+    replay = client.post("/wallets/transfer/bulk", json=payload, headers=headers)
+
+    assert replay.json() == first.json()
+    assert balance(recipient) == 4_000
+
+
+def test_key_reused_for_another_request(client, make_user):
+    sender, recipient = make_user(1_000_000), make_user(0)
+    headers = idempotent(sender)
+    payload = {"amount_kobo": 1_000, "destination_type": "wallet", "username": recipient["username"]}
+
+    assert client.post("/wallets/transfer", json=payload, headers=headers).status_code == 200
+    response = client.post("/wallets/transfer", json={**payload, "amount_kobo": 2_000}, headers=headers)
+
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Idempotency key was used for a different request"
+    assert balance(recipient) == 1_000
+
@@ -0,0 +1,82 @@
+import threading
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from app import models, security
+from app.database import SessionLocal, engine
+from app.profiling import query_budget
+
+
+@pytest.fixture(scope="module")
+def users(client):
+    db = SessionLocal()
+    try:
+        rows = []
+        for name in ("budget-sender", "budget-recipient"):
+            user = models.User(email=f"{name}@example.com", username=name, phone_number=name, hashed_password="x")
+            db.add(user)
+            db.flush()
+            db.add(models.Wallet(user_id=user.id, balance_kobo=1_000_000))
+            rows.append(user)
+        db.commit()
+        return [
+            {
+                "id": user.id,
+                "username": user.username,
+                "wallet_id": user.wallets[0].id,
+                "headers": {"Authorization": f"Bearer {security.create_access_token({'sub': str(user.id)})}"},
+            }
+            for user in rows
+        ]
+    finally:
+        db.close()
+
+
+def _headers(user: dict) -> dict:
+    return {**user["headers"], "Idempotency-Key": str(uuid.uuid4())}
+
+
+def test_deposit_budget(client, users):
+    sender = users[0]
+    with query_budget(9, label="POST /wallets/{id}/deposit"):
+        response = client.post(
+            f"/wallets/{sender['wallet_id']}/deposit", json={"amount_kobo": 100}, headers=_headers(sender),
+        )
+    assert response.status_code == 200
+
+
+def test_wallet_transfer_budget(client, users):
+    sender, recipient = users
+    for _ in range(3):
+        with query_budget(12, label="POST /wallets/transfer"):
+            response = client.post(
+                "/wallets/transfer",
+                json={"amount_kobo": 100, "destination_type": "wallet", "username": recipient["username"]},
+                headers=_headers(sender),
+            )
+        assert response.status_code == 200
+
+
+def test_budget_ignores_other_threads(client):
+    def background_queries():
+        with engine.connect() as conn:
+            for _ in range(20):
+                conn.execute(text("SELECT 1"))
+
+    with query_budget(1) as profile:
+        thread = threading.Thread(target=background_queries)
+        thread.start()
+        thread.join()
+        response = client.get("/")
+    assert response.status_code == 200
+    assert profile.count == 0
+
+
+def test_budget_fails_when_exceeded():
+    with pytest.raises(AssertionError, match="2 queries, budget 1"):
+        with query_budget(1, allow_n_plus_one=True):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 1"))